@@ -16,16 +16,49 @@ Usage:
 
     # Filter to specific sessions
     python3 scripts/analyze-routing-experiments.py --session-filter "2026-02-23"
+
+    # Aggregate inside SQLite instead of loading every run into Python
+    python3 scripts/analyze-routing-experiments.py --engine sql
+
+    # Only fold in runs added since the last invocation (sidecar cache next to metrics.db)
+    python3 scripts/analyze-routing-experiments.py --cache
+
+    # Add the agent_family column + covering indexes, printing query plans before/after
+    python3 scripts/analyze-routing-experiments.py --ensure-indexes
+
+    # Rank every per-role tier assignment (x cache-read discounts) by projected savings
+    python3 scripts/analyze-routing-experiments.py --what-if --what-if-top 15
+
+    # Machine-readable output for dashboards (csv/parquet write one file per table)
+    python3 scripts/analyze-routing-experiments.py --format json > routing.json
+    python3 scripts/analyze-routing-experiments.py --format csv --output /tmp/routing-report/
+
+    # Stay resident and print rolling 1h/24h/7d savings every 5 minutes
+    python3 scripts/analyze-routing-experiments.py --watch --interval 300 --shadow-dir /tmp/routing-shadow/
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
+import csv
+import datetime
+import hashlib
+import itertools
+import json
+import mmap
+import operator
+import os
 import re
 import sqlite3
 import sys
-from collections import defaultdict
+import time
+from collections import Counter, defaultdict
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterable, Iterator, TextIO
 
 DEFAULT_DB = Path.home() / ".claude" / "interstat" / "metrics.db"
 
@@ -73,16 +106,10 @@ def connect_db(db_path: Path) -> sqlite3.Connection:
     return conn
 
 
-def query_flux_drive_reviews(conn: sqlite3.Connection, session_filter: str | None = None) -> list[dict]:
-    """Get all flux-drive review agent runs grouped by session."""
-    where_clause = ""
-    params: list = []
-
-    if session_filter:
-        where_clause = "AND timestamp LIKE ?"
-        params.append(f"{session_filter}%")
-
-    rows = conn.execute(f"""
+def flux_drive_runs_sql(conn: sqlite3.Connection, session_filter: str | None = None) -> tuple[str, list]:
+    """SQL and parameters for the per-run flux-drive query."""
+    where_sql, params = flux_drive_where(session_filter, has_agent_family(conn))
+    sql = f"""
         SELECT
             session_id,
             COALESCE(subagent_type, agent_name) as agent,
@@ -94,19 +121,591 @@ def query_flux_drive_reviews(conn: sqlite3.Connection, session_filter: str | Non
             wall_clock_ms,
             timestamp
         FROM agent_runs
-        WHERE (
-            COALESCE(subagent_type, agent_name) LIKE '%interflux%'
-            OR COALESCE(subagent_type, agent_name) LIKE '%fd-%'
-            OR COALESCE(subagent_type, agent_name) LIKE '%intersynth%'
-        )
-        AND total_tokens IS NOT NULL
-        {where_clause}
+        WHERE {where_sql}
         ORDER BY session_id, timestamp
-    """, params).fetchall()
+    """
+    return sql, params
+
 
+def query_flux_drive_reviews(conn: sqlite3.Connection, session_filter: str | None = None) -> list[dict]:
+    """Get all flux-drive review agent runs grouped by session."""
+    sql, params = flux_drive_runs_sql(conn, session_filter)
+    rows = conn.execute(sql, params).fetchall()
     return [dict(r) for r in rows]
 
 
+# SQL mirror of normalize_agent_name(). substr() comparisons keep the prefix
+# match case-sensitive, unlike LIKE.
+_SQL_AGENT_EXPR = """
+    CASE
+        WHEN substr(raw_agent, 1, 17) = 'interflux:review:' THEN substr(raw_agent, 18)
+        WHEN substr(raw_agent, 1, 10) = 'interflux:' THEN substr(raw_agent, 11)
+        ELSE raw_agent
+    END
+"""
+
+# Which agent_runs rows count as flux-drive reviews.
+_SQL_FLUX_DRIVE_MATCH = """
+    (
+        COALESCE(subagent_type, agent_name) LIKE '%interflux%'
+        OR COALESCE(subagent_type, agent_name) LIKE '%fd-%'
+        OR COALESCE(subagent_type, agent_name) LIKE '%intersynth%'
+    )
+"""
+
+AGENT_FAMILY_COLUMN = "agent_family"
+FLUX_DRIVE_FAMILY = "flux-drive"
+
+# Opt-in schema additions made by --ensure-indexes. agent_family is a VIRTUAL
+# generated column, so it costs no storage and interstat's positional INSERTs
+# keep working; the indexes let the flux-drive filter become an equality seek.
+ENSURE_INDEX_STATEMENTS = [
+    f"""ALTER TABLE agent_runs ADD COLUMN {AGENT_FAMILY_COLUMN} TEXT
+        GENERATED ALWAYS AS (CASE WHEN {_SQL_FLUX_DRIVE_MATCH} THEN '{FLUX_DRIVE_FAMILY}' END) VIRTUAL""",
+    # Covers the per-run query and the SQL engine: rows come out already in
+    # (session_id, timestamp) order and never touch the table itself.
+    f"""CREATE INDEX IF NOT EXISTS idx_agent_runs_family_session
+        ON agent_runs ({AGENT_FAMILY_COLUMN}, session_id, timestamp, subagent_type, agent_name, model,
+                       input_tokens, output_tokens, cache_read_tokens, total_tokens, wall_clock_ms)""",
+    # Seek target for --session-filter date ranges.
+    f"""CREATE INDEX IF NOT EXISTS idx_agent_runs_family_timestamp
+        ON agent_runs ({AGENT_FAMILY_COLUMN}, timestamp)""",
+]
+
+
+def has_agent_family(conn: sqlite3.Connection) -> bool:
+    """True if --ensure-indexes already added the agent_family column."""
+    # table_xinfo (unlike table_info) lists generated columns.
+    return any(row[1] == AGENT_FAMILY_COLUMN for row in conn.execute("PRAGMA table_xinfo(agent_runs)"))
+
+
+def prefix_range(prefix: str) -> tuple[str, str]:
+    """Half-open [lo, hi) string range matching every value that starts with prefix."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def flux_drive_where(session_filter: str | None, family_column: bool) -> tuple[str, list]:
+    """WHERE clause selecting flux-drive runs, optionally for one timestamp prefix.
+
+    The session filter is a range predicate rather than ``LIKE 'x%'`` so that
+    it can seek on a timestamp index. With ``family_column`` the three
+    substring matches are replaced by an equality on agent_family.
+    """
+    if family_column:
+        where_sql = f"{AGENT_FAMILY_COLUMN} = '{FLUX_DRIVE_FAMILY}'"
+    else:
+        where_sql = _SQL_FLUX_DRIVE_MATCH
+    where_sql += " AND total_tokens IS NOT NULL"
+    params: list = []
+    if session_filter:
+        where_sql += " AND timestamp >= ? AND timestamp < ?"
+        params.extend(prefix_range(session_filter))
+    return where_sql, params
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params: list) -> list[str]:
+    """Render EXPLAIN QUERY PLAN output as indented lines."""
+    depth: dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def time_query(conn: sqlite3.Connection, sql: str, params: list) -> float:
+    """Seconds taken to run a query and step through every row."""
+    start = time.perf_counter()
+    for _ in conn.execute(sql, params):
+        pass
+    return time.perf_counter() - start
+
+
+def print_query_plans(conn: sqlite3.Connection, session_filter: str | None, label: str) -> None:
+    """Print plan and timing of the per-run and per-session queries to stderr."""
+    queries = {
+        "per-run query (--engine python)": flux_drive_runs_sql(conn, session_filter),
+        "per-session query (--engine sql)": session_aggregates_sql(conn, session_filter),
+    }
+    print(f"=== Query plans {label} ===", file=sys.stderr)
+    for name, (sql, params) in queries.items():
+        elapsed = time_query(conn, sql, params)
+        print(f"{name}: {elapsed * 1000:.1f} ms", file=sys.stderr)
+        for line in explain_query_plan(conn, sql, params):
+            print(f"  {line}", file=sys.stderr)
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> list[str]:
+    """Add the agent_family column and covering indexes; returns statements run."""
+    executed = []
+    with conn:
+        for statement in ENSURE_INDEX_STATEMENTS:
+            if statement.startswith("ALTER TABLE") and has_agent_family(conn):
+                continue
+            conn.execute(statement)
+            executed.append(" ".join(statement.split()))
+        conn.execute("ANALYZE agent_runs")
+    return executed
+
+
+def _values_cte(name: str, columns: tuple[str, ...], rows: list[tuple]) -> tuple[str, list]:
+    """Render a constant table as a VALUES CTE with bound parameters."""
+    placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+    if not rows:
+        # VALUES needs at least one row; an all-NULL row never joins.
+        rows = [tuple(None for _ in columns)]
+    sql = f"{name}({', '.join(columns)}) AS (VALUES {', '.join(placeholders for _ in rows)})"
+    return sql, [v for row in rows for v in row]
+
+
+def build_pricing_cte(
+    session_filter: str | None = None,
+    rowid_range: tuple[int, int] | None = None,
+    family_column: bool = False,
+    since: str | None = None,
+    rowids: list[int] | None = None,
+) -> tuple[str, list, str, list]:
+    """Build the WITH clause that prices every distinct (agent, model) pair.
+
+    Agent name normalization, tier mapping, role projection and per-token
+    rates are resolved once per distinct ``(raw_agent, model)`` pair in the
+    ``pricing`` CTE (a few dozen rows) instead of once per run. Callers join
+    ``agent_runs`` back to it on ``raw_agent``/``model`` and multiply token
+    counts by the per-million rates.
+
+    Returns ``(cte_sql, cte_params, where_sql, where_params)``; the WHERE
+    fragment applies the flux-drive and session filters to ``agent_runs``,
+    plus an exclusive-inclusive ``(after, upto]`` rowid window, a
+    ``timestamp >= since`` lower bound and an explicit rowid list if given.
+    """
+    tier_sql, tier_params = _values_cte("tier_map", ("model_id", "tier"), sorted(MODEL_TIER_MAP.items()))
+    cost_sql, cost_params = _values_cte(
+        "tier_cost",
+        ("tier", "input_cost", "output_cost"),
+        [(tier, c["input"], c["output"]) for tier, c in sorted(MODEL_COSTS.items())],
+    )
+    role_sql, role_params = _values_cte(
+        "roles",
+        ("agent", "role", "projected_tier"),
+        [(agent, role, tier) for agent, (role, tier) in sorted(AGENT_ROLES.items())],
+    )
+
+    where_sql, where_params = flux_drive_where(session_filter, family_column)
+    if rowid_range:
+        where_sql += " AND r.rowid > ? AND r.rowid <= ?"
+        where_params.extend(rowid_range)
+    if since:
+        where_sql += " AND r.timestamp >= ?"
+        where_params.append(since)
+    if rowids is not None:
+        where_sql += f" AND r.rowid IN ({', '.join('?' for _ in rowids)})"
+        where_params.extend(rowids)
+
+    cte_sql = f"""
+        WITH
+        {tier_sql},
+        {cost_sql},
+        {role_sql},
+        pairs AS (
+            SELECT DISTINCT COALESCE(subagent_type, agent_name) AS raw_agent, model
+            FROM agent_runs r
+            WHERE {where_sql}
+        ),
+        named AS MATERIALIZED (
+            SELECT raw_agent, model, {_SQL_AGENT_EXPR} AS agent FROM pairs
+        ),
+        pricing AS MATERIALIZED (
+            SELECT
+                n.raw_agent,
+                n.model,
+                n.agent,
+                COALESCE(t.tier, 'unknown') AS tier,
+                COALESCE(ro.projected_tier, t.tier, 'unknown') AS projected_tier,
+                COALESCE(ac.input_cost, 0.0) AS actual_input_rate,
+                COALESCE(ac.output_cost, 0.0) AS actual_output_rate,
+                COALESCE(pc.input_cost, 0.0) AS projected_input_rate,
+                COALESCE(pc.output_cost, 0.0) AS projected_output_rate
+            FROM named n
+            LEFT JOIN tier_map t ON t.model_id = n.model
+            LEFT JOIN roles ro ON ro.agent = n.agent
+            LEFT JOIN tier_cost ac ON ac.tier = t.tier
+            LEFT JOIN tier_cost pc ON pc.tier = COALESCE(ro.projected_tier, t.tier)
+        )
+    """
+    return cte_sql, tier_params + cost_params + role_params + where_params, where_sql, where_params
+
+
+# Join and cost expressions for queries that read agent_runs (as r) against pricing (as p).
+_SQL_PRICING_JOIN = "JOIN pricing p ON p.raw_agent = COALESCE(r.subagent_type, r.agent_name) AND p.model IS r.model"
+_SQL_ACTUAL_COST = (
+    "(COALESCE(r.input_tokens, 0) * p.actual_input_rate"
+    " + COALESCE(r.output_tokens, 0) * p.actual_output_rate) / 1000000.0"
+)
+_SQL_PROJECTED_COST = (
+    "(COALESCE(r.input_tokens, 0) * p.projected_input_rate"
+    " + COALESCE(r.output_tokens, 0) * p.projected_output_rate) / 1000000.0"
+)
+
+
+def session_aggregates_sql(
+    conn: sqlite3.Connection,
+    session_filter: str | None = None,
+    rowid_range: tuple[int, int] | None = None,
+    rowids: list[int] | None = None,
+) -> tuple[str, list]:
+    """SQL and parameters for the per-session totals query of the SQL engine."""
+    cte, cte_params, where_sql, where_params = build_pricing_cte(
+        session_filter, rowid_range, has_agent_family(conn), rowids=rowids
+    )
+    sql = f"""
+        {cte}
+        SELECT
+            r.session_id,
+            COUNT(*) AS agent_count,
+            SUM(COALESCE(r.input_tokens, 0)) AS total_input,
+            SUM(COALESCE(r.output_tokens, 0)) AS total_output,
+            SUM(r.total_tokens) AS total_tokens,
+            SUM({_SQL_ACTUAL_COST}) AS actual_cost,
+            SUM({_SQL_PROJECTED_COST}) AS projected_cost
+        FROM agent_runs r
+        {_SQL_PRICING_JOIN}
+        WHERE {where_sql}
+        GROUP BY r.session_id
+        ORDER BY r.session_id
+    """
+    return sql, cte_params + where_params
+
+
+def iter_session_aggregates(
+    conn: sqlite3.Connection,
+    session_filter: str | None = None,
+    rowid_range: tuple[int, int] | None = None,
+    rowids: list[int] | None = None,
+) -> Iterator[dict]:
+    """Stream per-session totals computed by SQLite, ordered by session_id.
+
+    Yields the same keys as analyze_session() except ``agents``; per-agent
+    breakdowns come from iter_agent_tier_groups().
+    """
+    sql, params = session_aggregates_sql(conn, session_filter, rowid_range, rowids)
+    for row in conn.execute(sql, params):
+        yield finalize_session(dict(row))
+
+
+def iter_agent_tier_groups(
+    conn: sqlite3.Connection,
+    session_filter: str | None = None,
+    rowid_range: tuple[int, int] | None = None,
+    rowids: list[int] | None = None,
+) -> Iterator[dict]:
+    """Stream run counts and costs per (agent, tier, projected tier) from SQLite.
+
+    ``first_seq``/``last_seq`` are ``session_id + US + timestamp`` keys of the
+    earliest and latest run in each group; rows arrive ordered by first_seq.
+    """
+    cte, cte_params, where_sql, where_params = build_pricing_cte(
+        session_filter, rowid_range, has_agent_family(conn), rowids=rowids
+    )
+    cursor = conn.execute(f"""
+        {cte}
+        SELECT
+            p.agent,
+            p.tier,
+            p.projected_tier,
+            COUNT(*) AS runs,
+            SUM({_SQL_ACTUAL_COST}) AS actual_cost,
+            SUM({_SQL_PROJECTED_COST}) AS projected_cost,
+            MIN(r.session_id || char(31) || r.timestamp) AS first_seq,
+            MAX(r.session_id || char(31) || r.timestamp) AS last_seq
+        FROM agent_runs r
+        {_SQL_PRICING_JOIN}
+        WHERE {where_sql}
+        GROUP BY p.agent, p.tier, p.projected_tier
+        ORDER BY first_seq
+    """, cte_params + where_params)
+    for row in cursor:
+        yield dict(row)
+
+
+def fold_agent_tier_groups(groups: Iterator[dict]) -> dict[str, dict]:
+    """Fold agent/tier groups (ordered by first_seq) into generate_report() agent stats.
+
+    Folding in order of first appearance makes the result match
+    aggregate_agent_stats() on the same runs.
+    """
+    agent_stats: dict[str, dict] = {}
+    last_seen: dict[str, str] = {}
+    for row in groups:
+        agent = row["agent"]
+        stats = agent_stats.setdefault(agent, new_agent_stats())
+        stats["runs"] += row["runs"]
+        stats["actual_tiers"][row["tier"]] += row["runs"]
+        stats["total_actual_cost"] += row["actual_cost"]
+        stats["total_projected_cost"] += row["projected_cost"]
+        # The Python path keeps the projected tier of the most recent run.
+        if row["last_seq"] >= last_seen.get(agent, ""):
+            last_seen[agent] = row["last_seq"]
+            stats["projected_tier"] = row["projected_tier"]
+    return agent_stats
+
+
+def aggregate_in_sql(conn: sqlite3.Connection, session_filter: str | None = None) -> tuple[list[dict], dict[str, dict]]:
+    """Compute session summaries and per-agent stats without loading runs into Python."""
+    sessions = list(iter_session_aggregates(conn, session_filter))
+    return sessions, fold_agent_tier_groups(iter_agent_tier_groups(conn, session_filter))
+
+
+# ---------------------------------------------------------------------------
+# Incremental aggregate cache
+# ---------------------------------------------------------------------------
+
+# Bump when the cached table layout or aggregation semantics change.
+CACHE_SCHEMA_VERSION = 2
+# Rowids per IN (...) list when re-reading backfilled runs.
+PENDING_CHUNK = 500
+
+
+def default_cache_path(db_path: Path) -> Path:
+    return db_path.with_name("routing-analysis-cache.db")
+
+
+def cache_fingerprint() -> str:
+    """Hash of everything that feeds cached costs; a change invalidates the cache."""
+    payload = json.dumps(
+        {
+            "version": CACHE_SCHEMA_VERSION,
+            "agent_roles": AGENT_ROLES,
+            "model_costs": MODEL_COSTS,
+            "model_tier_map": MODEL_TIER_MAP,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def open_cache(cache_path: Path) -> sqlite3.Connection:
+    """Open (and create if needed) the sidecar aggregate cache.
+
+    Aggregates are stored per scope (the --session-filter value, or "" for
+    all runs) next to the highest agent_runs rowid folded into them, plus the
+    rowids at or below it that were still waiting for their tokens.
+    """
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache = sqlite3.connect(str(cache_path))
+    cache.row_factory = sqlite3.Row
+    cache.execute("PRAGMA busy_timeout=5000")
+    cache.executescript("""
+        CREATE TABLE IF NOT EXISTS cache_meta (
+            scope TEXT PRIMARY KEY,
+            watermark INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS session_totals (
+            scope TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            agent_count INTEGER NOT NULL,
+            total_input INTEGER NOT NULL,
+            total_output INTEGER NOT NULL,
+            total_tokens INTEGER NOT NULL,
+            actual_cost REAL NOT NULL,
+            projected_cost REAL NOT NULL,
+            PRIMARY KEY (scope, session_id)
+        );
+        CREATE TABLE IF NOT EXISTS agent_tier_totals (
+            scope TEXT NOT NULL,
+            agent TEXT NOT NULL,
+            tier TEXT NOT NULL,
+            projected_tier TEXT NOT NULL,
+            runs INTEGER NOT NULL,
+            actual_cost REAL NOT NULL,
+            projected_cost REAL NOT NULL,
+            first_seq TEXT NOT NULL,
+            last_seq TEXT NOT NULL,
+            PRIMARY KEY (scope, agent, tier, projected_tier)
+        );
+        CREATE TABLE IF NOT EXISTS pending_runs (
+            scope TEXT NOT NULL,
+            run_rowid INTEGER NOT NULL,
+            PRIMARY KEY (scope, run_rowid)
+        );
+    """)
+    return cache
+
+
+def invalidate_cache(cache: sqlite3.Connection, scope: str | None = None) -> None:
+    """Drop cached aggregates for one scope, or for every scope when scope is None."""
+    with cache:
+        for table in ("cache_meta", "session_totals", "agent_tier_totals", "pending_runs"):
+            if scope is None:
+                cache.execute(f"DELETE FROM {table}")
+            else:
+                cache.execute(f"DELETE FROM {table} WHERE scope = ?", (scope,))
+
+
+def pending_rowids(conn: sqlite3.Connection, rowid_range: tuple[int, int]) -> list[int]:
+    """Rowids in the ``(after, upto]`` window whose tokens interstat has not filled in yet.
+
+    interstat inserts a run with NULL tokens and sets ``total_tokens`` and
+    ``model`` with an UPDATE at session end, after the rowid watermark may
+    already have passed it.
+    """
+    return [row[0] for row in conn.execute(
+        "SELECT rowid FROM agent_runs WHERE rowid > ? AND rowid <= ? AND total_tokens IS NULL", rowid_range
+    )]
+
+
+def filled_rowids(conn: sqlite3.Connection, rowids: Iterable[int]) -> list[list[int]]:
+    """The given rowids that now have tokens, in chunks of at most PENDING_CHUNK."""
+    ordered = sorted(rowids)
+    chunks = []
+    for i in range(0, len(ordered), PENDING_CHUNK):
+        chunk = ordered[i:i + PENDING_CHUNK]
+        filled = [row[0] for row in conn.execute(
+            f"SELECT rowid FROM agent_runs WHERE rowid IN ({', '.join('?' for _ in chunk)})"
+            " AND total_tokens IS NOT NULL", chunk
+        )]
+        if filled:
+            chunks.append(filled)
+    return chunks
+
+
+@contextlib.contextmanager
+def read_snapshot(conn: sqlite3.Connection) -> Iterator[None]:
+    """Run the enclosed reads of ``conn`` in one transaction, so they see one snapshot."""
+    conn.execute("BEGIN")
+    try:
+        yield
+    finally:
+        conn.rollback()
+
+
+def refresh_cache(
+    conn: sqlite3.Connection,
+    cache: sqlite3.Connection,
+    session_filter: str | None = None,
+) -> tuple[int, int, int]:
+    """Fold agent_runs rows past the cached watermark, and backfilled pending rows, into the cache.
+
+    Rows still waiting for their tokens are remembered in pending_runs and
+    folded on the refresh that first sees them filled in. All reads share
+    one snapshot, so a row backfilled mid-refresh is counted exactly once.
+    The whole scope is rebuilt when the pricing fingerprint changed or when
+    the database's max rowid went backwards (recreated or truncated database).
+
+    Returns ``(previous_watermark, new_watermark, backfilled_rows_folded)``.
+    """
+    scope = session_filter or ""
+    fingerprint = cache_fingerprint()
+    with read_snapshot(conn):
+        max_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM agent_runs").fetchone()[0]
+
+        meta = cache.execute(
+            "SELECT watermark, fingerprint FROM cache_meta WHERE scope = ?", (scope,)
+        ).fetchone()
+        watermark = 0
+        if meta is not None:
+            if meta["fingerprint"] != fingerprint or meta["watermark"] > max_rowid:
+                invalidate_cache(cache, scope)
+            else:
+                watermark = meta["watermark"]
+
+        pending = [row[0] for row in cache.execute("SELECT run_rowid FROM pending_runs WHERE scope = ?", (scope,))]
+        filled = filled_rowids(conn, pending)
+        backfilled = sum(map(len, filled))
+        if max_rowid == watermark and not filled:
+            return watermark, watermark, 0
+
+        window = (watermark, max_rowid)
+        with cache:
+            if max_rowid > watermark:
+                _fold_into_cache(conn, cache, session_filter, scope, rowid_range=window)
+            for chunk in filled:
+                _fold_into_cache(conn, cache, session_filter, scope, rowids=chunk)
+            cache.executemany(
+                "DELETE FROM pending_runs WHERE scope = ? AND run_rowid = ?",
+                ((scope, rowid) for chunk in filled for rowid in chunk),
+            )
+            cache.executemany(
+                "INSERT OR IGNORE INTO pending_runs (scope, run_rowid) VALUES (?, ?)",
+                ((scope, rowid) for rowid in pending_rowids(conn, window)),
+            )
+            cache.execute("""
+                INSERT INTO cache_meta (scope, watermark, fingerprint) VALUES (?, ?, ?)
+                ON CONFLICT (scope) DO UPDATE SET
+                    watermark = excluded.watermark,
+                    fingerprint = excluded.fingerprint
+            """, (scope, max_rowid, fingerprint))
+    return watermark, max_rowid, backfilled
+
+
+def _fold_into_cache(
+    conn: sqlite3.Connection,
+    cache: sqlite3.Connection,
+    session_filter: str | None,
+    scope: str,
+    rowid_range: tuple[int, int] | None = None,
+    rowids: list[int] | None = None,
+) -> None:
+    """Add the aggregates of one rowid window or rowid list to the cached totals."""
+    for s in iter_session_aggregates(conn, session_filter, rowid_range, rowids):
+        cache.execute("""
+            INSERT INTO session_totals (
+                scope, session_id, agent_count, total_input, total_output,
+                total_tokens, actual_cost, projected_cost
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (scope, session_id) DO UPDATE SET
+                agent_count = agent_count + excluded.agent_count,
+                total_input = total_input + excluded.total_input,
+                total_output = total_output + excluded.total_output,
+                total_tokens = total_tokens + excluded.total_tokens,
+                actual_cost = actual_cost + excluded.actual_cost,
+                projected_cost = projected_cost + excluded.projected_cost
+        """, (
+            scope, s["session_id"], s["agent_count"], s["total_input"], s["total_output"],
+            s["total_tokens"], s["actual_cost"], s["projected_cost"],
+        ))
+    for g in iter_agent_tier_groups(conn, session_filter, rowid_range, rowids):
+        cache.execute("""
+            INSERT INTO agent_tier_totals (
+                scope, agent, tier, projected_tier, runs,
+                actual_cost, projected_cost, first_seq, last_seq
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (scope, agent, tier, projected_tier) DO UPDATE SET
+                runs = runs + excluded.runs,
+                actual_cost = actual_cost + excluded.actual_cost,
+                projected_cost = projected_cost + excluded.projected_cost,
+                first_seq = MIN(first_seq, excluded.first_seq),
+                last_seq = MAX(last_seq, excluded.last_seq)
+        """, (
+            scope, g["agent"], g["tier"], g["projected_tier"], g["runs"],
+            g["actual_cost"], g["projected_cost"], g["first_seq"], g["last_seq"],
+        ))
+
+
+def load_cached_aggregates(
+    cache: sqlite3.Connection,
+    session_filter: str | None = None,
+) -> tuple[list[dict], dict[str, dict]]:
+    """Read session summaries and agent stats for a scope back out of the cache."""
+    scope = session_filter or ""
+    sessions = [
+        finalize_session(dict(row))
+        for row in cache.execute("""
+            SELECT session_id, agent_count, total_input, total_output, total_tokens,
+                   actual_cost, projected_cost
+            FROM session_totals WHERE scope = ? ORDER BY session_id
+        """, (scope,))
+    ]
+    groups = (
+        dict(row)
+        for row in cache.execute("""
+            SELECT agent, tier, projected_tier, runs, actual_cost, projected_cost, first_seq, last_seq
+            FROM agent_tier_totals WHERE scope = ? ORDER BY first_seq
+        """, (scope,))
+    )
+    return sessions, fold_agent_tier_groups(groups)
+
+
 def normalize_agent_name(agent: str) -> str:
     """Extract the fd-* agent name from various formats."""
     for prefix in ("interflux:review:", "interflux:"):
@@ -129,25 +728,150 @@ def estimate_cost(input_tokens: int, output_tokens: int, tier: str) -> float:
     return (input_tokens * costs["input"] + output_tokens * costs["output"]) / 1_000_000
 
 
-def parse_shadow_logs(shadow_dir: Path) -> dict[str, list[dict]]:
-    """Parse B2-shadow routing logs from stderr captures."""
-    results: dict[str, list[dict]] = {}
+SHADOW_MARKER = b"[B2-shadow]"
+SHADOW_STATE_NAME = ".routing-shadow-state.json"
+SHADOW_STATE_VERSION = 2
+# Below this many unparsed bytes, process start-up costs more than it saves.
+SHADOW_PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+# Leading bytes hashed to recognise a file that was truncated and rewritten.
+SHADOW_HEAD_BYTES = 1024
+
+# (complexity, base_model, projected_model) -> number of shadow log lines
+ShadowCounts = Counter
+
+
+def scan_shadow_file(path: str, start: int) -> tuple[list[list], int, list[list]]:
+    """Count B2-shadow decisions in ``path`` from byte offset ``start``.
+
+    The file is memory-mapped and only lines containing the ``[B2-shadow]``
+    marker are decoded and matched against SHADOW_PATTERN. Returns
+    ``(counts, end, tail_counts)`` where ``end`` is the offset just past the
+    last complete line; a trailing line without a newline is counted in
+    ``tail_counts`` only, so it is re-read once the writer finishes it.
+    Counts are ``[complexity, base, projected, n]`` lists so that they pickle
+    and serialize compactly.
+    """
+    counts: Counter = Counter()
+    tail: Counter = Counter()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= start:
+            return [], start, []
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            last_newline = mm.rfind(b"\n", start, size)
+            end = last_newline + 1 if last_newline >= 0 else start
+            pos = mm.find(SHADOW_MARKER, start, size)
+            while pos >= 0:
+                line_start = mm.rfind(b"\n", start, pos) + 1 or start
+                line_end = mm.find(b"\n", pos, size)
+                if line_end < 0:
+                    line_end = size
+                m = SHADOW_PATTERN.search(mm[line_start:line_end].decode("utf-8", errors="replace"))
+                if m:
+                    (counts if line_end < end else tail)[m.groups()] += 1
+                pos = mm.find(SHADOW_MARKER, line_end, size)
+    return (
+        [[*key, n] for key, n in counts.items()],
+        end,
+        [[*key, n] for key, n in tail.items()],
+    )
+
+
+def _counts_from_rows(rows: list[list]) -> Counter:
+    return Counter({tuple(row[:3]): row[3] for row in rows})
+
+
+def shadow_head(path: Path, length: int) -> str:
+    """Hash of the first ``length`` bytes of ``path``."""
+    with path.open("rb") as f:
+        return hashlib.blake2b(f.read(length), digest_size=16).hexdigest()
+
+
+def load_shadow_state(state_path: Path) -> dict:
+    try:
+        state = json.loads(state_path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if state.get("version") != SHADOW_STATE_VERSION:
+        return {}
+    return state.get("files", {})
+
+
+def save_shadow_state(state_path: Path, files: dict) -> None:
+    tmp = state_path.with_name(state_path.name + ".tmp")
+    try:
+        tmp.write_text(json.dumps({"version": SHADOW_STATE_VERSION, "files": files}))
+        tmp.replace(state_path)
+    except OSError as exc:
+        print(f"Warning: could not save shadow log offsets to {state_path}: {exc}", file=sys.stderr)
+
+
+def scan_shadow_logs(
+    shadow_dir: Path,
+    state_path: Path | None = None,
+    workers: int | None = None,
+) -> dict[str, ShadowCounts]:
+    """Count B2-shadow routing decisions per repo from stderr captures.
+
+    With ``state_path``, per-file byte offsets and the counts up to them are
+    persisted, so later runs only read bytes appended since. A file that
+    shrank, was replaced (new inode) or whose first SHADOW_HEAD_BYTES changed
+    (copytruncate rotation that regrew past the offset) is rescanned from
+    the start. Files
+    with enough unparsed bytes are fanned out across a process pool.
+    """
+    results: dict[str, ShadowCounts] = {}
     if not shadow_dir.exists():
         return results
 
-    for log_file in shadow_dir.glob("routing-shadow-*.log"):
-        repo_name = log_file.stem.replace("routing-shadow-", "")
-        entries = []
-        for line in log_file.read_text().splitlines():
-            m = SHADOW_PATTERN.search(line)
-            if m:
-                entries.append({
-                    "complexity": m.group(1),
-                    "base_model": m.group(2),
-                    "projected_model": m.group(3),
-                })
-        results[repo_name] = entries
+    previous = load_shadow_state(state_path) if state_path else {}
+    files: dict[str, dict] = {}
+    pending: list[tuple[str, Path, int]] = []
+
+    for log_file in sorted(shadow_dir.glob("routing-shadow-*.log")):
+        st = log_file.stat()
+        entry = previous.get(log_file.name)
+        if (
+            not entry
+            or entry["inode"] != st.st_ino
+            or entry["offset"] > st.st_size
+            or shadow_head(log_file, entry["head_len"]) != entry["head"]
+        ):
+            entry = {"inode": st.st_ino, "offset": 0, "counts": [], "head_len": 0, "head": shadow_head(log_file, 0)}
+        files[log_file.name] = entry
+        if st.st_size > entry["offset"]:
+            pending.append((log_file.name, log_file, st.st_size - entry["offset"]))
+
+    def apply(name: str, parsed: tuple[list[list], int, list[list]]) -> None:
+        counts, end, tail = parsed
+        entry = files[name]
+        merged = _counts_from_rows(entry["counts"]) + _counts_from_rows(counts)
+        entry["counts"] = [[*key, n] for key, n in merged.items()]
+        entry["offset"] = end
+        entry["tail"] = tail
+        if entry["head_len"] < SHADOW_HEAD_BYTES:
+            entry["head_len"] = min(end, SHADOW_HEAD_BYTES)
+            entry["head"] = shadow_head(shadow_dir / name, entry["head_len"])
+
+    unparsed = sum(size for _, _, size in pending)
+    if len(pending) > 1 and unparsed >= SHADOW_PARALLEL_MIN_BYTES and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(pending))) as pool:
+            futures = {
+                pool.submit(scan_shadow_file, str(path), files[name]["offset"]): name
+                for name, path, _ in pending
+            }
+            for future, name in futures.items():
+                apply(name, future.result())
+    else:
+        for name, path, _ in pending:
+            apply(name, scan_shadow_file(str(path), files[name]["offset"]))
 
+    for name, entry in files.items():
+        repo_name = Path(name).stem.replace("routing-shadow-", "")
+        results[repo_name] = _counts_from_rows(entry["counts"]) + _counts_from_rows(entry.pop("tail", []))
+
+    if state_path:
+        save_shadow_state(state_path, files)
     return results
 
 
@@ -204,10 +928,7 @@ def analyze_session(session_id: str, runs: list[dict]) -> dict:
         actual_cost += cost
         projected_cost += proj_cost
 
-    savings = actual_cost - projected_cost if actual_cost > 0 else 0
-    savings_pct = (savings / actual_cost * 100) if actual_cost > 0 else 0
-
-    return {
+    return finalize_session({
         "session_id": session_id,
         "agent_count": len(agents),
         "agents": agents,
@@ -216,11 +937,261 @@ def analyze_session(session_id: str, runs: list[dict]) -> dict:
         "total_tokens": total_tokens,
         "actual_cost": actual_cost,
         "projected_cost": projected_cost,
-        "savings": savings,
-        "savings_pct": savings_pct,
+    })
+
+
+def finalize_session(session: dict) -> dict:
+    """Fill in savings fields from a session's actual and projected cost."""
+    actual_cost = session["actual_cost"]
+    savings = actual_cost - session["projected_cost"] if actual_cost > 0 else 0
+    session["savings"] = savings
+    session["savings_pct"] = (savings / actual_cost * 100) if actual_cost > 0 else 0
+    return session
+
+
+def new_agent_stats() -> dict:
+    return {
+        "runs": 0, "actual_tiers": defaultdict(int), "projected_tier": "",
+        "total_actual_cost": 0.0, "total_projected_cost": 0.0,
     }
 
 
+def aggregate_agent_stats(sessions: list[dict]) -> dict[str, dict]:
+    """Roll per-run agent rows from analyze_session() up into per-agent stats."""
+    agent_stats: dict[str, dict] = defaultdict(new_agent_stats)
+
+    for s in sessions:
+        for a in s["agents"]:
+            agent = a["agent"]
+            stats = agent_stats[agent]
+            stats["runs"] += 1
+            stats["actual_tiers"][a["model_tier"]] += 1
+            stats["projected_tier"] = a["projected_tier"]
+            stats["total_actual_cost"] += a["actual_cost"]
+            stats["total_projected_cost"] += a["projected_cost"]
+
+    return agent_stats
+
+
+# ---------------------------------------------------------------------------
+# Routing policy what-if simulation
+# ---------------------------------------------------------------------------
+
+# Tiers a policy may assign, cheapest first. Index 3 ("unknown") costs nothing.
+POLICY_TIERS = ("haiku", "sonnet", "opus")
+SIM_TIERS = POLICY_TIERS + ("unknown",)
+DEFAULT_CACHE_DISCOUNTS = (0.0, 0.9)
+NO_ROLE = -1
+
+
+@dataclass
+class RunColumns:
+    """Flux-drive runs held as parallel typed arrays, one element per run.
+
+    ``session``, ``agent`` and ``tier`` index into ``session_ids``, ``agents``
+    and SIM_TIERS; ``role`` indexes ``roles`` or is NO_ROLE for agents
+    without an AGENT_ROLES entry.
+    """
+
+    session_ids: list[str] = field(default_factory=list)
+    agents: list[str] = field(default_factory=list)
+    roles: tuple[str, ...] = ()
+    session: array = field(default_factory=lambda: array("l"))
+    agent: array = field(default_factory=lambda: array("l"))
+    role: array = field(default_factory=lambda: array("b"))
+    tier: array = field(default_factory=lambda: array("b"))
+    input_tokens: array = field(default_factory=lambda: array("q"))
+    output_tokens: array = field(default_factory=lambda: array("q"))
+    cache_read_tokens: array = field(default_factory=lambda: array("q"))
+
+    def __len__(self) -> int:
+        return len(self.session)
+
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    """A tier per AGENT_ROLES role plus the fraction of input price saved on cache reads."""
+
+    role_tiers: tuple[str, ...]
+    cache_discount: float
+
+    def describe(self, roles: tuple[str, ...]) -> str:
+        tiers = ", ".join(f"{role}={tier}" for role, tier in zip(roles, self.role_tiers))
+        return f"{tiers}; cache -{self.cache_discount:.0%}"
+
+
+def load_run_columns(conn: sqlite3.Connection, session_filter: str | None = None) -> RunColumns:
+    """Stream flux-drive runs from the database into a RunColumns in one pass."""
+    roles = tuple(sorted({role for role, _ in AGENT_ROLES.values()}))
+    role_index = {role: i for i, role in enumerate(roles)}
+    tier_index = {tier: i for i, tier in enumerate(SIM_TIERS)}
+    cols = RunColumns(roles=roles)
+    session_index: dict[str, int] = {}
+    agent_index: dict[str, int] = {}
+
+    sql, params = flux_drive_runs_sql(conn, session_filter)
+    for row in conn.execute(sql, params):
+        sid = row["session_id"]
+        s = session_index.get(sid)
+        if s is None:
+            s = session_index[sid] = len(cols.session_ids)
+            cols.session_ids.append(sid)
+        agent = normalize_agent_name(row["agent"])
+        a = agent_index.get(agent)
+        if a is None:
+            a = agent_index[agent] = len(cols.agents)
+            cols.agents.append(agent)
+        role_info = AGENT_ROLES.get(agent)
+        cols.session.append(s)
+        cols.agent.append(a)
+        cols.role.append(role_index[role_info[0]] if role_info else NO_ROLE)
+        cols.tier.append(tier_index[compute_model_tier(row["model"])])
+        cols.input_tokens.append(row["input_tokens"] or 0)
+        cols.output_tokens.append(row["output_tokens"] or 0)
+        cols.cache_read_tokens.append(row["cache_read_tokens"] or 0)
+    return cols
+
+
+def enumerate_policies(
+    roles: tuple[str, ...],
+    cache_discounts: tuple[float, ...] = DEFAULT_CACHE_DISCOUNTS,
+) -> list[RoutingPolicy]:
+    """Every assignment of POLICY_TIERS to roles, crossed with each cache discount."""
+    return [
+        RoutingPolicy(role_tiers=tiers, cache_discount=discount)
+        for discount in cache_discounts
+        for tiers in itertools.product(POLICY_TIERS, repeat=len(roles))
+    ]
+
+
+def parse_cache_discounts(value: str) -> tuple[float, ...]:
+    """argparse type for --cache-discounts: comma-separated fractions in [0, 1]."""
+    discounts = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        try:
+            discount = float(part)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"not a number: {part!r}") from None
+        if not 0.0 <= discount <= 1.0:
+            raise argparse.ArgumentTypeError(f"cache discount {part} is outside [0, 1]")
+        discounts.append(discount)
+    if not discounts:
+        raise argparse.ArgumentTypeError("expected at least one cache discount")
+    return tuple(discounts)
+
+
+def _scaled(column: array, rate: float) -> Iterator[float]:
+    return map(operator.mul, column, itertools.repeat(rate))
+
+
+def build_session_columns(cols: RunColumns) -> tuple[list[tuple[array, array, array]], array, array, array]:
+    """Reduce runs to per-session token columns, one element per session.
+
+    Cost is linear in tokens, so per session a policy only needs input,
+    output and cache-read sums for each role. Runs whose agent has no role
+    keep their actual tier under every policy, so they collapse to a
+    cache-independent cost plus a cache-read cost at full input price.
+
+    Returns ``(role_tokens, other_cost, other_cache_cost, baseline)`` where
+    ``role_tokens[r]`` is ``(input, output, cache_read)`` for ``cols.roles[r]``
+    and ``baseline`` is each session's cost at actual tiers with cache reads
+    billed at the full input price.
+    """
+    n = len(cols.session_ids)
+
+    def zeros() -> array:
+        return array("d", bytes(8 * n))
+
+    role_tokens = [(zeros(), zeros(), zeros()) for _ in cols.roles]
+    other_cost, other_cache_cost, baseline = zeros(), zeros(), zeros()
+    in_rate = [MODEL_COSTS.get(t, {}).get("input", 0.0) / 1_000_000 for t in SIM_TIERS]
+    out_rate = [MODEL_COSTS.get(t, {}).get("output", 0.0) / 1_000_000 for t in SIM_TIERS]
+
+    for s, role, tier, inp, out, cached in zip(
+        cols.session, cols.role, cols.tier, cols.input_tokens, cols.output_tokens, cols.cache_read_tokens
+    ):
+        cost = inp * in_rate[tier] + out * out_rate[tier]
+        cache_cost = cached * in_rate[tier]
+        baseline[s] += cost + cache_cost
+        if role == NO_ROLE:
+            other_cost[s] += cost
+            other_cache_cost[s] += cache_cost
+        else:
+            tokens = role_tokens[role]
+            tokens[0][s] += inp
+            tokens[1][s] += out
+            tokens[2][s] += cached
+    return role_tokens, other_cost, other_cache_cost, baseline
+
+
+def score_policies(cols: RunColumns, policies: list[RoutingPolicy]) -> list[dict]:
+    """Cost every policy against every session and rank by total savings.
+
+    Per-session cost vectors are precomputed once per (role, tier, cache
+    discount); a policy's session costs are then the element-wise sum of one
+    vector per role plus the fixed no-role vector, so scoring N policies over
+    M sessions runs as C-level map/zip passes rather than per-run Python.
+    """
+    role_tokens, other_cost, other_cache_cost, baseline = build_session_columns(cols)
+    baseline_total = sum(baseline)
+
+    fixed: dict[float, array] = {}
+    role_costs: dict[tuple[int, str, float], array] = {}
+    for discount in sorted({p.cache_discount for p in policies}):
+        keep = 1.0 - discount
+        fixed[discount] = array("d", map(operator.add, other_cost, _scaled(other_cache_cost, keep)))
+        for r, (inp, out, cached) in enumerate(role_tokens):
+            for tier in POLICY_TIERS:
+                in_rate = MODEL_COSTS[tier]["input"] / 1_000_000
+                out_rate = MODEL_COSTS[tier]["output"] / 1_000_000
+                role_costs[r, tier, discount] = array("d", map(
+                    operator.add,
+                    map(operator.add, _scaled(inp, in_rate), _scaled(out, out_rate)),
+                    _scaled(cached, in_rate * keep),
+                ))
+
+    ranking = []
+    for policy in policies:
+        vectors = [fixed[policy.cache_discount]] + [
+            role_costs[r, tier, policy.cache_discount] for r, tier in enumerate(policy.role_tiers)
+        ]
+        costs = list(map(sum, zip(*vectors)))
+        total = sum(costs)
+        savings = baseline_total - total
+        ranking.append({
+            "policy": policy,
+            "cost": total,
+            "savings": savings,
+            "savings_pct": (savings / baseline_total * 100) if baseline_total > 0 else 0.0,
+            "sessions_worse": sum(map(operator.gt, costs, map(operator.add, baseline, itertools.repeat(1e-12)))),
+        })
+    ranking.sort(key=lambda r: -r["savings"])
+    return ranking
+
+
+def format_policy_ranking(fmt: str, cols: RunColumns, ranking: list[dict], top: int) -> str:
+    """Render the top of a score_policies() ranking as a table."""
+    current = tuple(
+        next(tier for _, (role_name, tier) in sorted(AGENT_ROLES.items()) if role_name == role)
+        for role in cols.roles
+    )
+    headers = ["Rank", "Policy", "Cost", "Savings", "Savings %", "Sessions Worse"]
+    rows = []
+    for rank, r in enumerate(ranking[:top], start=1):
+        label = r["policy"].describe(cols.roles)
+        if r["policy"].role_tiers == current:
+            label += " (B2 tiers)"
+        rows.append([
+            str(rank),
+            label,
+            f"${r['cost']:.4f}",
+            f"${r['savings']:.4f}",
+            f"{r['savings_pct']:.1f}%",
+            f"{r['sessions_worse']}/{len(cols.session_ids)}",
+        ])
+    return format_table(fmt, headers, rows)
+
+
 def format_table(fmt: str, headers: list[str], rows: list[list[str]]) -> str:
     """Format a table in markdown or plain text."""
     if fmt == "markdown":
@@ -238,13 +1209,24 @@ def format_table(fmt: str, headers: list[str], rows: list[list[str]]) -> str:
         return "\n".join(lines)
 
 
-def generate_report(sessions: list[dict], shadow_data: dict, fmt: str) -> str:
-    """Generate the full analysis report."""
+def generate_report(
+    sessions: list[dict],
+    shadow_data: dict[str, ShadowCounts],
+    fmt: str,
+    agent_stats: dict[str, dict] | None = None,
+    policy_table: str | None = None,
+) -> str:
+    """Generate the full analysis report.
+
+    ``agent_stats`` may be passed precomputed (e.g. by aggregate_in_sql); otherwise
+    it is derived from each session's ``agents`` list. ``policy_table`` is a
+    rendered format_policy_ranking() table for the what-if section.
+    """
     lines = []
 
     if fmt == "markdown":
         lines.append("# Heterogeneous Routing Experiment Results\n")
-        lines.append(f"**Date:** {__import__('datetime').date.today()}")
+        lines.append(f"**Date:** {datetime.date.today()}")
         lines.append(f"**Sessions analyzed:** {len(sessions)}\n")
 
     # Summary table
@@ -277,20 +1259,8 @@ def generate_report(sessions: list[dict], shadow_data: dict, fmt: str) -> str:
     # Per-agent analysis
     lines.append("\n## Per-Agent Model Tier Analysis\n" if fmt == "markdown" else "\n=== Per-Agent Tiers ===\n")
 
-    agent_stats: dict[str, dict] = defaultdict(lambda: {
-        "runs": 0, "actual_tiers": defaultdict(int), "projected_tier": "",
-        "total_actual_cost": 0.0, "total_projected_cost": 0.0,
-    })
-
-    for s in sessions:
-        for a in s["agents"]:
-            agent = a["agent"]
-            stats = agent_stats[agent]
-            stats["runs"] += 1
-            stats["actual_tiers"][a["model_tier"]] += 1
-            stats["projected_tier"] = a["projected_tier"]
-            stats["total_actual_cost"] += a["actual_cost"]
-            stats["total_projected_cost"] += a["projected_cost"]
+    if agent_stats is None:
+        agent_stats = aggregate_agent_stats(sessions)
 
     headers = ["Agent", "Role", "Runs", "Current Tier(s)", "Projected", "Savings %"]
     rows = []
@@ -310,12 +1280,20 @@ def generate_report(sessions: list[dict], shadow_data: dict, fmt: str) -> str:
         lines.append("\n## Shadow Routing Divergence\n" if fmt == "markdown" else "\n=== Shadow Data ===\n")
         headers = ["Repo", "Shadow Entries", "Downgrades", "Upgrades"]
         rows = []
-        for repo, entries in sorted(shadow_data.items()):
-            downgrades = sum(1 for e in entries if _tier_rank(e["projected_model"]) < _tier_rank(e["base_model"]))
-            upgrades = sum(1 for e in entries if _tier_rank(e["projected_model"]) > _tier_rank(e["base_model"]))
-            rows.append([repo, str(len(entries)), str(downgrades), str(upgrades)])
+        for repo, counts in sorted(shadow_data.items()):
+            downgrades = sum(n for (_, base, projected), n in counts.items() if _tier_rank(projected) < _tier_rank(base))
+            upgrades = sum(n for (_, base, projected), n in counts.items() if _tier_rank(projected) > _tier_rank(base))
+            rows.append([repo, str(sum(counts.values())), str(downgrades), str(upgrades)])
         lines.append(format_table(fmt, headers, rows))
 
+    if policy_table:
+        lines.append("\n## Routing Policy What-If\n" if fmt == "markdown" else "\n=== Policy What-If ===\n")
+        lines.append("Costs here include cache reads at (1 - discount) x input price, so they are "
+                     "not comparable with the B1/B2 totals above, which leave cache reads out. "
+                     "Baseline: actual tiers, cache reads at full input price. "
+                     "Agents without a role keep their actual tier.\n")
+        lines.append(policy_table)
+
     # Recommendations
     lines.append("\n## Routing Recommendations\n" if fmt == "markdown" else "\n=== Recommendations ===\n")
     if total_pct > 5:
@@ -337,38 +1315,520 @@ def _tier_rank(tier: str) -> int:
     return {"haiku": 1, "sonnet": 2, "opus": 3}.get(tier, 0)
 
 
+# ---------------------------------------------------------------------------
+# Structured output (json / csv / parquet)
+# ---------------------------------------------------------------------------
+
+STRUCTURED_FORMATS = ("json", "csv", "parquet")
+PARQUET_BATCH_ROWS = 10_000
+
+# Each *_TYPES tuple names the pyarrow type factory for the matching field, so
+# Parquet schemas never depend on which values the first batch happens to hold.
+SESSION_FIELDS = (
+    "session_id", "agent_count", "total_input", "total_output", "total_tokens",
+    "actual_cost", "projected_cost", "savings", "savings_pct",
+)
+SESSION_TYPES = ("string", "int64", "int64", "int64", "int64", "float64", "float64", "float64", "float64")
+AGENT_FIELDS = (
+    ("agent", "role", "runs")
+    + tuple(f"runs_{tier}" for tier in SIM_TIERS)
+    + ("projected_tier", "actual_cost", "projected_cost", "savings", "savings_pct")
+)
+AGENT_TYPES = (
+    ("string", "string", "int64")
+    + ("int64",) * len(SIM_TIERS)
+    + ("string", "float64", "float64", "float64", "float64")
+)
+SHADOW_FIELDS = ("repo", "complexity", "base_model", "projected_model", "count")
+SHADOW_TYPES = ("string", "string", "string", "string", "int64")
+POLICY_FIELDS = ("rank", "policy", "cache_discount", "cost", "savings", "savings_pct", "sessions_worse")
+POLICY_TYPES = ("int64", "string", "float64", "float64", "float64", "float64", "int64")
+PARQUET_TYPES = {
+    SESSION_FIELDS: SESSION_TYPES,
+    AGENT_FIELDS: AGENT_TYPES,
+    SHADOW_FIELDS: SHADOW_TYPES,
+    POLICY_FIELDS: POLICY_TYPES,
+}
+
+
+def session_records(sessions: Iterable[dict]) -> Iterator[dict]:
+    for s in sessions:
+        yield {name: s[name] for name in SESSION_FIELDS}
+
+
+def agent_records(agent_stats: dict[str, dict]) -> Iterator[dict]:
+    for agent in sorted(agent_stats):
+        stats = agent_stats[agent]
+        actual = stats["total_actual_cost"]
+        projected = stats["total_projected_cost"]
+        record = {
+            "agent": agent,
+            "role": AGENT_ROLES.get(agent, (None, None))[0],
+            "runs": stats["runs"],
+        }
+        for tier in SIM_TIERS:
+            record[f"runs_{tier}"] = stats["actual_tiers"].get(tier, 0)
+        record.update({
+            "projected_tier": stats["projected_tier"],
+            "actual_cost": actual,
+            "projected_cost": projected,
+            "savings": actual - projected,
+            "savings_pct": ((actual - projected) / actual * 100) if actual > 0 else 0.0,
+        })
+        yield record
+
+
+def shadow_records(shadow_data: dict[str, ShadowCounts]) -> Iterator[dict]:
+    for repo, counts in sorted(shadow_data.items()):
+        for (complexity, base, projected), n in sorted(counts.items()):
+            yield {"repo": repo, "complexity": complexity, "base_model": base,
+                   "projected_model": projected, "count": n}
+
+
+def policy_records(columns: RunColumns, ranking: list[dict], top: int) -> Iterator[dict]:
+    for rank, r in enumerate(ranking[:top], start=1):
+        policy = r["policy"]
+        yield {
+            "rank": rank,
+            "policy": ", ".join(f"{role}={tier}" for role, tier in zip(columns.roles, policy.role_tiers)),
+            "cache_discount": policy.cache_discount,
+            "cost": r["cost"],
+            "savings": r["savings"],
+            "savings_pct": r["savings_pct"],
+            "sessions_worse": r["sessions_worse"],
+        }
+
+
+def write_json(out: TextIO, tables: dict[str, Iterable[dict]], meta: dict) -> None:
+    """Write one JSON object with ``meta`` keys and one array per table, row by row."""
+    out.write("{")
+    for key, value in meta.items():
+        out.write(f"{json.dumps(key)}: {json.dumps(value)}, ")
+    for t, (name, records) in enumerate(tables.items()):
+        out.write(f"{', ' if t else ''}{json.dumps(name)}: [")
+        for i, record in enumerate(records):
+            out.write(("," if i else "") + "\n  " + json.dumps(record))
+        out.write("\n]")
+    out.write("}\n")
+
+
+def write_csv_tables(out_dir: Path, tables: dict[str, tuple[tuple[str, ...], Iterable[dict]]]) -> list[Path]:
+    """Write each table to ``<out_dir>/<name>.csv``; returns the paths written."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, (fields, records) in tables.items():
+        path = out_dir / f"{name}.csv"
+        with path.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(records)
+        written.append(path)
+    return written
+
+
+def write_parquet_tables(out_dir: Path, tables: dict[str, tuple[tuple[str, ...], Iterable[dict]]]) -> list[Path]:
+    """Write each table to ``<out_dir>/<name>.parquet`` in row batches (needs pyarrow)."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Error: --format parquet requires pyarrow (pip install pyarrow)")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, (fields, records) in tables.items():
+        path = out_dir / f"{name}.parquet"
+        schema = pyarrow.schema([(f, getattr(pyarrow, t)()) for f, t in zip(fields, PARQUET_TYPES[fields])])
+        batch_iter = iter(records)
+        with pyarrow.parquet.ParquetWriter(str(path), schema) as writer:
+            while True:
+                batch = list(itertools.islice(batch_iter, PARQUET_BATCH_ROWS))
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                if len(batch) < PARQUET_BATCH_ROWS:
+                    break
+        written.append(path)
+    return written
+
+
+def emit_structured(
+    fmt: str,
+    output: Path | None,
+    sessions: list[dict],
+    agent_stats: dict[str, dict],
+    shadow_data: dict[str, ShadowCounts],
+    policies: tuple[RunColumns, list[dict], int] | None = None,
+) -> None:
+    """Write the session, agent, shadow and policy tables without rendering text tables.
+
+    JSON goes to ``output`` (or stdout) as a single document. CSV and Parquet
+    write one file per table into the ``output`` directory.
+    """
+    tables: dict[str, tuple[tuple[str, ...], Iterable[dict]]] = {
+        "sessions": (SESSION_FIELDS, session_records(sessions)),
+        "agents": (AGENT_FIELDS, agent_records(agent_stats)),
+    }
+    if shadow_data:
+        tables["shadow"] = (SHADOW_FIELDS, shadow_records(shadow_data))
+    if policies:
+        tables["policies"] = (POLICY_FIELDS, policy_records(*policies))
+
+    if fmt == "json":
+        total_actual = sum(s["actual_cost"] for s in sessions)
+        total_projected = sum(s["projected_cost"] for s in sessions)
+        meta = {
+            "generated": datetime.date.today().isoformat(),
+            "session_count": len(sessions),
+            "total_actual_cost": total_actual,
+            "total_projected_cost": total_projected,
+            "total_savings_pct": ((total_actual - total_projected) / total_actual * 100) if total_actual > 0 else 0.0,
+        }
+        records = {name: rows for name, (_, rows) in tables.items()}
+        if output:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with output.open("w", encoding="utf-8") as f:
+                write_json(f, records, meta)
+            print(f"Report written to {output}", file=sys.stderr)
+        else:
+            write_json(sys.stdout, records, meta)
+        return
+
+    if output is None:
+        raise SystemExit(f"Error: --format {fmt} writes one file per table; pass --output DIR")
+    writer = write_csv_tables if fmt == "csv" else write_parquet_tables
+    for path in writer(output, tables):
+        print(f"Table written to {path}", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# Watch mode
+# ---------------------------------------------------------------------------
+
+# (label, window seconds, bucket seconds)
+WATCH_WINDOWS = (("1h", 3600, 60), ("24h", 86400, 900), ("7d", 7 * 86400, 3600))
+WATCH_METRICS = (
+    "runs", "total_tokens", "actual_cost", "projected_cost",
+    "shadow_entries", "shadow_downgrades", "shadow_upgrades",
+)
+
+
+class RollingWindow:
+    """Trailing time window kept as a ring buffer of fixed-width buckets.
+
+    Each bucket holds one sum per WATCH_METRICS entry. A slot is reused once
+    its bucket falls out of the window, so memory is constant no matter how
+    many events are added.
+    """
+
+    def __init__(self, span_seconds: int, bucket_seconds: int):
+        self.bucket_seconds = bucket_seconds
+        self.size = span_seconds // bucket_seconds
+        self.epochs = array("q", [-1] * self.size)
+        self.sums = [array("d", [0.0] * len(WATCH_METRICS)) for _ in range(self.size)]
+
+    def add(self, when: float, values: Iterable[float]) -> None:
+        epoch = int(when // self.bucket_seconds)
+        slot = epoch % self.size
+        if self.epochs[slot] != epoch:
+            if self.epochs[slot] > epoch:
+                return  # slot already holds a newer bucket: event is out of window
+            self.epochs[slot] = epoch
+            self.sums[slot] = array("d", [0.0] * len(WATCH_METRICS))
+        bucket = self.sums[slot]
+        for i, value in enumerate(values):
+            bucket[i] += value
+
+    def totals(self, now: float) -> dict[str, float]:
+        current = int(now // self.bucket_seconds)
+        result = [0.0] * len(WATCH_METRICS)
+        for epoch, bucket in zip(self.epochs, self.sums):
+            if current - self.size < epoch <= current:
+                result = list(map(operator.add, result, bucket))
+        return dict(zip(WATCH_METRICS, result))
+
+
+def parse_run_time(timestamp: str | None, default: float) -> float:
+    """Epoch seconds for an interstat timestamp (ISO 8601, naive means UTC)."""
+    if not timestamp:
+        return default
+    try:
+        parsed = datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return default
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def iter_priced_runs(
+    conn: sqlite3.Connection,
+    session_filter: str | None,
+    rowid_range: tuple[int, int] | None,
+    since: str | None = None,
+    rowids: list[int] | None = None,
+) -> Iterator[sqlite3.Row]:
+    """Stream timestamp, tokens and both cost estimates for each run in a rowid window or list."""
+    cte, cte_params, where_sql, where_params = build_pricing_cte(
+        session_filter, rowid_range, has_agent_family(conn), since, rowids
+    )
+    yield from conn.execute(f"""
+        {cte}
+        SELECT
+            r.timestamp,
+            r.total_tokens,
+            {_SQL_ACTUAL_COST} AS actual_cost,
+            {_SQL_PROJECTED_COST} AS projected_cost
+        FROM agent_runs r
+        {_SQL_PRICING_JOIN}
+        WHERE {where_sql}
+    """, cte_params + where_params)
+
+
+def watch_snapshot(windows: dict[str, RollingWindow], now: float, watermark: int) -> dict:
+    snapshot = {
+        "generated_at": datetime.datetime.fromtimestamp(now, datetime.timezone.utc).isoformat(timespec="seconds"),
+        "watermark": watermark,
+        "windows": {},
+    }
+    for label, window in windows.items():
+        totals = window.totals(now)
+        for key in WATCH_METRICS:
+            if key not in ("actual_cost", "projected_cost"):
+                totals[key] = int(totals[key])
+        savings = totals["actual_cost"] - totals["projected_cost"]
+        totals["savings"] = savings
+        totals["savings_pct"] = (savings / totals["actual_cost"] * 100) if totals["actual_cost"] > 0 else 0.0
+        snapshot["windows"][label] = totals
+    return snapshot
+
+
+def format_watch_snapshot(fmt: str, snapshot: dict) -> str:
+    if fmt == "json":
+        return json.dumps(snapshot)
+    headers = ["Window", "Runs", "Tokens", "B1 Cost", "B2 Projected", "Savings", "Savings %", "Shadow (down/up)"]
+    rows = []
+    for label, w in snapshot["windows"].items():
+        rows.append([
+            label,
+            f"{int(w['runs']):,}",
+            f"{int(w['total_tokens']):,}",
+            f"${w['actual_cost']:.4f}",
+            f"${w['projected_cost']:.4f}",
+            f"${w['savings']:.4f}",
+            f"{w['savings_pct']:.1f}%",
+            f"{int(w['shadow_entries'])} ({int(w['shadow_downgrades'])}/{int(w['shadow_upgrades'])})",
+        ])
+    title = f"Rolling routing savings at {snapshot['generated_at']} (rowid {snapshot['watermark']})"
+    heading = f"## {title}\n" if fmt == "markdown" else f"=== {title} ===\n"
+    return heading + "\n" + format_table(fmt, headers, rows) + "\n"
+
+
+def write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
+def watch(args: argparse.Namespace) -> int:
+    """Stay resident, folding new runs and shadow lines into rolling windows.
+
+    The database connection stays open; every tick reads only rows past the
+    last seen rowid, plus earlier rows that were waiting for their tokens and
+    have since been backfilled. Runs land in windows by their own timestamp,
+    so the first tick also seeds the windows from history, reading only runs
+    dated within the longest window (a timestamp index seek). A database error such
+    as a lock is reported and the tick's rows are retried on the next tick.
+    Shadow log lines carry no timestamps: they are counted at the tick that
+    first sees them, and lines already present at start-up only set the
+    baseline.
+    """
+    windows = {label: RollingWindow(span, bucket) for label, span, bucket in WATCH_WINDOWS}
+    longest = max(span for _, span, _ in WATCH_WINDOWS)
+    state_path = None
+    if args.shadow_dir and not args.no_shadow_state:
+        state_path = args.shadow_state or args.shadow_dir / SHADOW_STATE_NAME
+    previous_shadow: Counter | None = None
+    watermark = 0
+    pending: set[int] = set()  # rowids at or below watermark still waiting for tokens
+    ticks = 0
+
+    conn = connect_db(args.db)
+    try:
+        while True:
+            now = time.time()
+            try:
+                # Fetch everything in one snapshot before adding, so a failure
+                # mid-read or a backfill between queries cannot count a run twice.
+                runs: list[sqlite3.Row] = []
+                with read_snapshot(conn):
+                    max_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM agent_runs").fetchone()[0]
+                    if max_rowid < watermark:
+                        watermark = 0  # database was recreated; reseed
+                        pending.clear()
+                    filled = filled_rowids(conn, pending)
+                    for chunk in filled:
+                        runs.extend(iter_priced_runs(conn, args.session_filter, None, rowids=chunk))
+                    new_pending: list[int] = []
+                    if max_rowid > watermark:
+                        # Seeding reads only runs dated inside the longest window (date
+                        # granularity, so naive and Z-suffixed timestamps both compare).
+                        since = None
+                        if watermark == 0:
+                            since = datetime.datetime.fromtimestamp(now - longest, datetime.timezone.utc).date().isoformat()
+                        window_rows = (watermark, max_rowid)
+                        runs.extend(iter_priced_runs(conn, args.session_filter, window_rows, since))
+                        new_pending = pending_rowids(conn, window_rows)
+                for run in runs:
+                    values = (1, run["total_tokens"] or 0, run["actual_cost"], run["projected_cost"])
+                    when = parse_run_time(run["timestamp"], now)
+                    for window in windows.values():
+                        window.add(when, values)
+                pending.difference_update(rowid for chunk in filled for rowid in chunk)
+                pending.update(new_pending)
+                watermark = max_rowid
+            except sqlite3.OperationalError as e:
+                print(f"Warning: {e}; retrying next tick", file=sys.stderr)
+
+            if args.shadow_dir:
+                combined: Counter = Counter()
+                for counts in scan_shadow_logs(args.shadow_dir, state_path, args.shadow_workers).values():
+                    combined.update(counts)
+                if previous_shadow is not None:
+                    delta = combined - previous_shadow
+                    down = sum(n for (_, b, p), n in delta.items() if _tier_rank(p) < _tier_rank(b))
+                    up = sum(n for (_, b, p), n in delta.items() if _tier_rank(p) > _tier_rank(b))
+                    for window in windows.values():
+                        window.add(now, (0, 0, 0.0, 0.0, sum(delta.values()), down, up))
+                previous_shadow = combined
+
+            text = format_watch_snapshot(args.format, watch_snapshot(windows, now, watermark))
+            if args.output:
+                write_atomic(args.output, text + "\n")
+            else:
+                print(text, flush=True)
+
+            ticks += 1
+            if args.watch_count and ticks >= args.watch_count:
+                return 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        conn.close()
+
+
 def main(argv: list[str]) -> int:
     parser = argparse.ArgumentParser(description="Analyze routing experiment data")
     parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="interstat database path")
     parser.add_argument("--shadow-dir", type=Path, help="directory of B2-shadow log files")
+    parser.add_argument(
+        "--shadow-state", type=Path,
+        help=f"where to persist per-log byte offsets (default: <shadow-dir>/{SHADOW_STATE_NAME})",
+    )
+    parser.add_argument("--no-shadow-state", action="store_true", help="rescan shadow logs from the start every run")
+    parser.add_argument("--shadow-workers", type=int, help="processes for parsing shadow logs (default: CPU count)")
     parser.add_argument("--session-filter", help="filter sessions by date prefix (e.g., 2026-02-23)")
-    parser.add_argument("--format", choices=["plain", "markdown"], default="plain", help="output format")
-    parser.add_argument("--output", type=Path, help="write output to file instead of stdout")
+    parser.add_argument(
+        "--format", choices=["plain", "markdown", *STRUCTURED_FORMATS], default="plain",
+        help="output format; csv and parquet write one file per table into --output",
+    )
+    parser.add_argument("--output", type=Path, help="write output to file (directory for csv/parquet) instead of stdout")
+    parser.add_argument(
+        "--engine", choices=["python", "sql"], default="python",
+        help="aggregate runs in Python (default) or stream per-session/per-agent sums from SQLite",
+    )
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="keep aggregates in a sidecar cache and only fold in rows added since the last run (implies --engine sql)",
+    )
+    parser.add_argument("--cache-path", type=Path, help="cache file (default: routing-analysis-cache.db next to --db)")
+    parser.add_argument("--rebuild-cache", action="store_true", help="discard cached aggregates before refreshing")
+    parser.add_argument("--what-if", action="store_true", help="rank alternative per-role tier policies by savings")
+    parser.add_argument("--what-if-top", type=int, default=10, help="policies to show with --what-if (default: 10)")
+    parser.add_argument(
+        "--cache-discounts", type=parse_cache_discounts, default=DEFAULT_CACHE_DISCOUNTS,
+        help="comma-separated fractions of input price saved on cache reads, one policy set per value",
+    )
+    parser.add_argument(
+        "--ensure-indexes", action="store_true",
+        help="add an agent_family generated column and covering indexes to agent_runs "
+             "(modifies --db), printing EXPLAIN QUERY PLAN before and after",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="stay resident, tailing --db and --shadow-dir, and emit rolling 1h/24h/7d savings every --interval",
+    )
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between --watch snapshots (default: 60)")
+    parser.add_argument("--watch-count", type=int, default=0, help="exit after N --watch snapshots (default: run forever)")
     args = parser.parse_args(argv)
 
     if not args.db.exists():
         print(f"Error: interstat database not found at {args.db}", file=sys.stderr)
         return 1
 
+    if args.watch:
+        if args.format not in ("plain", "markdown", "json"):
+            print("Error: --watch supports --format plain, markdown or json", file=sys.stderr)
+            return 1
+        return watch(args)
+
+    agent_stats: dict[str, dict] | None = None
     conn = connect_db(args.db)
     try:
-        runs = query_flux_drive_reviews(conn, args.session_filter)
+        if args.ensure_indexes:
+            print_query_plans(conn, args.session_filter, "before --ensure-indexes")
+            for statement in ensure_indexes(conn):
+                print(f"Applied: {statement}", file=sys.stderr)
+            print_query_plans(conn, args.session_filter, "after --ensure-indexes")
+
+        if args.cache or args.cache_path or args.rebuild_cache:
+            cache = open_cache(args.cache_path or default_cache_path(args.db))
+            try:
+                if args.rebuild_cache:
+                    invalidate_cache(cache)
+                before, after, backfilled = refresh_cache(conn, cache, args.session_filter)
+                print(f"Cache: folded rowids {before + 1}..{after}" if after > before
+                      else f"Cache: up to date at rowid {after}", file=sys.stderr)
+                if backfilled:
+                    print(f"Cache: folded {backfilled} backfilled runs", file=sys.stderr)
+                sessions, agent_stats = load_cached_aggregates(cache, args.session_filter)
+            finally:
+                cache.close()
+        elif args.engine == "sql":
+            sessions, agent_stats = aggregate_in_sql(conn, args.session_filter)
+        else:
+            runs = query_flux_drive_reviews(conn, args.session_filter)
+            grouped = group_by_session(runs)
+            sessions = [analyze_session(sid, runs) for sid, runs in grouped.items()]
+
+        policies = None
+        if args.what_if:
+            columns = load_run_columns(conn, args.session_filter)
+            ranking = score_policies(columns, enumerate_policies(columns.roles, args.cache_discounts))
+            policies = (columns, ranking, args.what_if_top)
     finally:
         conn.close()
 
-    if not runs:
+    if not sessions:
         print("No flux-drive review data found in interstat.", file=sys.stderr)
         return 1
 
-    grouped = group_by_session(runs)
-    sessions = [analyze_session(sid, runs) for sid, runs in grouped.items()]
-
     # Parse shadow logs if available
-    shadow_data: dict[str, list[dict]] = {}
+    shadow_data: dict[str, ShadowCounts] = {}
     if args.shadow_dir:
-        shadow_data = parse_shadow_logs(args.shadow_dir)
-
-    report = generate_report(sessions, shadow_data, args.format)
+        state_path = None
+        if not args.no_shadow_state:
+            state_path = args.shadow_state or args.shadow_dir / SHADOW_STATE_NAME
+        shadow_data = scan_shadow_logs(args.shadow_dir, state_path, args.shadow_workers)
+
+    if args.format in STRUCTURED_FORMATS:
+        if agent_stats is None:
+            agent_stats = aggregate_agent_stats(sessions)
+        emit_structured(args.format, args.output, sessions, agent_stats, shadow_data, policies)
+        return 0
+
+    policy_table = format_policy_ranking(args.format, *policies) if policies else None
+    report = generate_report(sessions, shadow_data, args.format, agent_stats, policy_table)
 
     if args.output:
         args.output.parent.mkdir(parents=True, exist_ok=True)
@@ -35,7 +35,11 @@ import json
 import re
 import subprocess
 import sys
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from bead_index import DEFAULT_BEADS_DIR, BeadIndex, sql_literal
 
 # ---------------------------------------------------------------------------
 # Module detection
@@ -204,39 +208,182 @@ def add_label(issue_id: str, label: str, dry_run: bool) -> bool:
     return r.returncode == 0
 
 
-def bulk_insert_labels(pairs: list[tuple[str, str]], dry_run: bool, batch_size: int = 50) -> tuple[int, int]:
-    """Insert labels via direct SQL in batches. Returns (ok, failed)."""
-    if dry_run:
-        return len(pairs), 0
-    ok = 0
-    failed = 0
-    for i in range(0, len(pairs), batch_size):
-        batch = pairs[i:i + batch_size]
-        values = ", ".join(f'("{eid}", "{lab}")' for eid, lab in batch)
-        query = f"insert ignore into labels (issue_id, label) values {values}"
-        r = run(["bd", "sql", query])
-        if r.returncode == 0:
-            ok += len(batch)
+# bd sql failures that no batch split can fix: stop instead of bisecting.
+SYSTEMIC_ERROR_RE = re.compile(
+    r"connection refused|can't connect|cannot connect|server has gone away|no such host|"
+    r"database not found|not a beads|no beads database|unknown command|command not found",
+    re.IGNORECASE,
+)
+
+
+class WriteAborted(Exception):
+    """bd sql is failing for every batch (server down, misconfiguration)."""
+
+
+def label_insert_sql(pairs: list[tuple[str, str]]) -> str:
+    values = ", ".join(f"({sql_literal(eid)}, {sql_literal(lab)})" for eid, lab in pairs)
+    return f"insert ignore into labels (issue_id, label) values {values}"
+
+
+@dataclass
+class WriteStats:
+    ok: int = 0
+    failed: int = 0
+    statements: int = 0
+    bisections: int = 0
+    elapsed: float = 0.0
+    transaction: bool = False
+    final_batch: int = 0
+    failed_pairs: list[tuple[str, str]] = field(default_factory=list)
+    aborted: str = ""
+
+    def summary(self) -> str:
+        rate = self.ok / self.elapsed if self.elapsed else 0.0
+        mode = "1 transaction" if self.transaction else f"{self.statements} statements"
+        text = (
+            f"{self.ok} labels in {self.elapsed:.2f}s ({rate:,.0f}/s, {mode}, "
+            f"{self.bisections} bisections, final batch {self.final_batch})"
+        )
+        if self.aborted:
+            text += f"\naborted, {self.failed} labels not written: {self.aborted}"
+        return text
+
+
+class LabelWriter:
+    """Write (issue_id, label) pairs with as few bd/dolt invocations as possible.
+
+    With ``dolt_dir`` every insert is streamed through one ``dolt sql`` process
+    inside a single transaction. Otherwise (or if that transaction fails) pairs
+    go through ``bd sql`` in batches whose size adapts to latency: doubled while
+    a statement finishes under ``target_seconds``, halved after a failure. A
+    failed batch is bisected until the offending pairs are isolated, so one bad
+    row costs O(log n) extra statements instead of a subprocess per pair.
+
+    Bisection only helps with bad rows. If stderr matches SYSTEMIC_ERROR_RE,
+    or both halves of a split fail and a ``select 1`` probe fails too, the run
+    stops and every pair not yet written is reported as failed.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        max_batch: int = 2000,
+        target_seconds: float = 2.0,
+        dolt_dir: Path | None = None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.max_batch = max(self.batch_size, max_batch)
+        self.target_seconds = target_seconds
+        self.dolt_dir = dolt_dir
+        self.stats = WriteStats()
+        self._written: set[tuple[str, str]] = set()
+
+    def write(self, pairs: list[tuple[str, str]]) -> WriteStats:
+        start = time.perf_counter()
+        if self.dolt_dir is not None and self._write_transaction(pairs):
+            self.stats.ok += len(pairs)
+            self.stats.transaction = True
         else:
-            # Fall back to individual inserts
-            for eid, lab in batch:
-                r2 = run(["bd", "label", "add", eid, lab])
-                if r2.returncode == 0:
-                    ok += 1
-                else:
-                    failed += 1
-    return ok, failed
+            i = 0
+            while i < len(pairs):
+                batch = pairs[i:i + self.batch_size]
+                t0 = time.perf_counter()
+                self._written = set()
+                try:
+                    clean = self._write_batch(batch)
+                except WriteAborted as exc:
+                    unwritten = [p for p in pairs[i:] if p not in self._written]
+                    self.stats.failed += len(unwritten)
+                    self.stats.failed_pairs.extend(unwritten)
+                    self.stats.aborted = str(exc)
+                    break
+                i += len(batch)
+                if not clean:
+                    self.batch_size = max(1, self.batch_size // 2)
+                elif time.perf_counter() - t0 < self.target_seconds:
+                    self.batch_size = min(self.max_batch, self.batch_size * 2)
+        self.stats.final_batch = self.batch_size
+        self.stats.elapsed = time.perf_counter() - start
+        return self.stats
+
+    def _write_batch(self, batch: list[tuple[str, str]]) -> bool:
+        """Insert a batch, bisecting on failure. Returns True if it went in first try."""
+        if self._insert(batch):
+            return True
+        self._isolate(batch)
+        return False
+
+    def _insert(self, batch: list[tuple[str, str]]) -> bool:
+        self.stats.statements += 1
+        r = run(["bd", "sql", label_insert_sql(batch)])
+        if r.returncode == 0:
+            self.stats.ok += len(batch)
+            self._written.update(batch)
+            return True
+        err = (r.stderr or r.stdout or "").strip()
+        if SYSTEMIC_ERROR_RE.search(err):
+            raise WriteAborted(err.splitlines()[0] if err else "bd sql failed")
+        return False
+
+    def _isolate(self, batch: list[tuple[str, str]]) -> None:
+        """Bisect a failed batch down to its bad pairs."""
+        if len(batch) == 1:
+            self.stats.failed += 1
+            self.stats.failed_pairs.append(batch[0])
+            return
+        self.stats.bisections += 1
+        mid = len(batch) // 2
+        left, right = batch[:mid], batch[mid:]
+        left_ok, right_ok = self._insert(left), self._insert(right)
+        if not left_ok and not right_ok:
+            self._probe()  # bad rows in both halves, or bd sql itself broken?
+        if not left_ok:
+            self._isolate(left)
+        if not right_ok:
+            self._isolate(right)
+
+    def _probe(self) -> None:
+        """Raise WriteAborted unless a trivial bd sql statement succeeds."""
+        self.stats.statements += 1
+        r = run(["bd", "sql", "select 1"])
+        if r.returncode != 0:
+            err = (r.stderr or r.stdout or "").strip()
+            raise WriteAborted(err.splitlines()[0] if err else "bd sql failed on select 1")
+
+    def _write_transaction(self, pairs: list[tuple[str, str]]) -> bool:
+        lines = ["start transaction;"]
+        for i in range(0, len(pairs), self.max_batch):
+            lines.append(label_insert_sql(pairs[i:i + self.max_batch]) + ";")
+        lines.append("commit;")
+        try:
+            r = subprocess.run(
+                ["dolt", "sql"], input="\n".join(lines) + "\n", cwd=self.dolt_dir,
+                text=True, capture_output=True, check=False,
+            )
+        except OSError as exc:
+            print(f"warning: dolt sql unavailable ({exc}); using bd sql batches", file=sys.stderr)
+            return False
+        self.stats.statements += 1
+        if r.returncode != 0:
+            print(f"warning: dolt transaction failed, using bd sql batches: {r.stderr.strip()}", file=sys.stderr)
+            return False
+        return True
 
 
-def detect_modules(title: str, description: str) -> set[str]:
+def detect_bracket_modules(title: str) -> set[str]:
     modules: set[str] = set()
-    # 1) Bracket prefixes in title
     for m in BRACKET_RE.finditer(title):
         bracket = m.group(1).lower()
         if bracket in BRACKET_MAP:
             label = BRACKET_MAP[bracket]
             if label:
                 modules.add(label)
+    return modules
+
+
+def detect_modules(title: str, description: str) -> set[str]:
+    # 1) Bracket prefixes in title
+    modules = detect_bracket_modules(title)
     # 2) Keyword matches in title + description
     text = f"{title} {description}"
     for pattern, label in MODULE_KEYWORDS:
@@ -255,29 +402,141 @@ def detect_themes(title: str, description: str) -> set[str]:
 
 
 # ---------------------------------------------------------------------------
-# Main
+# Single-pass classifier
 # ---------------------------------------------------------------------------
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Backfill theme and module labels onto beads.")
-    parser.add_argument("--dry-run", action="store_true", help="Preview without applying")
-    parser.add_argument("--limit", type=int, default=0, help="Limit to N beads (0=all)")
-    parser.add_argument("--status", default="all", choices=["all", "open", "closed"], help="Filter by status")
-    args = parser.parse_args()
+WORD_RE = re.compile(r"\w+")
+LITERAL_WORD_RE = re.compile(r"\\b(\w+)\\b")
+
 
-    # Fetch all beads
+def split_alternatives(pattern: str) -> list[str]:
+    """Split a regex source on its top-level ``|`` (not inside groups or escapes)."""
+    parts: list[str] = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+class LabelClassifier:
+    """Find every module and theme keyword label in one pass over a bead's text.
+
+    Each MODULE_KEYWORDS / THEME_PATTERNS pattern is split into its top-level
+    alternatives. Case-insensitive alternatives that are a single literal
+    word (``\\bclavain\\b``) go into a word -> labels dict and are matched by
+    hashing the text's words. The rest are merged into one regex that, at each
+    word start, tries every alternative in its own optional lookahead with a
+    named group. Unlike a plain ``a|b`` alternation this reports all
+    alternatives matching at a position (``install.sh`` is both mod:demarch
+    and theme:dx), so results equal running each pattern separately.
+    """
+
+    def __init__(self, patterns: list[tuple[re.Pattern[str], str]]):
+        self.word_labels: dict[str, set[str]] = {}
+        self.group_labels: dict[str, str] = {}
+        alternatives: list[str] = []
+        for pattern, label in patterns:
+            ignore_case = bool(pattern.flags & re.I)
+            for alt in split_alternatives(pattern.pattern):
+                literal = LITERAL_WORD_RE.fullmatch(alt)
+                if ignore_case and literal:
+                    self.word_labels.setdefault(literal.group(1).lower(), set()).add(label)
+                    continue
+                name = f"k{len(alternatives)}"
+                self.group_labels[name] = label
+                alternatives.append(f"(?i:{alt})" if ignore_case else alt)
+        self.regex: re.Pattern[str] | None = None
+        if alternatives:
+            # The gate rejects word starts where nothing matches before any
+            # group is tried, so matches are only produced at actual hits.
+            gate = "|".join(f"(?:{alt})" for alt in alternatives)
+            groups = "".join(f"(?=(?P<{name}>{alt}))?" for name, alt in zip(self.group_labels, alternatives))
+            self.regex = re.compile(rf"\b(?=(?:{gate})){groups}")
+
+    def classify(self, text: str) -> set[str]:
+        labels: set[str] = set()
+        for word in set(WORD_RE.findall(text.lower())):
+            found = self.word_labels.get(word)
+            if found:
+                labels |= found
+        if self.regex is not None:
+            for m in self.regex.finditer(text):
+                for name, value in m.groupdict().items():
+                    if value is not None:
+                        labels.add(self.group_labels[name])
+        return labels
+
+
+def detect_labels(classifier: LabelClassifier, title: str, description: str) -> set[str]:
+    """Module and theme labels for a bead; same result as detect_modules | detect_themes."""
+    return detect_bracket_modules(title) | classifier.classify(f"{title} {description}")
+
+
+def run_benchmark(jsonl_path: Path) -> int:
+    """Time per-pattern detection against LabelClassifier on a beads JSONL export."""
+    beads = []
+    with jsonl_path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                bead = json.loads(line)
+                beads.append((bead.get("title") or "", bead.get("description") or ""))
+    if not beads:
+        print(f"error: no beads in {jsonl_path}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    expected = [detect_modules(t, d) | detect_themes(t, d) for t, d in beads]
+    per_pattern = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classifier = LabelClassifier(MODULE_KEYWORDS + THEME_PATTERNS)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = [detect_labels(classifier, t, d) for t, d in beads]
+    single_pass = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    print(f"Beads:        {len(beads)} ({jsonl_path})")
+    print(f"Per-pattern:  {per_pattern:.3f}s  {len(beads) / per_pattern:,.0f} beads/sec")
+    print(f"Single-pass:  {single_pass:.3f}s  {len(beads) / single_pass:,.0f} beads/sec "
+          f"(+{build * 1000:.1f}ms compile)")
+    print(f"Speedup:      {per_pattern / single_pass:.1f}x")
+    print(f"Mismatches:   {mismatches}")
+    return 1 if mismatches else 0
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def fetch_beads_and_labels(status: str, limit: int) -> tuple[list[dict] | None, dict[str, set[str]]]:
+    """Read beads and their current labels through bd sql."""
     query = 'select id, title, description, status from issues'
-    if args.status == "open":
+    if status == "open":
         query += ' where status in ("open", "in_progress")'
-    elif args.status == "closed":
+    elif status == "closed":
         query += ' where status = "closed"'
-    if args.limit:
-        query += f" limit {args.limit}"
+    if limit:
+        query += f" limit {limit}"
 
     r = run(["bd", "sql", "--json", query])
     if r.returncode != 0:
         print(f"error: bd sql failed: {r.stderr}", file=sys.stderr)
-        return 1
+        return None, {}
 
     beads = json.loads(r.stdout or "[]")
     print(f"Processing {len(beads)} beads...")
@@ -289,22 +548,61 @@ def main() -> int:
     if r_labels.returncode == 0:
         for row in json.loads(r_labels.stdout or "[]"):
             existing_map.setdefault(row["issue_id"], set()).add(row["label"])
+    return beads, existing_map
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill theme and module labels onto beads.")
+    parser.add_argument("--dry-run", action="store_true", help="Preview without applying")
+    parser.add_argument("--limit", type=int, default=0, help="Limit to N beads (0=all)")
+    parser.add_argument("--status", default="all", choices=["all", "open", "closed"], help="Filter by status")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Read beads and labels from the .beads JSONL exports instead of bd (writes still use bd)",
+    )
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory for --offline")
+    parser.add_argument("--batch-size", type=int, default=50, help="Initial pairs per bd sql insert (adapts)")
+    parser.add_argument("--max-batch", type=int, default=2000, help="Upper bound for adaptive batch size")
+    parser.add_argument(
+        "--dolt-dir", type=Path, metavar="DIR",
+        help="Dolt database dir; write all labels in one transaction via a single dolt sql process",
+    )
+    parser.add_argument(
+        "--benchmark", nargs="?", const=".beads/issues.jsonl", metavar="JSONL",
+        help="Compare per-pattern and single-pass label detection on a beads JSONL file (no bd needed)",
+    )
+    args = parser.parse_args()
+
+    if args.benchmark:
+        return run_benchmark(Path(args.benchmark))
+
+    if args.offline:
+        index = BeadIndex.load(args.beads_dir)
+        beads = list(index.iter_issues(args.status))
+        if args.limit:
+            beads = beads[:args.limit]
+        print(f"Processing {len(beads)} beads (offline: {args.beads_dir})...")
+        existing_map = index.labels
+    else:
+        beads, existing_map = fetch_beads_and_labels(args.status, args.limit)
+        if beads is None:
+            return 1
     print(f"Loaded {sum(len(v) for v in existing_map.values())} existing labels across {len(existing_map)} beads")
 
     stats = {"checked": 0, "labeled": 0, "labels_added": 0, "skipped": 0, "failed": 0}
     module_counts: dict[str, int] = {}
     theme_counts: dict[str, int] = {}
     all_pairs: list[tuple[str, str]] = []
+    classifier = LabelClassifier(MODULE_KEYWORDS + THEME_PATTERNS)
 
     for bead in beads:
         bead_id = bead["id"]
-        title = bead.get("title", "")
-        desc = bead.get("description", "")
+        title = bead.get("title") or ""
+        desc = bead.get("description") or ""
         stats["checked"] += 1
 
-        new_modules = detect_modules(title, desc)
-        new_themes = detect_themes(title, desc)
-        new_labels = new_modules | new_themes
+        new_labels = detect_labels(classifier, title, desc)
 
         if not new_labels:
             stats["skipped"] += 1
@@ -328,10 +626,17 @@ def main() -> int:
                 theme_counts[label] = theme_counts.get(label, 0) + 1
 
     # Bulk insert
-    if all_pairs:
-        ok_count, fail_count = bulk_insert_labels(all_pairs, args.dry_run)
-        stats["labels_added"] = ok_count
-        stats["failed"] = fail_count
+    if all_pairs and args.dry_run:
+        stats["labels_added"] = len(all_pairs)
+    elif all_pairs:
+        writer = LabelWriter(args.batch_size, args.max_batch, dolt_dir=args.dolt_dir)
+        result = writer.write(all_pairs)
+        stats["labels_added"] = result.ok
+        stats["failed"] = result.failed
+        print(f"\nWrote {result.summary()}")
+        if not result.aborted:
+            for eid, lab in result.failed_pairs:
+                print(f"  failed {eid} <- {lab}", file=sys.stderr)
     else:
         stats["labels_added"] = 0
 
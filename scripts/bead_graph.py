@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+In-process dependency-graph engine over .beads/backup/dependencies.jsonl.
+
+Bead IDs are interned to ints and edges are stored CSR-style: an offsets
+array per node plus flat target and edge-type arrays, one copy for out-edges
+(depends_on_id -> issue_id) and one for in-edges. Queries walk int arrays
+instead of re-running `bd` or `jq`.
+
+Edge semantics follow bd:
+  blocks        issue_id cannot start until depends_on_id is closed
+  parent-child  issue_id is a child of depends_on_id; a blocked parent blocks
+                its children, and an epic is finished by its children
+Other types (relates-to, discovered-from, supersedes) are kept but never block.
+
+Appended dependency lines are picked up by refresh(), which reads from the
+last byte offset into a small delta adjacency that is folded into the CSR
+arrays once it grows past COMPACT_FRACTION of the edge count.
+
+Usage:
+  python3 scripts/bead_graph.py ready
+  python3 scripts/bead_graph.py blockers ID
+  python3 scripts/bead_graph.py path ID          # critical path of open blockers to ID
+  python3 scripts/bead_graph.py cycles
+  python3 scripts/bead_graph.py topo
+  python3 scripts/bead_graph.py bench [--scale K]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+import time
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import Iterator
+
+from bead_index import DEFAULT_BEADS_DIR, load_jsonl
+
+
+EDGE_TYPES = ("blocks", "parent-child", "relates-to", "discovered-from", "supersedes")
+BLOCKS = 0
+PARENT_CHILD = 1
+BLOCKING = frozenset({BLOCKS, PARENT_CHILD})
+DONE_STATUSES = frozenset({"closed", "tombstone"})
+OPEN_STATUSES = frozenset({"open", "in_progress"})
+COMPACT_FRACTION = 0.125
+
+
+def build_csr(n: int, src: array, dst: array, typ: array) -> tuple[array, array, array]:
+    """Group edges by source: (offsets[n+1], targets, types)."""
+    counts = [0] * (n + 1)
+    for s in src:
+        counts[s + 1] += 1
+    offsets = array("l", itertools.accumulate(counts))
+    pos = list(offsets[:-1])
+    targets = array("l", bytes(offsets.itemsize * len(src)))
+    types = array("b", bytes(len(src)))
+    for s, d, t in zip(src, dst, typ):
+        p = pos[s]
+        targets[p] = d
+        types[p] = t
+        pos[s] = p + 1
+    return offsets, targets, types
+
+
+class DepGraph:
+    """Integer-indexed dependency graph with CSR adjacency and an append delta."""
+
+    def __init__(self) -> None:
+        self.ids: list[str] = []
+        self.index: dict[str, int] = {}
+        self.status: list[str | None] = []
+        self._edges: set[tuple[int, int, int]] = set()
+        self._src = array("l")
+        self._dst = array("l")
+        self._typ = array("b")
+        self._compacted = 0  # edges already in the CSR arrays
+        self._out = self._in = (array("l", [0]), array("l"), array("b"))
+        self._delta_out: dict[int, list[tuple[int, int]]] = {}
+        self._delta_in: dict[int, list[tuple[int, int]]] = {}
+        self.source: Path | None = None
+        self.offset = 0
+
+    # -- construction --------------------------------------------------------
+
+    @classmethod
+    def load(cls, beads_dir: Path = DEFAULT_BEADS_DIR) -> DepGraph:
+        graph = cls()
+        for issue in load_jsonl(beads_dir / "issues.jsonl"):
+            graph.set_status(issue["id"], issue.get("status"))
+        graph.source = beads_dir / "backup" / "dependencies.jsonl"
+        graph.refresh()
+        graph.compact()
+        return graph
+
+    def node(self, bead_id: str) -> int:
+        i = self.index.get(bead_id)
+        if i is None:
+            i = self.index[bead_id] = len(self.ids)
+            self.ids.append(bead_id)
+            self.status.append(None)
+        return i
+
+    def set_status(self, bead_id: str, status: str | None) -> None:
+        self.status[self.node(bead_id)] = status
+
+    def add_edge(self, issue_id: str, depends_on_id: str, dep_type: str) -> bool:
+        """Record that issue_id depends on depends_on_id. Returns False for a duplicate."""
+        u, v = self.node(depends_on_id), self.node(issue_id)
+        t = EDGE_TYPES.index(dep_type) if dep_type in EDGE_TYPES else len(EDGE_TYPES)
+        if (u, v, t) in self._edges:
+            return False
+        self._edges.add((u, v, t))
+        self._src.append(u)
+        self._dst.append(v)
+        self._typ.append(t)
+        self._delta_out.setdefault(u, []).append((v, t))
+        self._delta_in.setdefault(v, []).append((u, t))
+        if len(self._src) - self._compacted > max(1024, COMPACT_FRACTION * self._compacted):
+            self.compact()
+        return True
+
+    def refresh(self) -> int:
+        """Ingest dependency lines appended since the last read. Returns edges added."""
+        if self.source is None or not self.source.exists():
+            return 0
+        with self.source.open("rb") as f:
+            f.seek(0, 2)
+            if f.tell() < self.offset:
+                raise ValueError(f"{self.source} shrank; reload the graph")
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        added = 0
+        for line in data[:end].splitlines():
+            if line.strip():
+                row = json.loads(line)
+                added += self.add_edge(row["issue_id"], row["depends_on_id"], row.get("type", "blocks"))
+        self.offset += end
+        return added
+
+    def compact(self) -> None:
+        """Fold delta edges into the CSR arrays."""
+        n = len(self.ids)
+        self._out = build_csr(n, self._src, self._dst, self._typ)
+        self._in = build_csr(n, self._dst, self._src, self._typ)
+        self._compacted = len(self._src)
+        self._delta_out.clear()
+        self._delta_in.clear()
+
+    # -- adjacency -----------------------------------------------------------
+
+    def _adjacent(self, csr: tuple[array, array, array], delta: dict, v: int, types: frozenset[int]) -> Iterator[int]:
+        offsets, targets, etypes = csr
+        if v + 1 < len(offsets):
+            for p in range(offsets[v], offsets[v + 1]):
+                if etypes[p] in types:
+                    yield targets[p]
+        for w, t in delta.get(v, ()):
+            if t in types:
+                yield w
+
+    def successors(self, v: int, types: frozenset[int] = BLOCKING) -> Iterator[int]:
+        """Nodes that wait on v."""
+        return self._adjacent(self._out, self._delta_out, v, types)
+
+    def predecessors(self, v: int, types: frozenset[int] = BLOCKING) -> Iterator[int]:
+        """Nodes v waits on."""
+        return self._adjacent(self._in, self._delta_in, v, types)
+
+    def is_open(self, v: int) -> bool:
+        return self.status[v] not in DONE_STATUSES and self.status[v] is not None
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._src)
+
+    # -- queries -------------------------------------------------------------
+
+    def topo_order(self) -> tuple[list[str], list[str]]:
+        """Kahn order over blocking edges. Returns (ordered ids, ids on or downstream of a cycle)."""
+        n = len(self.ids)
+        indeg = array("l", bytes(array("l").itemsize * n))
+        for v in range(n):
+            for w in self.successors(v):
+                indeg[w] += 1
+        queue = deque(v for v in range(n) if indeg[v] == 0)
+        order: list[int] = []
+        while queue:
+            v = queue.popleft()
+            order.append(v)
+            for w in self.successors(v):
+                indeg[w] -= 1
+                if indeg[w] == 0:
+                    queue.append(w)
+        on_cycle = [self.ids[v] for v in range(n) if indeg[v] > 0]
+        return [self.ids[v] for v in order], on_cycle
+
+    def cycles(self) -> list[list[str]]:
+        """Strongly connected components with more than one node (iterative Tarjan)."""
+        n = len(self.ids)
+        index = [-1] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack: list[int] = []
+        out: list[list[str]] = []
+        counter = 0
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            work = [(root, self.successors(root))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                v, it = work[-1]
+                advanced = False
+                for w in it:
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, self.successors(w)))
+                        advanced = True
+                        break
+                    if on_stack[w]:
+                        low[v] = min(low[v], index[w])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[v])
+                if low[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    if len(component) > 1:
+                        out.append(sorted(self.ids[w] for w in component))
+        return out
+
+    def transitive_blockers(self, bead_id: str) -> set[str]:
+        """Open beads reachable through `blocks` edges from bead_id or any of its ancestors."""
+        start = self.index.get(bead_id)
+        if start is None:
+            return set()
+        seen = {start}
+        queue = deque([start])
+        blockers: set[int] = set()
+        while queue:
+            v = queue.popleft()
+            for u in self.predecessors(v, frozenset({BLOCKS})):
+                if self.is_open(u):
+                    blockers.add(u)
+                if u not in seen:
+                    seen.add(u)
+                    queue.append(u)
+            for u in self.predecessors(v, frozenset({PARENT_CHILD})):
+                if u not in seen:
+                    seen.add(u)
+                    queue.append(u)
+        return {self.ids[u] for u in blockers}
+
+    def ready(self) -> list[str]:
+        """Open beads with no open `blocks` blocker on themselves or any ancestor (bd ready)."""
+        n = len(self.ids)
+        blocked = bytearray(n)
+        for v in range(n):
+            if any(self.is_open(u) for u in self.predecessors(v, frozenset({BLOCKS}))):
+                blocked[v] = 1
+        # Push blocked-ness down parent-child edges.
+        queue = deque(v for v in range(n) if blocked[v])
+        while queue:
+            v = queue.popleft()
+            for w in self.successors(v, frozenset({PARENT_CHILD})):
+                if not blocked[w]:
+                    blocked[w] = 1
+                    queue.append(w)
+        return [self.ids[v] for v in range(n) if not blocked[v] and self.status[v] in OPEN_STATUSES]
+
+    def critical_path(self, bead_id: str) -> list[str]:
+        """Longest chain of open `blocks` blockers ending at bead_id or one of its descendants."""
+        target = self.index.get(bead_id)
+        if target is None:
+            return []
+        scope = [target]
+        seen = {target}
+        for v in scope:  # scope grows while iterating: all descendants
+            for w in self.successors(v, frozenset({PARENT_CHILD})):
+                if w not in seen:
+                    seen.add(w)
+                    scope.append(w)
+        # depth[v] = open blockers on the longest chain ending at v (memoised DFS, cycle-safe).
+        depth: dict[int, int] = {}
+        nxt: dict[int, int] = {}
+        state: dict[int, int] = {}
+        for root in scope:
+            stack = [(root, False)]
+            while stack:
+                v, done = stack.pop()
+                if done:
+                    best, pick = 0, -1
+                    for u in self.predecessors(v, frozenset({BLOCKS})):
+                        if self.is_open(u) and state.get(u) == 2 and depth[u] + 1 > best:
+                            best, pick = depth[u] + 1, u
+                    depth[v], nxt[v], state[v] = best, pick, 2
+                    continue
+                if state.get(v):
+                    continue
+                state[v] = 1
+                stack.append((v, True))
+                stack.extend((u, False) for u in self.predecessors(v, frozenset({BLOCKS})) if self.is_open(u) and not state.get(u))
+        end = max(scope, key=lambda v: depth.get(v, 0))
+        path = [end]
+        while nxt.get(path[-1], -1) != -1:
+            path.append(nxt[path[-1]])
+        return [self.ids[v] for v in reversed(path)]
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+
+def scaled_copy(graph: DepGraph, k: int) -> DepGraph:
+    """k disjoint copies of graph (IDs suffixed #i) for scaling runs."""
+    big = DepGraph()
+    for i in range(k):
+        for v, bead_id in enumerate(graph.ids):
+            big.set_status(f"{bead_id}#{i}", graph.status[v])
+    for i in range(k):
+        for u, v, t in zip(graph._src, graph._dst, graph._typ):
+            big.add_edge(f"{graph.ids[v]}#{i}", f"{graph.ids[u]}#{i}", EDGE_TYPES[t] if t < len(EDGE_TYPES) else "other")
+    big.compact()
+    return big
+
+
+def dict_baseline_blockers(rows: list[dict], status: dict[str, str], bead_id: str) -> set[str]:
+    """Transitive blockers from a freshly built dict-of-lists (what ad-hoc scripts do)."""
+    parents: dict[str, list[tuple[str, str]]] = {}
+    for row in rows:
+        parents.setdefault(row["issue_id"], []).append((row["depends_on_id"], row.get("type")))
+    seen = {bead_id}
+    queue = deque([bead_id])
+    found = set()
+    while queue:
+        v = queue.popleft()
+        for u, t in parents.get(v, ()):
+            if t == "blocks" and status.get(u) not in DONE_STATUSES and u in status:
+                found.add(u)
+            if t in ("blocks", "parent-child") and u not in seen:
+                seen.add(u)
+                queue.append(u)
+    return found
+
+
+def timed(label: str, fn, *args) -> object:
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f"  {label:<34} {(time.perf_counter() - start) * 1000:>9.1f}ms")
+    return result
+
+
+def run_bench(beads_dir: Path, scale: int) -> int:
+    print(f"dependency graph benchmark ({beads_dir}, scale x{scale})")
+    graph = timed("load + CSR build", DepGraph.load, beads_dir)
+    if scale > 1:
+        graph = timed(f"scale x{scale}", scaled_copy, graph, scale)
+    print(f"  nodes={len(graph.ids)} edges={graph.edge_count}")
+    order, stuck = timed("topological order", graph.topo_order)
+    cyc = timed("cycle detection (Tarjan)", graph.cycles)
+    ready = timed("ready set", graph.ready)
+    open_ids = [graph.ids[v] for v in range(len(graph.ids)) if graph.is_open(v)]
+    closure = timed(f"transitive blockers x{len(open_ids)}", lambda: [graph.transitive_blockers(b) for b in open_ids])
+    epics = [b for b in open_ids if any(True for _ in graph.successors(graph.index[b], frozenset({PARENT_CHILD})))]
+    timed(f"critical path x{len(epics)} epics", lambda: [graph.critical_path(b) for b in epics])
+    print(f"  ordered={len(order)} on_cycles={len(stuck)} cycles={len(cyc)} ready={len(ready)} "
+          f"blocked={sum(1 for c in closure if c)}")
+
+    if scale == 1:
+        rows = list(load_jsonl(beads_dir / "backup" / "dependencies.jsonl"))
+        status = {issue["id"]: issue.get("status") for issue in load_jsonl(beads_dir / "issues.jsonl")}
+        sample = open_ids[:200]
+        base = timed(f"dict baseline blockers x{len(sample)}", lambda: [dict_baseline_blockers(rows, status, b) for b in sample])
+        mismatches = sum(1 for b, r in zip(sample, base) if graph.transitive_blockers(b) != r)
+        print(f"  baseline mismatches: {mismatches}")
+        if mismatches:
+            return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query the bead dependency graph.")
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory (default: .beads)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("ready", help="Open beads with no open blockers")
+    b = sub.add_parser("blockers", help="Transitive open blockers of a bead")
+    b.add_argument("id")
+    p = sub.add_parser("path", help="Critical path of open blockers to a bead or epic")
+    p.add_argument("id")
+    sub.add_parser("cycles", help="Dependency cycles")
+    sub.add_parser("topo", help="Topological order of all beads")
+    bench = sub.add_parser("bench", help="Time every query on the real files")
+    bench.add_argument("--scale", type=int, default=1, help="Replicate the graph K times")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        return run_bench(args.beads_dir, args.scale)
+
+    graph = DepGraph.load(args.beads_dir)
+    if args.command == "ready":
+        print("\n".join(graph.ready()))
+    elif args.command == "blockers":
+        print("\n".join(sorted(graph.transitive_blockers(args.id))))
+    elif args.command == "path":
+        print(" -> ".join(graph.critical_path(args.id)))
+    elif args.command == "cycles":
+        found = graph.cycles()
+        for component in found:
+            print(" ".join(component))
+        return 1 if found else 0
+    else:
+        order, stuck = graph.topo_order()
+        print("\n".join(order))
+        if stuck:
+            print(f"warning: {len(stuck)} beads on or behind dependency cycles omitted", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Read-only in-memory index over the Beads JSONL exports.
+
+The backfill/replay scripts only need existence, label and note lookups, which
+`bd show` / `bd sql` answer one subprocess (and one Dolt round-trip) at a time.
+This module loads the exports once:
+
+- .beads/issues.jsonl                 issues (with inline labels/notes)
+- .beads/backup/labels.jsonl          issue_id -> label rows
+- .beads/backup/dependencies.jsonl    issue_id -> depends_on_id rows
+- .beads/backup/events.jsonl          audit events
+
+and answers lookups from dicts. It never writes: creates, label adds and note
+appends still go through `bd`. The exports are only as fresh as the last
+`bd` sync, so scripts use it behind an explicit --offline flag.
+
+For the online paths it also holds the shared `bd sql` helpers: sql_literal()
+and existing_ids(), a chunked `select id ... where id in (...)`.
+
+Usage as a script prints index stats, or looks up IDs:
+  python3 scripts/bead_index.py [--beads-dir .beads] [ID ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+
+DEFAULT_BEADS_DIR = Path(".beads")
+EXISTS_CHUNK = 500
+
+# Free-text fields searched by text(); mirrors what `bd show` prints.
+TEXT_FIELDS = ("title", "description", "design", "acceptance_criteria", "notes", "close_reason", "external_ref")
+
+# bd's "open" filter covers active work too.
+STATUS_GROUPS = {
+    "open": {"open", "in_progress"},
+    "closed": {"closed"},
+}
+
+
+def load_jsonl(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield JSON objects from a JSONL file; a missing file yields nothing."""
+    if not path.exists():
+        return
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def sql_literal(value: str) -> str:
+    """Quote a string as a Dolt/MySQL literal (bd sql has no bind parameters)."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def existing_ids(bead_ids: Iterable[str], chunk_size: int = EXISTS_CHUNK) -> tuple[set[str], int]:
+    """Return (the subset of bead_ids that exist, bd invocations issued).
+
+    One `bd sql` per chunk_size IDs. A chunk whose query fails is checked per
+    ID with `bd show`, so a bad batch cannot report existing beads as missing.
+    """
+    ordered = sorted(set(bead_ids))
+    existing: set[str] = set()
+    calls = 0
+    for i in range(0, len(ordered), chunk_size):
+        chunk = ordered[i:i + chunk_size]
+        q = f"select id from issues where id in ({', '.join(sql_literal(b) for b in chunk)})"
+        result = subprocess.run(["bd", "sql", "--json", q], text=True, capture_output=True, check=False)
+        calls += 1
+        try:
+            if result.returncode != 0:
+                raise ValueError(result.stderr)
+            found = {str(row["id"]) for row in json.loads(result.stdout or "[]")}
+        except (ValueError, KeyError, TypeError):
+            calls += len(chunk)
+            existing.update(
+                b for b in chunk
+                if subprocess.run(["bd", "show", b], text=True, capture_output=True, check=False).returncode == 0
+            )
+            continue
+        existing.update(b for b in chunk if b in found)
+    return existing, calls
+
+
+def issue_text(issue: dict[str, Any]) -> str:
+    """TEXT_FIELDS of an issue row joined into one string."""
+    return "\n".join(str(issue[k]) for k in TEXT_FIELDS if issue.get(k))
+
+
+class BeadIndex:
+    """Existence, label, note, dependency and event lookups keyed by bead ID."""
+
+    def __init__(
+        self,
+        issues: dict[str, dict[str, Any]],
+        labels: dict[str, set[str]],
+        dependencies: dict[str, list[dict[str, Any]]],
+        events: dict[str, list[dict[str, Any]]],
+    ):
+        self.issues = issues
+        self.labels = labels
+        self.dependencies = dependencies
+        self.events = events
+
+    @classmethod
+    def load(cls, beads_dir: Path = DEFAULT_BEADS_DIR) -> BeadIndex:
+        issues: dict[str, dict[str, Any]] = {}
+        labels: dict[str, set[str]] = {}
+        dependencies: dict[str, list[dict[str, Any]]] = {}
+        events: dict[str, list[dict[str, Any]]] = {}
+
+        issues_path = beads_dir / "issues.jsonl"
+        if not issues_path.exists():
+            raise FileNotFoundError(f"no beads export at {issues_path}")
+        for issue in load_jsonl(issues_path):
+            bead_id = issue["id"]
+            issues[bead_id] = issue
+            if issue.get("labels"):
+                labels.setdefault(bead_id, set()).update(issue["labels"])
+            for dep in issue.get("dependencies") or []:
+                dependencies.setdefault(bead_id, []).append(dep)
+
+        backup = beads_dir / "backup"
+        for row in load_jsonl(backup / "labels.jsonl"):
+            labels.setdefault(row["issue_id"], set()).add(row["label"])
+        seen_deps = {(d.get("issue_id"), d.get("depends_on_id"), d.get("type")) for v in dependencies.values() for d in v}
+        for row in load_jsonl(backup / "dependencies.jsonl"):
+            key = (row["issue_id"], row["depends_on_id"], row.get("type"))
+            if key not in seen_deps:
+                seen_deps.add(key)
+                dependencies.setdefault(row["issue_id"], []).append(row)
+        for row in load_jsonl(backup / "events.jsonl"):
+            events.setdefault(row["issue_id"], []).append(row)
+
+        return cls(issues, labels, dependencies, events)
+
+    def resolve(self, bead_id: str) -> str | None:
+        # Exact match, like Dolt's default utf8mb4_0900_bin collation. Callers
+        # lowercase doc references, and stored IDs are all lowercase.
+        return bead_id if bead_id in self.issues else None
+
+    def exists(self, bead_id: str) -> bool:
+        return self.resolve(bead_id) is not None
+
+    def missing(self, bead_ids: Iterable[str]) -> set[str]:
+        return {bead_id for bead_id in bead_ids if not self.exists(bead_id)}
+
+    def get(self, bead_id: str) -> dict[str, Any] | None:
+        resolved = self.resolve(bead_id)
+        return self.issues[resolved] if resolved else None
+
+    def labels_for(self, bead_id: str) -> set[str]:
+        return set(self.labels.get(self.resolve(bead_id) or bead_id, ()))
+
+    def notes(self, bead_id: str) -> str:
+        issue = self.get(bead_id)
+        return (issue or {}).get("notes") or ""
+
+    def text(self, bead_id: str) -> str:
+        """Concatenated free-text fields, for substring checks done against `bd show` output."""
+        issue = self.get(bead_id)
+        return issue_text(issue) if issue is not None else ""
+
+    def dependencies_of(self, bead_id: str) -> list[dict[str, Any]]:
+        return list(self.dependencies.get(self.resolve(bead_id) or bead_id, ()))
+
+    def events_for(self, bead_id: str) -> list[dict[str, Any]]:
+        return list(self.events.get(self.resolve(bead_id) or bead_id, ()))
+
+    def iter_issues(self, status: str = "all") -> Iterator[dict[str, Any]]:
+        wanted = STATUS_GROUPS.get(status)
+        for issue in self.issues.values():
+            if wanted is None or issue.get("status") in wanted:
+                yield issue
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspect the offline bead index.")
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory (default: .beads)")
+    parser.add_argument("ids", nargs="*", help="Bead IDs to look up")
+    args = parser.parse_args()
+
+    try:
+        index = BeadIndex.load(args.beads_dir)
+    except FileNotFoundError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    if not args.ids:
+        print(f"issues:       {len(index.issues)}")
+        print(f"labels:       {sum(len(v) for v in index.labels.values())} on {len(index.labels)} beads")
+        print(f"dependencies: {sum(len(v) for v in index.dependencies.values())}")
+        print(f"events:       {sum(len(v) for v in index.events.values())}")
+        return 0
+
+    missing = 0
+    for bead_id in args.ids:
+        issue = index.get(bead_id)
+        if issue is None:
+            missing += 1
+            print(f"{bead_id}: missing")
+            continue
+        labels = ",".join(sorted(index.labels_for(bead_id))) or "-"
+        print(f"{issue['id']}: [{issue.get('status')}] {issue.get('title')}  labels={labels}")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
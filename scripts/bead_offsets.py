@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Random access into Beads JSONL exports via a sidecar byte-offset index.
+
+Looking up one bead in .beads/issues.jsonl (or a backup) otherwise means
+parsing the whole file or asking `bd`. OffsetIndex keeps a sidecar
+`<file>.idx.json` mapping bead id -> (offset, length). The JSONL file is
+mmapped, and only the requested records are decoded.
+
+The sidecar records the file's size and mtime. When either changes and the
+file has only grown (the last indexed record is byte-for-byte unchanged), just
+the appended tail is scanned. Otherwise the index is rebuilt. Building never
+JSON-decodes a record: the id is read from the leading {"id":"..." that bd
+writes, falling back to json.loads for lines without it.
+
+Usage:
+  python3 scripts/bead_offsets.py [--jsonl .beads/issues.jsonl] get ID [ID ...]
+  python3 scripts/bead_offsets.py [--jsonl ...] build      # force a full rebuild
+  python3 scripts/bead_offsets.py [--jsonl ...] stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+
+DEFAULT_JSONL = Path(".beads/issues.jsonl")
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+
+LEADING_ID_RE = re.compile(rb'\{"id":"((?:[^"\\]|\\.)*)"')
+
+
+def _line_id(line: bytes) -> str | None:
+    m = LEADING_ID_RE.match(line)
+    if m:
+        return json.loads(b'"' + m.group(1) + b'"')
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    bead_id = record.get("id") if isinstance(record, dict) else None
+    return bead_id if isinstance(bead_id, str) else None
+
+
+def scan_offsets(buf: bytes | mmap.mmap, start: int = 0) -> Iterator[tuple[str, int, int]]:
+    """Yield (id, offset, length) for each record line from byte `start` onward."""
+    end = len(buf)
+    pos = start
+    while pos < end:
+        nl = buf.find(b"\n", pos)
+        stop = end if nl == -1 else nl
+        if stop > pos:
+            bead_id = _line_id(buf[pos:stop])
+            if bead_id is not None:
+                yield bead_id, pos, stop - pos
+        pos = stop + 1
+
+
+class OffsetIndex:
+    """Bead id -> record lookups over an mmapped JSONL file."""
+
+    def __init__(self, jsonl_path: Path, index_path: Path | None = None, rebuild: bool = False):
+        self.jsonl_path = jsonl_path
+        self.index_path = index_path or jsonl_path.with_name(jsonl_path.name + INDEX_SUFFIX)
+        self.offsets: dict[str, tuple[int, int]] = {}
+        self.refresh = "loaded"  # loaded | appended | rebuilt
+        self._file = jsonl_path.open("rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._sync(rebuild)
+
+    # -- index maintenance ---------------------------------------------------
+
+    def _tail_digest(self, offset: int, length: int) -> str:
+        return hashlib.sha1(self._buf[offset:offset + length]).hexdigest()
+
+    @property
+    def _buf(self) -> bytes | mmap.mmap:
+        return self._mm if self._mm is not None else b""
+
+    def _sync(self, rebuild: bool) -> None:
+        st = os.fstat(self._file.fileno())
+        saved = None if rebuild else self._load_saved()
+        if saved and saved["size"] == st.st_size and saved["mtime_ns"] == st.st_mtime_ns:
+            self.offsets = saved["offsets"]
+            return
+        start = 0
+        if saved and self._grew_from(saved, st.st_size):
+            self.offsets = saved["offsets"]
+            start = saved["size"]
+            self.refresh = "appended"
+        else:
+            self.offsets = {}
+            self.refresh = "rebuilt"
+        for bead_id, offset, length in scan_offsets(self._buf, start):
+            self.offsets[bead_id] = (offset, length)  # later lines win, as in an append log
+        self._save(st.st_size, st.st_mtime_ns)
+
+    def _load_saved(self) -> dict[str, Any] | None:
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        data["offsets"] = {k: (v[0], v[1]) for k, v in data["offsets"].items()}
+        return data
+
+    def _grew_from(self, saved: dict[str, Any], size: int) -> bool:
+        last = saved.get("last")
+        if size <= saved["size"] or not last:
+            return not last and saved["size"] == 0
+        offset, length, digest = last
+        boundary = self._buf[saved["size"] - 1:saved["size"]]
+        return boundary == b"\n" and self._tail_digest(offset, length) == digest
+
+    def _save(self, size: int, mtime_ns: int) -> None:
+        last = None
+        if self.offsets:
+            offset, length = max(self.offsets.values())
+            last = [offset, length, self._tail_digest(offset, length)]
+        payload = {
+            "version": INDEX_VERSION,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "last": last,
+            "offsets": {k: list(v) for k, v in self.offsets.items()},
+        }
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            tmp.replace(self.index_path)
+        except OSError as exc:
+            # A read-only checkout still gets an in-memory index.
+            print(f"warning: could not write {self.index_path}: {exc}", file=sys.stderr)
+
+    # -- lookups -------------------------------------------------------------
+
+    def __contains__(self, bead_id: str) -> bool:
+        return bead_id in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def ids(self) -> Iterable[str]:
+        return self.offsets.keys()
+
+    def raw(self, bead_id: str) -> bytes | None:
+        loc = self.offsets.get(bead_id)
+        if loc is None:
+            return None
+        offset, length = loc
+        return self._buf[offset:offset + length]
+
+    def get(self, bead_id: str) -> dict[str, Any] | None:
+        line = self.raw(bead_id)
+        return json.loads(line) if line is not None else None
+
+    def get_many(self, bead_ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """Decode the requested records in file order (sequential page access)."""
+        wanted = sorted((self.offsets[b], b) for b in set(bead_ids) if b in self.offsets)
+        return {b: json.loads(self._buf[o:o + n]) for (o, n), b in wanted}
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> OffsetIndex:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Indexed random access into a Beads JSONL export.")
+    parser.add_argument("--jsonl", type=Path, default=DEFAULT_JSONL, help="JSONL file (default: .beads/issues.jsonl)")
+    parser.add_argument("--index", type=Path, help=f"Sidecar index path (default: <jsonl>{INDEX_SUFFIX})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    get = sub.add_parser("get", help="Print records as JSON lines")
+    get.add_argument("ids", nargs="+")
+    sub.add_parser("build", help="Rebuild the sidecar index from scratch")
+    sub.add_parser("stats", help="Show index size and refresh mode")
+    args = parser.parse_args()
+
+    if not args.jsonl.exists():
+        print(f"error: not found: {args.jsonl}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    with OffsetIndex(args.jsonl, args.index, rebuild=args.command == "build") as index:
+        opened = time.perf_counter() - start
+        if args.command == "get":
+            missing = 0
+            for bead_id in args.ids:
+                line = index.raw(bead_id)
+                if line is None:
+                    missing += 1
+                    print(f"error: {bead_id} not in {args.jsonl}", file=sys.stderr)
+                    continue
+                sys.stdout.write(line.decode("utf-8") + "\n")
+            return 1 if missing else 0
+        print(f"records: {len(index)}")
+        print(f"index:   {index.index_path} ({index.refresh} in {opened * 1000:.1f}ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Event-sourced materialiser for .beads/backup/events.jsonl.
+
+Keeps current issue state in a SQLite store (default .beads/materialized.db).
+Each run applies only the events after its checkpoint (the last applied event
+id) and records every field it changes in a `changes` table, so consumers
+(stale sweeps, roadmap syncs) can read deltas instead of reloading the whole
+backlog.
+
+On first run the store is seeded from issues.jsonl + backup/labels.jsonl and
+checkpointed at the newest event already in events.jsonl, on the assumption
+that the exports were written together. --seed none instead rebuilds state
+purely from the event log.
+
+How events map onto state:
+  created                 new issue (status open) unless already present
+  status_changed/claimed/
+  updated/reopened        new_value is a JSON patch of changed fields
+  closed                  status=closed, closed_at=event time, close_reason=new_value
+  label_added/removed     label parsed from the comment ("Added label: X")
+An event for an issue the store has never seen starts from its old_value
+(bd stores the full previous issue there) when that is JSON.
+
+Usage:
+  python3 scripts/beads_materialize.py apply [--emit] [--seed export|none]
+  python3 scripts/beads_materialize.py changes [--since EVENT_ID] [--field F] [--issue ID]
+  python3 scripts/beads_materialize.py show ID
+  python3 scripts/beads_materialize.py stale [--days 30] [--status open]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from bead_index import DEFAULT_BEADS_DIR, load_jsonl
+
+
+STORE_NAME = "materialized.db"
+STORE_VERSION = 1
+CHANGE_KEYS = ("event_id", "issue_id", "event_type", "field", "old", "new", "at")
+LABEL_COMMENT_RE = re.compile(r"^(?:Added|Removed) label:\s*(.+)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS issues (
+    id TEXT PRIMARY KEY,
+    status TEXT,
+    priority INTEGER,
+    assignee TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL,
+    last_event INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS labels (
+    issue_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    PRIMARY KEY (issue_id, label)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS changes (
+    event_id INTEGER NOT NULL,
+    issue_id TEXT NOT NULL,
+    event_type TEXT,
+    field TEXT NOT NULL,
+    old TEXT,
+    new TEXT,
+    at TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_event ON changes (event_id);
+CREATE INDEX IF NOT EXISTS changes_issue ON changes (issue_id, event_id);
+CREATE INDEX IF NOT EXISTS issues_status_updated ON issues (status, updated_at);
+"""
+
+# Columns mirrored out of the JSON blob so sweeps can filter in SQL.
+INDEXED_FIELDS = ("status", "priority", "assignee", "updated_at")
+
+
+def open_store(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    version = get_meta(conn, "version")
+    if version is not None and int(version) != STORE_VERSION:
+        conn.close()
+        raise SystemExit(f"Error: {path} is store version {version}, expected {STORE_VERSION}; delete it to rebuild")
+    set_meta(conn, "version", STORE_VERSION)
+    return conn
+
+
+def get_meta(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(conn: sqlite3.Connection, key: str, value: Any) -> None:
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value)),
+    )
+
+
+def save_issue(conn: sqlite3.Connection, data: dict[str, Any], event_id: int) -> None:
+    conn.execute(
+        "INSERT INTO issues (id, status, priority, assignee, updated_at, data, last_event) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET status = excluded.status, priority = excluded.priority, "
+        "assignee = excluded.assignee, updated_at = excluded.updated_at, data = excluded.data, "
+        "last_event = excluded.last_event",
+        (data["id"], *(data.get(k) for k in INDEXED_FIELDS), json.dumps(data, sort_keys=True), event_id),
+    )
+
+
+def load_issue(conn: sqlite3.Connection, issue_id: str) -> dict[str, Any] | None:
+    row = conn.execute("SELECT data FROM issues WHERE id = ?", (issue_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+# ---------------------------------------------------------------------------
+# Events
+# ---------------------------------------------------------------------------
+
+
+def read_new_events(path: Path, offset: int, after_id: int) -> tuple[list[dict[str, Any]], int]:
+    """Events past byte offset with id > after_id, in id order. Returns (events, new offset)."""
+    if not path.exists():
+        return [], 0
+    with path.open("rb") as f:
+        f.seek(0, 2)
+        if f.tell() < offset:
+            offset = 0  # log rewritten; the id filter drops anything already applied
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1  # a partially written last line waits for the next run
+    events = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    events = [ev for ev in events if int(ev["id"]) > after_id]
+    events.sort(key=lambda ev: int(ev["id"]))
+    return events, offset + end
+
+
+def json_object(value: Any) -> dict[str, Any] | None:
+    if not isinstance(value, str) or not value.startswith("{"):
+        return None
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def event_label(ev: dict[str, Any]) -> str | None:
+    m = LABEL_COMMENT_RE.match(ev.get("comment") or "")
+    if m:
+        return m.group(1).strip()
+    value = ev.get("new_value") if ev["event_type"] == "label_added" else ev.get("old_value")
+    return value or None
+
+
+def event_patch(ev: dict[str, Any]) -> dict[str, Any]:
+    kind = ev["event_type"]
+    if kind == "closed":
+        return {"status": "closed", "closed_at": ev.get("created_at"), "close_reason": ev.get("new_value") or None}
+    patch = json_object(ev.get("new_value")) or {}
+    patch.pop("id", None)
+    return patch
+
+
+def apply_event(conn: sqlite3.Connection, ev: dict[str, Any]) -> list[dict[str, Any]]:
+    """Apply one event to the store; return the change records it produced."""
+    event_id = int(ev["id"])
+    issue_id = ev["issue_id"]
+    kind = ev["event_type"]
+    at = ev.get("created_at")
+    change = {"event_id": event_id, "issue_id": issue_id, "event_type": kind, "at": at}
+    changes: list[dict[str, Any]] = []
+
+    data = load_issue(conn, issue_id)
+    if data is None:
+        data = json_object(ev.get("old_value")) or {"id": issue_id, "status": "open", "created_at": at}
+        data["id"] = issue_id
+        changes.append({**change, "field": "created", "old": None, "new": data.get("status")})
+        if kind == "created":
+            save_issue(conn, {**data, "updated_at": at}, event_id)
+            return changes
+    elif kind == "created":
+        return changes
+
+    if kind in ("label_added", "label_removed"):
+        label = event_label(ev)
+        if label is None:
+            pass  # unparseable; still touches updated_at below
+        elif kind == "label_added":
+            cur = conn.execute("INSERT OR IGNORE INTO labels (issue_id, label) VALUES (?, ?)", (issue_id, label))
+            if cur.rowcount:
+                changes.append({**change, "field": "label", "old": None, "new": label})
+        else:
+            cur = conn.execute("DELETE FROM labels WHERE issue_id = ? AND label = ?", (issue_id, label))
+            if cur.rowcount:
+                changes.append({**change, "field": "label", "old": label, "new": None})
+    else:
+        for field, new in event_patch(ev).items():
+            old = data.get(field)
+            if old != new:
+                data[field] = new
+                changes.append({**change, "field": field, "old": old, "new": new})
+
+    data["updated_at"] = at or data.get("updated_at")
+    save_issue(conn, data, event_id)
+    return changes
+
+
+def record_changes(conn: sqlite3.Connection, changes: list[dict[str, Any]]) -> None:
+    def text(value: Any) -> str | None:
+        return value if value is None or isinstance(value, str) else json.dumps(value)
+
+    conn.executemany(
+        "INSERT INTO changes (event_id, issue_id, event_type, field, old, new, at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(c["event_id"], c["issue_id"], c["event_type"], c["field"], text(c["old"]), text(c["new"]), c["at"]) for c in changes],
+    )
+
+
+def seed_from_export(conn: sqlite3.Connection, beads_dir: Path) -> int:
+    """Load issues/labels from the exports; return the event id they are assumed current to."""
+    events_path = beads_dir / "backup" / "events.jsonl"
+    checkpoint = max((int(ev["id"]) for ev in load_jsonl(events_path)), default=0)
+    n = 0
+    for issue in load_jsonl(beads_dir / "issues.jsonl"):
+        labels = issue.pop("labels", None) or []
+        issue.pop("dependencies", None)
+        save_issue(conn, issue, checkpoint)
+        conn.executemany("INSERT OR IGNORE INTO labels (issue_id, label) VALUES (?, ?)", [(issue["id"], lab) for lab in labels])
+        n += 1
+    conn.executemany(
+        "INSERT OR IGNORE INTO labels (issue_id, label) VALUES (?, ?)",
+        ((row["issue_id"], row["label"]) for row in load_jsonl(beads_dir / "backup" / "labels.jsonl")),
+    )
+    set_meta(conn, "events_offset", events_path.stat().st_size if events_path.exists() else 0)
+    print(f"seeded {n} issues from {beads_dir}, checkpoint at event {checkpoint}", file=sys.stderr)
+    return checkpoint
+
+
+def apply_new_events(conn: sqlite3.Connection, beads_dir: Path, seed: str) -> tuple[list[dict[str, Any]], int, int]:
+    """Bring the store up to date in one transaction. Returns (changes, events applied, checkpoint)."""
+    with conn:
+        checkpoint_raw = get_meta(conn, "checkpoint")
+        if checkpoint_raw is None:
+            checkpoint = seed_from_export(conn, beads_dir) if seed == "export" else 0
+            set_meta(conn, "checkpoint", checkpoint)
+        else:
+            checkpoint = int(checkpoint_raw)
+        offset = int(get_meta(conn, "events_offset") or 0)
+        events, offset = read_new_events(beads_dir / "backup" / "events.jsonl", offset, checkpoint)
+        changes: list[dict[str, Any]] = []
+        for ev in events:
+            changes.extend(apply_event(conn, ev))
+        record_changes(conn, changes)
+        if events:
+            checkpoint = int(events[-1]["id"])
+        set_meta(conn, "checkpoint", checkpoint)
+        set_meta(conn, "events_offset", offset)
+    return changes, len(events), checkpoint
+
+
+def iter_changes(
+    conn: sqlite3.Connection, since: int, field: str | None, issue_id: str | None
+) -> Iterator[dict[str, Any]]:
+    query = "SELECT event_id, issue_id, event_type, field, old, new, at FROM changes WHERE event_id > ?"
+    params: list[Any] = [since]
+    if field:
+        query += " AND field = ?"
+        params.append(field)
+    if issue_id:
+        query += " AND issue_id = ?"
+        params.append(issue_id)
+    query += " ORDER BY event_id, rowid"
+    for row in conn.execute(query, params):
+        yield dict(zip(CHANGE_KEYS, row))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Materialise bead state from the events log.")
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory (default: .beads)")
+    parser.add_argument("--store", type=Path, help=f"State store (default: <beads-dir>/{STORE_NAME})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    a = sub.add_parser("apply", help="Apply events after the checkpoint")
+    a.add_argument("--emit", action="store_true", help="Print this run's changes as JSON lines on stdout")
+    a.add_argument("--seed", choices=["export", "none"], default="export", help="How to initialise an empty store")
+    c = sub.add_parser("changes", help="Print recorded changes as JSON lines")
+    c.add_argument("--since", type=int, default=0, help="Only changes from events after this id")
+    c.add_argument("--field", help="Only changes to this field (status, label, created, ...)")
+    c.add_argument("--issue", help="Only changes to this issue")
+    s = sub.add_parser("show", help="Print the materialised state of an issue")
+    s.add_argument("id")
+    st = sub.add_parser("stale", help="List issues not updated for N days")
+    st.add_argument("--days", type=int, default=30)
+    st.add_argument("--status", default="open")
+    args = parser.parse_args()
+
+    store = args.store or args.beads_dir / STORE_NAME
+    conn = open_store(store)
+    try:
+        if args.command == "apply":
+            start = time.perf_counter()
+            changes, n_events, checkpoint = apply_new_events(conn, args.beads_dir, args.seed)
+            if args.emit:
+                for change in changes:
+                    print(json.dumps({k: change[k] for k in CHANGE_KEYS}))
+            print(
+                f"applied {n_events} events, {len(changes)} changes, checkpoint {checkpoint} "
+                f"in {(time.perf_counter() - start) * 1000:.0f}ms",
+                file=sys.stderr,
+            )
+        elif args.command == "changes":
+            for change in iter_changes(conn, args.since, args.field, args.issue):
+                print(json.dumps(change))
+        elif args.command == "show":
+            data = load_issue(conn, args.id)
+            if data is None:
+                print(f"error: {args.id} not in {store}", file=sys.stderr)
+                return 1
+            data["labels"] = [r[0] for r in conn.execute("SELECT label FROM labels WHERE issue_id = ? ORDER BY label", (args.id,))]
+            print(json.dumps(data, indent=2, sort_keys=True))
+        else:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=args.days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            rows = conn.execute(
+                "SELECT id, priority, updated_at, json_extract(data, '$.title') FROM issues "
+                "WHERE status = ? AND updated_at < ? ORDER BY updated_at",
+                (args.status, cutoff),
+            )
+            for issue_id, priority, updated_at, title in rows:
+                print(f"{issue_id}\tP{priority}\t{updated_at}\t{title}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Columnar snapshot of the Beads exports for backlog analytics.
+
+Converts .beads/issues.jsonl and .beads/backup/{labels,dependencies,events}.jsonl
+into a directory of typed column files (default .beads/snapshot/):
+
+- int / time columns       array('q') (epoch seconds for times, NULL_INT for null)
+- dict columns             array('i') codes (-1 for null) + a JSON dictionary;
+                           used for low-cardinality strings (status, label, actor, ...)
+- str columns              UTF-8 blob + array('q') offsets
+
+Loading a column is one frombytes() call, so "status by module" style queries
+run over int codes instead of re-decoding JSON on every run.
+
+Updates are incremental:
+- events.jsonl is read from the byte offset the last build stopped at, and
+  only ids above the last seen event id are appended;
+- issues are re-materialised only for IDs touched by those events or whose
+  issues.jsonl line changed (CRC32 of the raw line, read through the
+  bead_offsets sidecar index, so unchanged records are never JSON-decoded).
+The backup label/dependency files, a removed issue, a shrunken events file or a
+format change trigger a full rebuild.
+
+With pyarrow installed, --parquet also writes <table>.parquet with dictionary
+types.
+
+Usage:
+  python3 scripts/beads_snapshot.py build [--rebuild] [--parquet]
+  python3 scripts/beads_snapshot.py stats
+  python3 scripts/beads_snapshot.py query {status-by-module,labels,fanout} [--top N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import time
+import zlib
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from bead_index import DEFAULT_BEADS_DIR, load_jsonl
+from bead_offsets import OffsetIndex
+
+
+SNAPSHOT_VERSION = 1
+NULL_INT = -(2**63)
+
+# table -> ((column, kind), ...); kinds: str | dict | int | time
+TABLES: dict[str, tuple[tuple[str, str], ...]] = {
+    "issues": (
+        ("id", "str"),
+        ("title", "str"),
+        ("status", "dict"),
+        ("priority", "int"),
+        ("issue_type", "dict"),
+        ("work_type", "dict"),
+        ("owner", "dict"),
+        ("assignee", "dict"),
+        ("created_by", "dict"),
+        ("created_at", "time"),
+        ("updated_at", "time"),
+        ("closed_at", "time"),
+        ("record_crc", "int"),
+    ),
+    "labels": (("issue_id", "dict"), ("label", "dict")),
+    "dependencies": (("issue_id", "dict"), ("depends_on_id", "dict"), ("type", "dict")),
+    "events": (("id", "int"), ("issue_id", "dict"), ("event_type", "dict"), ("actor", "dict"), ("created_at", "time")),
+}
+ISSUE_FIELDS = tuple(name for name, _ in TABLES["issues"])
+
+
+# ---------------------------------------------------------------------------
+# Column encoding
+# ---------------------------------------------------------------------------
+
+
+def to_epoch(value: Any) -> int:
+    if isinstance(value, int):
+        return value  # already decoded from a snapshot
+    if not value:
+        return NULL_INT
+    try:
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return NULL_INT
+
+
+def to_int(value: Any) -> int:
+    return NULL_INT if value is None else int(value)
+
+
+@dataclass
+class Column:
+    kind: str
+    data: array  # codes (dict), values (int/time) or offsets (str)
+    dictionary: list[str] | None = None
+    blob: bytes = b""
+
+    def __len__(self) -> int:
+        return len(self.data) - 1 if self.kind == "str" else len(self.data)
+
+    def __getitem__(self, i: int) -> Any:
+        if self.kind == "dict":
+            code = self.data[i]
+            return None if code < 0 else self.dictionary[code]
+        if self.kind == "str":
+            return self.blob[self.data[i]:self.data[i + 1]].decode("utf-8")
+        value = self.data[i]
+        return None if value == NULL_INT else value
+
+    def values(self) -> list[Any]:
+        if self.kind == "dict":
+            lookup = self.dictionary + [None]  # code -1 -> None
+            return [lookup[c] for c in self.data]
+        return [self[i] for i in range(len(self))]
+
+
+def encode_column(kind: str, values: list[Any]) -> Column:
+    if kind == "dict":
+        codes: dict[str, int] = {}
+        data = array("i", (-1 if v is None else codes.setdefault(v, len(codes)) for v in values))
+        return Column(kind, data, list(codes))
+    if kind == "str":
+        offsets = array("q", [0])
+        chunks = []
+        pos = 0
+        for v in values:
+            encoded = (v or "").encode("utf-8")
+            chunks.append(encoded)
+            pos += len(encoded)
+            offsets.append(pos)
+        return Column(kind, offsets, blob=b"".join(chunks))
+    convert = to_epoch if kind == "time" else to_int
+    return Column(kind, array("q", map(convert, values)))
+
+
+def write_column(out_dir: Path, table: str, name: str, col: Column) -> None:
+    stem = out_dir / f"{table}.{name}"
+    stem.with_name(stem.name + ".bin").write_bytes(col.data.tobytes())
+    if col.kind == "dict":
+        stem.with_name(stem.name + ".dict.json").write_text(json.dumps(col.dictionary), encoding="utf-8")
+    elif col.kind == "str":
+        stem.with_name(stem.name + ".blob").write_bytes(col.blob)
+
+
+def read_column(snap_dir: Path, table: str, name: str, kind: str, swap: bool) -> Column:
+    stem = snap_dir / f"{table}.{name}"
+    data = array("i" if kind == "dict" else "q")
+    data.frombytes(stem.with_name(stem.name + ".bin").read_bytes())
+    if swap:
+        data.byteswap()
+    col = Column(kind, data)
+    if kind == "dict":
+        col.dictionary = json.loads(stem.with_name(stem.name + ".dict.json").read_text(encoding="utf-8"))
+    elif kind == "str":
+        col.blob = stem.with_name(stem.name + ".blob").read_bytes()
+    return col
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+
+
+class Snapshot:
+    """Loaded columns: snapshot.tables["issues"]["status"] -> Column."""
+
+    def __init__(self, snap_dir: Path, manifest: dict[str, Any], tables: dict[str, dict[str, Column]]):
+        self.dir = snap_dir
+        self.manifest = manifest
+        self.tables = tables
+
+    @classmethod
+    def load(cls, snap_dir: Path) -> Snapshot:
+        manifest = json.loads((snap_dir / "manifest.json").read_text(encoding="utf-8"))
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"snapshot version {manifest.get('version')} != {SNAPSHOT_VERSION}")
+        swap = manifest["byteorder"] != sys.byteorder
+        tables = {
+            table: {name: read_column(snap_dir, table, name, kind, swap) for name, kind in columns}
+            for table, columns in TABLES.items()
+        }
+        return cls(snap_dir, manifest, tables)
+
+    def rows(self, table: str) -> int:
+        return self.manifest["tables"][table]["rows"]
+
+
+@dataclass
+class SnapshotState:
+    """Row-level form of a snapshot, patched in place by incremental updates."""
+
+    issues: dict[str, tuple]
+    labels: dict[str, list[str]]
+    dependencies: dict[str, list[tuple[str, str]]]
+    events: list[tuple]
+    events_offset: int = 0
+    last_event_id: int = 0
+
+    @classmethod
+    def from_snapshot(cls, snap: Snapshot) -> SnapshotState:
+        cols = snap.tables["issues"]
+        issue_values = [cols[name].values() for name in ISSUE_FIELDS]
+        issues = {row[0]: row for row in zip(*issue_values)}
+        labels: dict[str, list[str]] = {}
+        for issue_id, label in zip(snap.tables["labels"]["issue_id"].values(), snap.tables["labels"]["label"].values()):
+            labels.setdefault(issue_id, []).append(label)
+        dependencies: dict[str, list[tuple[str, str]]] = {}
+        deps = snap.tables["dependencies"]
+        for issue_id, dep, dep_type in zip(deps["issue_id"].values(), deps["depends_on_id"].values(), deps["type"].values()):
+            dependencies.setdefault(issue_id, []).append((dep, dep_type))
+        ev = snap.tables["events"]
+        events = list(zip(*(ev[name].values() for name, _ in TABLES["events"])))
+        source = snap.manifest["sources"]["events"]
+        return cls(issues, labels, dependencies, events, source["offset"], source["last_id"])
+
+    def table_values(self) -> dict[str, dict[str, list[Any]]]:
+        label_rows = [(i, lab) for i, labs in self.labels.items() for lab in labs]
+        dep_rows = [(i, d, t) for i, deps in self.dependencies.items() for d, t in deps]
+        row_sets = {
+            "issues": list(self.issues.values()),
+            "labels": label_rows,
+            "dependencies": dep_rows,
+            "events": self.events,
+        }
+        out: dict[str, dict[str, list[Any]]] = {}
+        for table, columns in TABLES.items():
+            rows = row_sets[table]
+            out[table] = {name: [row[i] for row in rows] for i, (name, _) in enumerate(columns)}
+        return out
+
+
+def issue_row(record: dict[str, Any], crc: int) -> tuple:
+    return tuple(crc if name == "record_crc" else record.get(name) for name in ISSUE_FIELDS)
+
+
+def apply_issue(state: SnapshotState, record: dict[str, Any], crc: int) -> None:
+    """Set an issue's row; inline labels/dependencies (the live set) replace stored rows."""
+    bead_id = record["id"]
+    state.issues[bead_id] = issue_row(record, crc)
+    if "labels" in record:
+        state.labels[bead_id] = sorted(set(record["labels"] or []))
+    if "dependencies" in record:
+        state.dependencies[bead_id] = [(d["depends_on_id"], d.get("type")) for d in record["dependencies"] or []]
+
+
+def file_stamp(path: Path) -> list[int]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return [0, 0]
+    return [st.st_size, st.st_mtime_ns]
+
+
+def read_events_from(path: Path, offset: int, after_id: int) -> tuple[list[tuple], int]:
+    """Parse events.jsonl lines past byte offset with id > after_id. Returns (rows, new offset)."""
+    if not path.exists():
+        return [], 0
+    rows = []
+    with path.open("rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1  # leave a partially written last line for next time
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        ev = json.loads(line)
+        if int(ev["id"]) > after_id:
+            rows.append((int(ev["id"]), ev["issue_id"], ev.get("event_type"), ev.get("actor"), ev.get("created_at")))
+    return rows, offset + end
+
+
+def iter_issue_crcs(index: OffsetIndex) -> Iterator[tuple[str, int]]:
+    for bead_id in index.ids():
+        yield bead_id, zlib.crc32(index.raw(bead_id))
+
+
+def build_full(beads_dir: Path, index: OffsetIndex) -> SnapshotState:
+    state = SnapshotState({}, {}, {}, [])
+    backup = beads_dir / "backup"
+    # Backup rows first; an issue's inline labels/dependencies then replace them.
+    for row in load_jsonl(backup / "labels.jsonl"):
+        state.labels.setdefault(row["issue_id"], []).append(row["label"])
+    for row in load_jsonl(backup / "dependencies.jsonl"):
+        state.dependencies.setdefault(row["issue_id"], []).append((row["depends_on_id"], row.get("type")))
+    for bead_id in index.ids():
+        raw = index.raw(bead_id)
+        apply_issue(state, json.loads(raw), zlib.crc32(raw))
+    state.events, state.events_offset = read_events_from(backup / "events.jsonl", 0, 0)
+    state.last_event_id = max((e[0] for e in state.events), default=0)
+    return state
+
+
+def update_incremental(
+    state: SnapshotState, beads_dir: Path, index: OffsetIndex
+) -> tuple[SnapshotState, int, int] | None:
+    """Patch state in place. Returns (state, new events, issues re-read) or None if a rebuild is needed."""
+    events_path = beads_dir / "backup" / "events.jsonl"
+    if file_stamp(events_path)[0] < state.events_offset:
+        return None  # events file rewritten
+    new_events, state.events_offset = read_events_from(events_path, state.events_offset, state.last_event_id)
+    state.events.extend(new_events)
+    state.last_event_id = max([state.last_event_id, *(e[0] for e in new_events)])
+
+    current = dict(iter_issue_crcs(index))
+    if state.issues.keys() - current.keys():
+        return None  # issues removed; their backup rows cannot be told apart
+    crc_pos = ISSUE_FIELDS.index("record_crc")
+    touched = {e[1] for e in new_events if e[1] in current}
+    touched.update(b for b, crc in current.items() if b not in state.issues or state.issues[b][crc_pos] != crc)
+    for bead_id, record in index.get_many(touched).items():
+        apply_issue(state, record, current[bead_id])
+    return state, len(new_events), len(touched)
+
+
+def write_snapshot(snap_dir: Path, state: SnapshotState, sources: dict[str, Any], mode: str) -> dict[str, Any]:
+    """Write all columns to a fresh directory, then swap it into place."""
+    tmp = snap_dir.with_name(snap_dir.name + ".new")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    tables_meta = {}
+    for table, values in state.table_values().items():
+        rows = 0
+        for name, kind in TABLES[table]:
+            col = encode_column(kind, values[name])
+            write_column(tmp, table, name, col)
+            rows = len(col)
+        tables_meta[table] = {"rows": rows, "columns": dict(TABLES[table])}
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "byteorder": sys.byteorder,
+        "built_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "mode": mode,
+        "sources": {**sources, "events": {"offset": state.events_offset, "last_id": state.last_event_id}},
+        "tables": tables_meta,
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    old = snap_dir.with_name(snap_dir.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if snap_dir.exists():
+        snap_dir.rename(old)
+    tmp.rename(snap_dir)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def write_parquet(snap: Snapshot, out_dir: Path) -> list[Path]:
+    """Write <table>.parquet per table with dictionary-typed string columns (needs pyarrow)."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Error: --parquet requires pyarrow (pip install pyarrow)")
+
+    written = []
+    for table, columns in snap.tables.items():
+        arrays = {}
+        for name, col in columns.items():
+            if col.kind == "dict":
+                codes = pyarrow.array([None if c < 0 else c for c in col.data], pyarrow.int32())
+                arrays[name] = pyarrow.DictionaryArray.from_arrays(codes, pyarrow.array(col.dictionary, pyarrow.string()))
+            elif col.kind == "time":
+                arrays[name] = pyarrow.array(col.values(), pyarrow.int64()).cast(pyarrow.timestamp("s", tz="UTC"))
+            elif col.kind == "int":
+                arrays[name] = pyarrow.array(col.values(), pyarrow.int64())
+            else:
+                arrays[name] = pyarrow.array(col.values(), pyarrow.string())
+        path = out_dir / f"{table}.parquet"
+        pyarrow.parquet.write_table(pyarrow.table(arrays), str(path))
+        written.append(path)
+    return written
+
+
+def build(beads_dir: Path, snap_dir: Path, rebuild: bool = False) -> tuple[dict[str, Any], str]:
+    """Bring the snapshot up to date. Returns (manifest, human-readable summary)."""
+    issues_path = beads_dir / "issues.jsonl"
+    backup = beads_dir / "backup"
+    sources = {
+        "issues": file_stamp(issues_path),
+        "labels": file_stamp(backup / "labels.jsonl"),
+        "dependencies": file_stamp(backup / "dependencies.jsonl"),
+    }
+    with OffsetIndex(issues_path) as index:
+        previous = None
+        if not rebuild and (snap_dir / "manifest.json").exists():
+            try:
+                previous = Snapshot.load(snap_dir)
+            except (OSError, ValueError, KeyError) as exc:
+                print(f"warning: unreadable snapshot, rebuilding: {exc}", file=sys.stderr)
+        if previous is not None and all(previous.manifest["sources"].get(k) == sources[k] for k in ("labels", "dependencies")):
+            result = update_incremental(SnapshotState.from_snapshot(previous), beads_dir, index)
+            if result is not None:
+                state, n_events, n_issues = result
+                if n_events == 0 and n_issues == 0 and previous.manifest["sources"]["issues"] == sources["issues"]:
+                    return previous.manifest, "up to date"
+                manifest = write_snapshot(snap_dir, state, sources, "incremental")
+                return manifest, f"incremental: {n_events} new events, {n_issues} issues re-read"
+        state = build_full(beads_dir, index)
+    manifest = write_snapshot(snap_dir, state, sources, "full")
+    return manifest, "full rebuild"
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+
+def query_status_by_module(snap: Snapshot) -> list[tuple[str, str, int]]:
+    """(module label, status, beads) over mod:* labels."""
+    issues = snap.tables["issues"]
+    labels = snap.tables["labels"]
+    status_of = dict(zip(issues["id"].values(), issues["status"].data))
+    label_dict = labels["label"].dictionary
+    issue_dict = labels["issue_id"].dictionary
+    module_codes = {i for i, label in enumerate(label_dict) if label.startswith("mod:")}
+    counts: Counter[tuple[int, int]] = Counter()
+    for issue_code, label_code in zip(labels["issue_id"].data, labels["label"].data):
+        if label_code in module_codes and issue_code >= 0:
+            status = status_of.get(issue_dict[issue_code], -1)
+            if status >= 0:  # -1: no such issue, or a null status
+                counts[(label_code, status)] += 1
+    status_dict = issues["status"].dictionary
+    return sorted(((label_dict[l], status_dict[s], n) for (l, s), n in counts.items()), key=lambda r: (r[0], -r[2]))
+
+
+def _top_codes(col: Column, top: int) -> list[tuple[str, int]]:
+    """The top most frequent non-null values of a dict column, with counts."""
+    counts = Counter(col.data)
+    counts.pop(-1, None)
+    return [(col.dictionary[code], n) for code, n in counts.most_common(top)]
+
+
+def query_label_counts(snap: Snapshot, top: int) -> list[tuple[str, int]]:
+    return _top_codes(snap.tables["labels"]["label"], top)
+
+
+def query_fanout(snap: Snapshot, top: int) -> list[tuple[str, int]]:
+    """Beads with the most dependents (rows naming them as depends_on_id)."""
+    return _top_codes(snap.tables["dependencies"]["depends_on_id"], top)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Columnar snapshot of the Beads exports.")
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory (default: .beads)")
+    parser.add_argument("--snapshot", type=Path, help="Snapshot directory (default: <beads-dir>/snapshot)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="Create or incrementally update the snapshot")
+    b.add_argument("--rebuild", action="store_true", help="Ignore the existing snapshot")
+    b.add_argument("--parquet", action="store_true", help="Also write <table>.parquet (needs pyarrow)")
+    sub.add_parser("stats", help="Show table sizes and source positions")
+    q = sub.add_parser("query", help="Run a canned analytics query")
+    q.add_argument("name", choices=["status-by-module", "labels", "fanout"])
+    q.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    snap_dir = args.snapshot or args.beads_dir / "snapshot"
+    if not (args.beads_dir / "issues.jsonl").exists():
+        print(f"error: no beads export at {args.beads_dir / 'issues.jsonl'}", file=sys.stderr)
+        return 2
+
+    if args.command == "build":
+        start = time.perf_counter()
+        manifest, summary = build(args.beads_dir, snap_dir, args.rebuild)
+        rows = ", ".join(f"{t}={m['rows']}" for t, m in manifest["tables"].items())
+        print(f"{snap_dir}: {summary} in {(time.perf_counter() - start) * 1000:.0f}ms ({rows})")
+        if args.parquet:
+            for path in write_parquet(Snapshot.load(snap_dir), snap_dir):
+                print(f"wrote {path}")
+        return 0
+
+    if not (snap_dir / "manifest.json").exists():
+        print(f"error: no snapshot at {snap_dir}; run build first", file=sys.stderr)
+        return 2
+    start = time.perf_counter()
+    snap = Snapshot.load(snap_dir)
+    loaded = time.perf_counter() - start
+
+    if args.command == "stats":
+        size = sum(p.stat().st_size for p in snap_dir.iterdir())
+        print(f"snapshot: {snap_dir} ({size / 1024:.0f} KiB, built {snap.manifest['built_at']}, {snap.manifest['mode']})")
+        for table in TABLES:
+            print(f"  {table:<13} {snap.rows(table):>7} rows")
+        events = snap.manifest["sources"]["events"]
+        print(f"  events through id {events['last_id']} (offset {events['offset']})")
+        print(f"loaded in {loaded * 1000:.1f}ms")
+        return 0
+
+    start = time.perf_counter()
+    if args.name == "status-by-module":
+        for module, status, n in query_status_by_module(snap):
+            print(f"{module:<24} {status:<12} {n:>5}")
+    elif args.name == "labels":
+        for label, n in query_label_counts(snap, args.top):
+            print(f"{n:>6}  {label}")
+    else:
+        for bead_id, n in query_fanout(snap, args.top):
+            print(f"{n:>6}  {bead_id}")
+    print(f"(load {loaded * 1000:.1f}ms, query {(time.perf_counter() - start) * 1000:.1f}ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Label inverted index over the Beads exports, with bitmap set operations.
+
+Every bead gets an ordinal; every label maps to a bitmap (a Python int, bit i
+set when bead i carries the label), and every prefix family (`mod:`, `theme:`,
+`complexity:`, `claimed_by:` ...) to the OR of its members. Status is indexed
+the same way as `status:<value>`. A query such as
+
+  mod:interflux AND theme:performance AND NOT closed
+
+is then a few big-int AND/OR/NOT operations instead of a scan over per-bead
+label sets.
+
+Bitmaps are persisted zlib-compressed in a sidecar (default
+.beads/label-index.json) keyed on the size/mtime of issues.jsonl and
+backup/labels.jsonl, so repeat queries skip JSON parsing entirely.
+
+Query syntax: terms joined by AND / OR / NOT with parentheses. A term is a
+label, a family (`mod:*`), `status:<value>`, or a bare status name (`open`,
+`closed`, `in_progress`, ...). AND binds tighter than OR.
+
+Usage:
+  python3 scripts/label_index.py query "mod:interflux AND theme:performance AND NOT closed"
+  python3 scripts/label_index.py families [--prefix mod:]
+  python3 scripts/label_index.py bench
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import re
+import sys
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterator
+
+from bead_index import DEFAULT_BEADS_DIR, BeadIndex
+
+
+INDEX_NAME = "label-index.json"
+INDEX_VERSION = 1
+STATUS_PREFIX = "status:"
+TOKEN_RE = re.compile(r"\(|\)|[^\s()]+")
+
+
+def family_of(label: str) -> str | None:
+    head, sep, _ = label.partition(":")
+    return head + sep if sep else None
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+def pack(bitmap: int) -> str:
+    raw = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    return base64.b64encode(zlib.compress(raw)).decode("ascii")
+
+
+def unpack(text: str) -> int:
+    return int.from_bytes(zlib.decompress(base64.b64decode(text)), "little")
+
+
+class LabelIndex:
+    """label -> bitmap of bead ordinals, plus prefix-family bitmaps."""
+
+    def __init__(self, ids: list[str], bitmaps: dict[str, int]):
+        self.ids = ids
+        self.ordinal = {bead_id: i for i, bead_id in enumerate(ids)}
+        self.bitmaps = bitmaps
+        self.universe = (1 << len(ids)) - 1
+        self.families: dict[str, int] = defaultdict(int)
+        for label, bitmap in bitmaps.items():
+            family = family_of(label)
+            if family:
+                self.families[family] |= bitmap
+
+    @classmethod
+    def build(cls, index: BeadIndex) -> LabelIndex:
+        ids = sorted(set(index.issues) | set(index.labels))
+        ordinal = {bead_id: i for i, bead_id in enumerate(ids)}
+        members: dict[str, list[int]] = defaultdict(list)
+        for bead_id, labels in index.labels.items():
+            for label in labels:
+                members[label].append(ordinal[bead_id])
+        for bead_id, issue in index.issues.items():
+            if issue.get("status"):
+                members[STATUS_PREFIX + issue["status"]].append(ordinal[bead_id])
+        bitmaps = {}
+        for label, ords in members.items():
+            bitmap = 0
+            for i in ords:
+                bitmap |= 1 << i
+            bitmaps[label] = bitmap
+        return cls(ids, bitmaps)
+
+    @classmethod
+    def open(cls, beads_dir: Path = DEFAULT_BEADS_DIR, path: Path | None = None) -> LabelIndex:
+        """Load the sidecar if it matches the exports, else rebuild and save it."""
+        path = path or beads_dir / INDEX_NAME
+        stamps = source_stamps(beads_dir)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION and data.get("sources") == stamps:
+                return cls(data["ids"], {label: unpack(v) for label, v in data["bitmaps"].items()})
+        except (OSError, ValueError, KeyError):
+            pass
+        built = cls.build(BeadIndex.load(beads_dir))
+        payload = {
+            "version": INDEX_VERSION,
+            "sources": stamps,
+            "ids": built.ids,
+            "bitmaps": {label: pack(b) for label, b in built.bitmaps.items()},
+        }
+        try:
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            tmp.replace(path)
+        except OSError as exc:
+            print(f"warning: could not write {path}: {exc}", file=sys.stderr)
+        return built
+
+    # -- lookups -------------------------------------------------------------
+
+    def term(self, token: str) -> int:
+        if token.endswith(":*"):
+            return self.families.get(token[:-1], 0)
+        if token in self.bitmaps:
+            return self.bitmaps[token]
+        # Bare status names: open, closed, in_progress, ...
+        return self.bitmaps.get(STATUS_PREFIX + token, 0)
+
+    def beads(self, bitmap: int) -> list[str]:
+        return [self.ids[i] for i in iter_bits(bitmap)]
+
+    def labels_of(self, bead_id: str) -> set[str]:
+        i = self.ordinal.get(bead_id)
+        if i is None:
+            return set()
+        bit = 1 << i
+        return {label for label, b in self.bitmaps.items() if b & bit and not label.startswith(STATUS_PREFIX)}
+
+    def family_counts(self, prefix: str | None = None) -> list[tuple[str, int]]:
+        labels = (l for l in self.bitmaps if not l.startswith(STATUS_PREFIX))
+        if prefix:
+            labels = (l for l in labels if l.startswith(prefix))
+        return sorted(((l, self.bitmaps[l].bit_count()) for l in labels), key=lambda r: (-r[1], r[0]))
+
+    # -- queries -------------------------------------------------------------
+
+    def query(self, expr: str) -> int:
+        """Evaluate an AND/OR/NOT expression to a bitmap."""
+        tokens = TOKEN_RE.findall(expr)
+        pos = 0
+
+        def peek() -> str | None:
+            return tokens[pos] if pos < len(tokens) else None
+
+        def take() -> str:
+            nonlocal pos
+            if pos >= len(tokens):
+                raise ValueError(f"unexpected end of query: {expr!r}")
+            pos += 1
+            return tokens[pos - 1]
+
+        def parse_or() -> int:
+            result = parse_and()
+            while peek() == "OR":
+                take()
+                result |= parse_and()
+            return result
+
+        def parse_and() -> int:
+            result = parse_not()
+            while peek() == "AND":
+                take()
+                result &= parse_not()
+            return result
+
+        def parse_not() -> int:
+            if peek() == "NOT":
+                take()
+                return self.universe & ~parse_not()
+            token = take()
+            if token == "(":
+                result = parse_or()
+                if take() != ")":
+                    raise ValueError(f"expected ')' in {expr!r}")
+                return result
+            if token in ("AND", "OR", ")"):
+                raise ValueError(f"unexpected {token!r} in {expr!r}")
+            return self.term(token)
+
+        result = parse_or()
+        if pos != len(tokens):
+            raise ValueError(f"trailing tokens in {expr!r}: {tokens[pos:]}")
+        return result
+
+
+def source_stamps(beads_dir: Path) -> list[list[int]]:
+    stamps = []
+    for path in (beads_dir / "issues.jsonl", beads_dir / "backup" / "labels.jsonl"):
+        try:
+            st = path.stat()
+            stamps.append([st.st_size, st.st_mtime_ns])
+        except FileNotFoundError:
+            stamps.append([0, 0])
+    return stamps
+
+
+def scan_query(index: BeadIndex, require: list[str], exclude_status: str) -> list[str]:
+    """The per-bead set scan the bitmap query replaces (used by bench)."""
+    out = []
+    for bead_id in sorted(set(index.issues) | set(index.labels)):
+        labels = index.labels.get(bead_id, set())
+        issue = index.issues.get(bead_id) or {}
+        if all(l in labels for l in require) and issue.get("status") != exclude_status:
+            out.append(bead_id)
+    return out
+
+
+def run_bench(beads_dir: Path) -> int:
+    start = time.perf_counter()
+    beads = BeadIndex.load(beads_dir)
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    labels = LabelIndex.build(beads)
+    build = time.perf_counter() - start
+    print(f"beads={len(labels.ids)} labels={len(labels.bitmaps)} families={len(labels.families)}")
+    print(f"  load exports {load * 1000:.1f}ms, build bitmaps {build * 1000:.1f}ms")
+
+    pairs = [(m, t) for m, _ in labels.family_counts("mod:")[:10] for t, _ in labels.family_counts("theme:")[:5]]
+    start = time.perf_counter()
+    scanned = [scan_query(beads, [m, t], "closed") for m, t in pairs]
+    scan = time.perf_counter() - start
+    start = time.perf_counter()
+    queried = [labels.beads(labels.query(f"{m} AND {t} AND NOT closed")) for m, t in pairs]
+    bitmap = time.perf_counter() - start
+    mismatches = sum(1 for a, b in zip(scanned, queried) if a != b)
+    print(f"  {len(pairs)} 'mod AND theme AND NOT closed' queries: scan {scan * 1000:.1f}ms, "
+          f"bitmap {bitmap * 1000:.2f}ms ({scan / bitmap:.0f}x), mismatches {mismatches}")
+    return 1 if mismatches else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bitmap label queries over the Beads exports.")
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory (default: .beads)")
+    parser.add_argument("--index", type=Path, help=f"Sidecar path (default: <beads-dir>/{INDEX_NAME})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    q = sub.add_parser("query", help="Print bead IDs matching an AND/OR/NOT label expression")
+    q.add_argument("expr")
+    q.add_argument("--count", action="store_true", help="Only print the number of matches")
+    f = sub.add_parser("families", help="Label counts, optionally within one prefix family")
+    f.add_argument("--prefix")
+    sub.add_parser("bench", help="Compare bitmap queries with a per-bead scan")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        return run_bench(args.beads_dir)
+
+    start = time.perf_counter()
+    labels = LabelIndex.open(args.beads_dir, args.index)
+    opened = time.perf_counter() - start
+    if args.command == "query":
+        try:
+            bitmap = labels.query(args.expr)
+        except ValueError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 2
+        if args.count:
+            print(bitmap.bit_count())
+        else:
+            print("\n".join(labels.beads(bitmap)))
+    else:
+        if not args.prefix:
+            for family, bitmap in sorted(labels.families.items(), key=lambda r: -r[1].bit_count()):
+                members = sum(1 for l in labels.bitmaps if l.startswith(family))
+                print(f"{bitmap.bit_count():>6}  {family:<16} ({members} labels)")
+        else:
+            for label, n in labels.family_counts(args.prefix):
+                print(f"{n:>6}  {label}")
+    print(f"(index {opened * 1000:.1f}ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -13,17 +13,34 @@ from __future__ import annotations
 
 import argparse
 import csv
+import json
 import re
 import subprocess
 import sys
+import time
 from dataclasses import dataclass
 from pathlib import Path
 
+from bead_index import DEFAULT_BEADS_DIR, TEXT_FIELDS, BeadIndex, issue_text, sql_literal
+
 
 ID_RE = re.compile(r"iv-[a-z0-9]+(?:\.[0-9]+)*", re.IGNORECASE)
 DECL_RE = re.compile(r"^\*\*Bead:\*\*\s*(.+)$", re.IGNORECASE)
 
 
+DOC_INDEX_VERSION = 1
+NOTES_CHUNK = 200
+
+
+@dataclass(frozen=True)
+class DocInfo:
+    """Everything collect_mappings needs from one doc, extracted in a single read."""
+
+    declared: tuple[str, ...]  # IDs from the first **Bead:** (or plain Bead:) line with any
+    inferred: str | None  # first iv-* token anywhere in the doc
+    title: str | None  # first non-empty markdown heading in the first 40 lines
+
+
 @dataclass(frozen=True)
 class Mapping:
     doc_path: str
@@ -36,11 +53,15 @@ def run(cmd: list[str]) -> subprocess.CompletedProcess[str]:
     return subprocess.run(cmd, text=True, capture_output=True, check=False)
 
 
-def bead_exists(bead_id: str) -> bool:
+def bead_exists(bead_id: str, index: BeadIndex | None = None) -> bool:
+    if index is not None:
+        return index.exists(bead_id)
     return run(["bd", "show", bead_id]).returncode == 0
 
 
-def bead_show_text(bead_id: str) -> str:
+def bead_show_text(bead_id: str, index: BeadIndex | None = None) -> str:
+    if index is not None:
+        return index.text(bead_id)
     result = run(["bd", "show", bead_id])
     if result.returncode != 0:
         return ""
@@ -55,19 +76,17 @@ def normalize_slug(path: Path) -> str:
     return name
 
 
-def title_from_doc(path: Path) -> str:
-    text = path.read_text(encoding="utf-8", errors="replace").splitlines()
-    for line in text[:40]:
-        line = line.strip()
-        if line.startswith("#"):
-            title = re.sub(r"^#+\s*", "", line).strip()
-            if title:
-                return f"[recovered-doc] {title}"[:220]
+def title_from_doc(path: Path, info: DocInfo | None = None) -> str:
+    info = info or scan_doc(path)
+    if info.title:
+        return f"[recovered-doc] {info.title}"[:220]
     return f"[recovered-doc] {path.stem}"[:220]
 
 
-def create_placeholder(bead_id: str, path: Path, kind: str, dry_run: bool) -> tuple[bool, str]:
-    title = title_from_doc(path)
+def create_placeholder(
+    bead_id: str, path: Path, kind: str, dry_run: bool, info: DocInfo | None = None
+) -> tuple[bool, str]:
+    title = title_from_doc(path, info)
     desc = (
         "Recovered placeholder bead created while mapping brainstorm/plan docs to beads.\n\n"
         f"- Source doc: {path.as_posix()}\n"
@@ -98,50 +117,143 @@ def create_placeholder(bead_id: str, path: Path, kind: str, dry_run: bool) -> tu
     return True, f"created {bead_id}"
 
 
-def append_doc_note(bead_id: str, mapping: Mapping, dry_run: bool) -> tuple[str, str]:
-    note = f"[doc-map] {mapping.doc_kind} ({mapping.mode}): {mapping.doc_path}"
-    current = bead_show_text(bead_id)
-    if mapping.doc_path in current:
-        return "skip", "already mapped"
-    cmd = ["bd", "update", bead_id, "--append-notes", note]
+def doc_note(mapping: Mapping) -> str:
+    return f"[doc-map] {mapping.doc_kind} ({mapping.mode}): {mapping.doc_path}"
+
+
+def fetch_bead_texts(bead_ids: list[str], index: BeadIndex | None = None) -> dict[str, str]:
+    """Map each existing bead ID to its TEXT_FIELDS text; missing IDs are absent.
+
+    One `bd sql` per NOTES_CHUNK IDs (or the offline index) replaces a
+    `bd show` existence check plus a `bd show` render per mapping. A chunk
+    whose query fails falls back to per-ID `bd show`.
+    """
+    if index is not None:
+        return {b: index.text(b) for b in bead_ids if index.exists(b)}
+    texts: dict[str, str] = {}
+    for i in range(0, len(bead_ids), NOTES_CHUNK):
+        chunk = bead_ids[i:i + NOTES_CHUNK]
+        columns = ", ".join(("id",) + TEXT_FIELDS)
+        q = f"select {columns} from issues where id in ({', '.join(sql_literal(b) for b in chunk)})"
+        result = run(["bd", "sql", "--json", q])
+        try:
+            if result.returncode != 0:
+                raise ValueError(result.stderr)
+            rows = {
+                str(row["id"]): issue_text(row)
+                for row in json.loads(result.stdout or "[]")
+            }
+        except (ValueError, KeyError, TypeError):
+            rows = {b: bead_show_text(b) for b in chunk if bead_exists(b)}
+        texts.update((b, rows[b]) for b in chunk if b in rows)
+    return texts
+
+
+def flush_doc_notes(pending: dict[str, list[str]], dry_run: bool) -> tuple[int, int]:
+    """Append queued notes with one `bd update` per bead. Returns (mapped, errors)."""
     if dry_run:
-        return "would_map", note
-    res = run(cmd)
-    if res.returncode != 0:
-        return "error", (res.stderr or "").strip()
-    return "mapped", note
+        return sum(len(notes) for notes in pending.values()), 0
+    mapped = 0
+    errors = 0
+    for bead_id, notes in pending.items():
+        res = run(["bd", "update", bead_id, "--append-notes", "\n".join(notes)])
+        if res.returncode != 0:
+            errors += len(notes)
+            print(f"error map {bead_id} ({len(notes)} notes): {(res.stderr or '').strip()}", file=sys.stderr)
+        else:
+            mapped += len(notes)
+    return mapped, errors
 
 
-def extract_ids(path: Path, infer_missing: bool) -> list[tuple[str, str]]:
+def scan_doc(path: Path) -> DocInfo:
     lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
-
-    # 1) Primary declaration.
-    for line in lines:
-        m = DECL_RE.match(line.strip())
-        if m:
-            ids = [i.lower() for i in ID_RE.findall(m.group(1))]
-            if ids:
-                return [(i, "declared") for i in ids]
-
-    # 2) Fallback "Bead:" plain declaration.
-    for line in lines:
-        if "Bead:" in line:
-            rhs = line.split("Bead:", 1)[1]
-            ids = [i.lower() for i in ID_RE.findall(rhs)]
-            if ids:
-                return [(i, "declared") for i in ids]
-
-    # 3) Inference fallback from early text.
-    if infer_missing:
-        full_text = "\n".join(lines)
-        m = ID_RE.search(full_text)
-        if m:
-            return [(m.group(0).lower(), "inferred")]
-
+    decl: list[str] = []
+    plain: list[str] = []
+    inferred: str | None = None
+    title: str | None = None
+    for n, line in enumerate(lines):
+        stripped = line.strip()
+        # 1) Primary declaration.
+        if not decl:
+            m = DECL_RE.match(stripped)
+            if m:
+                decl = [i.lower() for i in ID_RE.findall(m.group(1))]
+        # 2) Fallback "Bead:" plain declaration.
+        if not plain and "Bead:" in line:
+            plain = [i.lower() for i in ID_RE.findall(line.split("Bead:", 1)[1])]
+        # 3) Inference fallback from early text.
+        if inferred is None:
+            m = ID_RE.search(line)
+            if m:
+                inferred = m.group(0).lower()
+        if title is None and n < 40 and stripped.startswith("#"):
+            title = re.sub(r"^#+\s*", "", stripped).strip() or None
+        if decl and inferred and (title is not None or n >= 40):
+            break
+    return DocInfo(declared=tuple(decl or plain), inferred=inferred, title=title)
+
+
+def extract_ids(info: DocInfo, infer_missing: bool) -> list[tuple[str, str]]:
+    if info.declared:
+        return [(i, "declared") for i in info.declared]
+    if infer_missing and info.inferred:
+        return [(info.inferred, "inferred")]
     return []
 
 
-def collect_mappings(repo_root: Path, infer_missing: bool) -> list[Mapping]:
+class DocIndex:
+    """DocInfo per doc, cached on disk keyed by (path, mtime_ns, size).
+
+    Unchanged docs are served from the cache without being opened.
+    """
+
+    def __init__(self, cache_path: Path | None):
+        self.cache_path = cache_path
+        self.entries: dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_path is not None and cache_path.exists():
+            try:
+                data = json.loads(cache_path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                data = {}
+            if data.get("version") == DOC_INDEX_VERSION:
+                self.entries = data.get("docs", {})
+
+    def get(self, path: Path) -> DocInfo:
+        st = path.stat()
+        key = path.as_posix()
+        entry = self.entries.get(key)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            self.hits += 1
+            return DocInfo(tuple(entry["declared"]), entry["inferred"], entry["title"])
+        self.misses += 1
+        info = scan_doc(path)
+        self.entries[key] = {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "declared": list(info.declared),
+            "inferred": info.inferred,
+            "title": info.title,
+        }
+        return info
+
+    def save(self, live: set[str]) -> None:
+        """Persist entries for docs seen this run (drops deleted docs)."""
+        if self.cache_path is None:
+            return
+        docs = {k: v for k, v in self.entries.items() if k in live}
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": DOC_INDEX_VERSION, "docs": docs}), encoding="utf-8")
+        tmp.replace(self.cache_path)
+
+
+def collect_mappings(
+    repo_root: Path, infer_missing: bool, doc_index: DocIndex | None = None
+) -> tuple[list[Mapping], dict[str, DocInfo]]:
+    """Return mappings plus the DocInfo of every mapped doc (keyed by repo-relative path)."""
+    doc_index = doc_index or DocIndex(None)
     docs = sorted((repo_root / "docs" / "brainstorms").glob("*.md")) + sorted(
         (repo_root / "docs" / "plans").glob("*.md")
     )
@@ -149,8 +261,9 @@ def collect_mappings(repo_root: Path, infer_missing: bool) -> list[Mapping]:
 
     # Build sibling lookup from declared bead mappings across brainstorms/plans/prds.
     slug_to_ids: dict[str, set[str]] = {}
+    infos = {path: doc_index.get(path) for path in docs + prds}
     for path in docs + prds:
-        declared = extract_ids(path, infer_missing=False)
+        declared = extract_ids(infos[path], infer_missing=False)
         if not declared:
             continue
         slug = normalize_slug(path)
@@ -163,7 +276,7 @@ def collect_mappings(repo_root: Path, infer_missing: bool) -> list[Mapping]:
     for path in docs:
         rel = path.relative_to(repo_root).as_posix()
         kind = "brainstorm" if "/brainstorms/" in rel else "plan"
-        ids = extract_ids(path, infer_missing=infer_missing)
+        ids = extract_ids(infos[path], infer_missing=infer_missing)
         if not ids:
             sibling_ids = sorted(slug_to_ids.get(normalize_slug(path), set()))
             if sibling_ids:
@@ -179,7 +292,8 @@ def collect_mappings(repo_root: Path, infer_missing: bool) -> list[Mapping]:
             continue
         seen.add(key)
         unique.append(m)
-    return unique
+    doc_index.save({p.as_posix() for p in infos})
+    return unique, {p.relative_to(repo_root).as_posix(): infos[p] for p in docs}
 
 
 def main() -> int:
@@ -200,12 +314,32 @@ def main() -> int:
         default="/tmp/beads-recovery-122264884/brainstorm-plan-bead-map.csv",
         help="Path for mapping report CSV.",
     )
+    parser.add_argument(
+        "--doc-cache",
+        type=Path,
+        help="Doc index cache keyed by (path, mtime, size); default: doc-index.json next to the report CSV.",
+    )
+    parser.add_argument("--no-doc-cache", action="store_true", help="Re-read every doc.")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Answer reads from the .beads JSONL exports instead of bd (writes still use bd).",
+    )
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory for --offline.")
     args = parser.parse_args()
 
     repo_root = Path.cwd()
-    mappings = collect_mappings(repo_root, infer_missing=not args.no_infer)
-
+    index = BeadIndex.load(args.beads_dir) if args.offline else None
     report_path = Path(args.report_csv)
+    doc_cache = None if args.no_doc_cache else (args.doc_cache or report_path.parent / "doc-index.json")
+    doc_index = DocIndex(doc_cache)
+    start = time.perf_counter()
+    mappings, doc_infos = collect_mappings(repo_root, infer_missing=not args.no_infer, doc_index=doc_index)
+    print(
+        f"doc index: {doc_index.hits + doc_index.misses} docs in {time.perf_counter() - start:.2f}s "
+        f"({doc_index.misses} read, {doc_index.hits} cached)"
+    )
+
     report_path.parent.mkdir(parents=True, exist_ok=True)
     with report_path.open("w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
@@ -219,11 +353,13 @@ def main() -> int:
     errors = 0
     missing_ids: set[str] = set()
     unresolved_inferred = 0
-    known_existing: set[str] = set()
+    start = time.perf_counter()
+    bead_texts = fetch_bead_texts(sorted({m.bead_id for m in mappings}), index)
+    print(f"notes: {len(bead_texts)} beads fetched in {time.perf_counter() - start:.2f}s")
+    pending: dict[str, list[str]] = {}
 
     for m in mappings:
-        exists = m.bead_id in known_existing or bead_exists(m.bead_id)
-        if not exists:
+        if m.bead_id not in bead_texts:
             missing_ids.add(m.bead_id)
             if m.mode == "inferred":
                 unresolved_inferred += 1
@@ -239,25 +375,27 @@ def main() -> int:
                 repo_root / m.doc_path,
                 m.doc_kind,
                 dry_run=args.dry_run,
+                info=doc_infos.get(m.doc_path),
             )
             if not ok:
                 errors += 1
                 print(f"error create {m.bead_id}: {msg}", file=sys.stderr)
                 continue
             created += 1
-            known_existing.add(m.bead_id)
+            # The placeholder description names its source doc, so that doc
+            # counts as mapped; a dry run has created nothing yet.
+            bead_texts[m.bead_id] = "" if args.dry_run else m.doc_path
             print(msg)
-        else:
-            known_existing.add(m.bead_id)
 
-        status, detail = append_doc_note(m.bead_id, m, dry_run=args.dry_run)
-        if status in {"mapped", "would_map"}:
-            mapped += 1
-        elif status == "skip":
+        if m.doc_path in bead_texts[m.bead_id]:
             skipped += 1
-        else:
-            errors += 1
-            print(f"error map {m.bead_id} <- {m.doc_path}: {detail}", file=sys.stderr)
+            continue
+        pending.setdefault(m.bead_id, []).append(doc_note(m))
+        bead_texts[m.bead_id] += "\n" + m.doc_path
+
+    ok, failed = flush_doc_notes(pending, args.dry_run)
+    mapped += ok
+    errors += failed
 
     print(
         "summary:",
@@ -4,16 +4,30 @@ Replay missing bead placeholders from a commit-derived CSV manifest.
 
 CSV columns:
   id,repo,commit,date,subject
+
+Existence for every manifest ID is prefetched in bulk, then `bd create` runs
+on a bounded worker pool (--jobs) with exponential backoff on Dolt lock
+errors. Progress goes to a JSONL journal so a rerun skips IDs already
+created or skipped.
 """
 
 from __future__ import annotations
 
 import argparse
 import csv
+import json
+import random
+import re
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pathlib import Path
 
+from bead_index import DEFAULT_BEADS_DIR, BeadIndex, existing_ids
+
 
 def run_cmd(cmd: list[str], capture_output: bool = True) -> subprocess.CompletedProcess[str]:
     return subprocess.run(
@@ -24,11 +38,6 @@ def run_cmd(cmd: list[str], capture_output: bool = True) -> subprocess.Completed
     )
 
 
-def bead_exists(bead_id: str) -> bool:
-    result = run_cmd(["bd", "show", bead_id], capture_output=True)
-    return result.returncode == 0
-
-
 def normalize_title(subject: str) -> str:
     title = f"[recovered] {subject.strip()}"
     if len(title) <= 220:
@@ -49,6 +58,112 @@ def build_description(manifest_path: str, repo: str, commit: str, date: str, sub
     )
 
 
+MAX_ATTEMPTS = 5
+# bd surfaces transient Dolt contention with messages like these; anything else is permanent.
+LOCK_ERROR_RE = re.compile(
+    r"\b(?:database is locked|lock wait timeout|deadlock|serialization failure|try again|connection refused)\b",
+    re.IGNORECASE,
+)
+REQUIRED_COLUMNS = {"id", "repo", "commit", "date", "subject"}
+
+
+def prefetch_existing(bead_ids: list[str], index: BeadIndex | None = None) -> set[str]:
+    """Return the subset of bead_ids that already exist, in one query per chunk."""
+    if index is not None:
+        return {b for b in bead_ids if index.exists(b)}
+    return existing_ids(bead_ids)[0]
+
+
+def build_create_cmd(row: dict[str, str], manifest_path: str) -> list[str]:
+    bead_id, repo, commit, date, subject = (row[k] for k in ("id", "repo", "commit", "date", "subject"))
+    title = normalize_title(subject if subject else f"Recovered placeholder for {bead_id}")
+    description = build_description(manifest_path, repo, commit, date, subject)
+    cmd = [
+        "bd",
+        "create",
+        "--id",
+        bead_id,
+        "--type",
+        "task",
+        "--priority",
+        "2",
+        "--title",
+        title,
+        "--description",
+        description,
+        "--labels",
+        "recovered,placeholder",
+    ]
+    if commit:
+        cmd.extend(["--external-ref", f"git:{commit}"])
+    return cmd
+
+
+def create_with_retry(cmd: list[str], max_attempts: int = MAX_ATTEMPTS) -> tuple[bool, str, int]:
+    """Run bd create, backing off exponentially (with jitter) on Dolt lock errors.
+
+    Returns (ok, stderr, attempts).
+    """
+    for attempt in range(1, max_attempts + 1):
+        result = run_cmd(cmd, capture_output=True)
+        if result.returncode == 0:
+            return True, "", attempt
+        stderr = (result.stderr or result.stdout or "").strip()
+        if attempt > 1 and "already exists" in stderr.lower():
+            # An earlier attempt committed before its error surfaced.
+            return True, "already exists", attempt
+        if attempt == max_attempts or not LOCK_ERROR_RE.search(stderr):
+            return False, stderr, attempt
+        time.sleep(min(8.0, 0.25 * 2 ** (attempt - 1)) * (0.5 + random.random()))
+    return False, "retries exhausted", max_attempts
+
+
+class Journal:
+    """Append-only JSONL progress log; IDs recorded as created/skipped are done."""
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.done: set[str] = set()
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash
+                    if entry.get("status") in {"created", "skipped"}:
+                        self.done.add(entry["id"])
+                    else:
+                        self.done.discard(entry["id"])
+
+    def record(self, bead_id: str, status: str, detail: str = "") -> None:
+        if self.path is None:
+            return
+        entry = {"id": bead_id, "status": status, "detail": detail, "at": datetime.now(timezone.utc).isoformat()}
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+
+
+def read_manifest(csv_path: Path) -> tuple[list[dict[str, str]], set[str]]:
+    """Return stripped manifest rows (first row per ID wins) and any missing columns."""
+    with csv_path.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing_columns = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+        if missing_columns:
+            return [], missing_columns
+        rows: list[dict[str, str]] = []
+        seen: set[str] = set()
+        for row in reader:
+            clean = {k: (row.get(k) or "").strip() for k in REQUIRED_COLUMNS}
+            if not clean["id"] or clean["id"] in seen:
+                continue
+            seen.add(clean["id"])
+            rows.append(clean)
+    return rows, set()
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Replay missing bead placeholders from commit manifest CSV."
@@ -63,6 +178,19 @@ def main() -> int:
         action="store_true",
         help="Print actions without creating beads.",
     )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Answer reads from the .beads JSONL exports instead of bd (writes still use bd).",
+    )
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory for --offline.")
+    parser.add_argument("--jobs", type=int, default=4, help="Concurrent bd create workers (default: 4).")
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        help="Progress journal (JSONL) for resuming; default: <csv>.journal.jsonl.",
+    )
+    parser.add_argument("--no-journal", action="store_true", help="Do not read or write a progress journal.")
     args = parser.parse_args()
 
     csv_path = Path(args.csv)
@@ -70,77 +198,72 @@ def main() -> int:
         print(f"error: CSV not found: {csv_path}", file=sys.stderr)
         return 2
 
+    rows, missing_columns = read_manifest(csv_path)
+    if missing_columns:
+        print(
+            f"error: CSV missing columns: {', '.join(sorted(missing_columns))}",
+            file=sys.stderr,
+        )
+        return 2
+
+    index = BeadIndex.load(args.beads_dir) if args.offline else None
+    journal_path = None if args.no_journal or args.dry_run else (args.journal or csv_path.with_suffix(".journal.jsonl"))
+    journal = Journal(journal_path)
+
     created = 0
     skipped = 0
     failed = 0
 
-    with csv_path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        required = {"id", "repo", "commit", "date", "subject"}
-        missing_columns = required - set(reader.fieldnames or [])
-        if missing_columns:
-            print(
-                f"error: CSV missing columns: {', '.join(sorted(missing_columns))}",
-                file=sys.stderr,
-            )
-            return 2
-
-        for row in reader:
-            bead_id = (row.get("id") or "").strip()
-            repo = (row.get("repo") or "").strip()
-            commit = (row.get("commit") or "").strip()
-            date = (row.get("date") or "").strip()
-            subject = (row.get("subject") or "").strip()
-
-            if not bead_id:
-                continue
+    pending = [row for row in rows if row["id"] not in journal.done]
+    resumed = len(rows) - len(pending)
+    start = time.perf_counter()
+    existing = prefetch_existing([row["id"] for row in pending], index)
+    print(f"prefetch: {len(pending)} ids checked in {time.perf_counter() - start:.2f}s, {len(existing)} exist")
 
-            if bead_exists(bead_id):
-                skipped += 1
-                print(f"skip  {bead_id} (already exists)")
-                continue
-
-            title = normalize_title(subject if subject else f"Recovered placeholder for {bead_id}")
-            description = build_description(str(csv_path), repo, commit, date, subject)
-
-            cmd = [
-                "bd",
-                "create",
-                "--id",
-                bead_id,
-                "--type",
-                "task",
-                "--priority",
-                "2",
-                "--title",
-                title,
-                "--description",
-                description,
-                "--labels",
-                "recovered,placeholder",
-            ]
-            if commit:
-                cmd.extend(["--external-ref", f"git:{commit}"])
-
-            if args.dry_run:
-                print(f"would {bead_id}: {' '.join(cmd)}")
-                created += 1
-                continue
-
-            result = run_cmd(cmd, capture_output=True)
-            if result.returncode != 0:
-                failed += 1
-                stderr = (result.stderr or "").strip()
-                print(f"fail  {bead_id} :: {stderr}", file=sys.stderr)
-                continue
+    to_create: list[dict[str, str]] = []
+    for row in pending:
+        if row["id"] in existing:
+            skipped += 1
+            journal.record(row["id"], "skipped", "already exists")
+            print(f"skip  {row['id']} (already exists)")
+        else:
+            to_create.append(row)
 
+    if args.dry_run:
+        for row in to_create:
+            print(f"would {row['id']}: {' '.join(build_create_cmd(row, str(csv_path)))}")
             created += 1
-            print(f"create {bead_id}")
+    else:
+        start = time.perf_counter()
+        retried = 0
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            futures = {pool.submit(create_with_retry, build_create_cmd(row, str(csv_path))): row["id"] for row in to_create}
+            for future in as_completed(futures):
+                bead_id = futures[future]
+                ok, detail, attempts = future.result()
+                retried += attempts - 1
+                if ok and detail:
+                    skipped += 1
+                    journal.record(bead_id, "skipped", detail)
+                    print(f"skip  {bead_id} ({detail})")
+                elif ok:
+                    created += 1
+                    journal.record(bead_id, "created")
+                    print(f"create {bead_id}")
+                else:
+                    failed += 1
+                    journal.record(bead_id, "failed", detail)
+                    print(f"fail  {bead_id} :: {detail}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+        if to_create:
+            print(f"create: {len(to_create)} beads in {elapsed:.2f}s with {args.jobs} workers, {retried} retries")
 
     print(
-        f"summary: created={created} skipped={skipped} failed={failed} "
+        f"summary: created={created} skipped={skipped} failed={failed} resumed={resumed} "
         f"dry_run={str(args.dry_run).lower()}"
     )
+    if journal_path is not None:
+        print(f"journal: {journal_path}")
     return 1 if failed else 0
 
 
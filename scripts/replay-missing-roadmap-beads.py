@@ -4,66 +4,116 @@ Create placeholder beads for IDs referenced in roadmap docs but missing in Beads
 
 Scope:
 - docs/roadmap.json
-- any readable **/*roadmap*.md file in repo
+- any readable **/*roadmap*.md file in repo (gitignored dirs and caches pruned)
 """
 
 from __future__ import annotations
 
 import argparse
-import json
+import os
 import re
 import subprocess
 import sys
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator
+
+from bead_index import DEFAULT_BEADS_DIR, EXISTS_CHUNK, BeadIndex, existing_ids
 
 
 ID_RE = re.compile(r"iv-[a-z0-9]+(?:\.[0-9]+)*", re.IGNORECASE)
+ROADMAP_NAME_RE = re.compile(r".*roadmap.*\.md$")
+SCAN_WORKERS = min(8, os.cpu_count() or 1)
+# Never descended into, ignored or not: VCS metadata, dependency trees, caches.
+PRUNE_DIRS = {".git", "node_modules", ".tldrs", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
 
 
 def run(cmd: list[str]) -> subprocess.CompletedProcess[str]:
     return subprocess.run(cmd, text=True, capture_output=True, check=False)
 
 
-def bead_exists(bead_id: str) -> bool:
-    q = f"select count(*) as c from issues where id = '{bead_id}'"
-    result = run(["bd", "sql", "--json", q])
+def find_missing_ids(
+    bead_ids: set[str], index: BeadIndex | None = None, chunk_size: int = EXISTS_CHUNK
+) -> tuple[set[str], int]:
+    """Return (missing IDs, bd queries issued), checking IDs a chunk at a time."""
+    if index is not None:
+        return index.missing(bead_ids), 0
+    existing, queries = existing_ids(bead_ids, chunk_size)
+    return set(bead_ids) - existing, queries
+
+
+def ignored_dirs(repo_root: Path) -> set[Path]:
+    """Directories git ignores under repo_root (empty outside a git checkout)."""
+    result = run(["git", "-C", str(repo_root), "ls-files", "--others", "--ignored", "--exclude-standard", "--directory"])
     if result.returncode != 0:
-        return False
-    try:
-        rows = json.loads(result.stdout or "[]")
-        if not rows:
-            return False
-        return int(rows[0].get("c", 0)) > 0
-    except Exception:
-        return False
+        return set()
+    return {(repo_root / line.rstrip("/")).resolve() for line in result.stdout.splitlines() if line.endswith("/")}
 
 
 def find_roadmap_files(repo_root: Path) -> list[Path]:
-    files = sorted(p for p in repo_root.glob("**/*roadmap*.md") if ".git/" not in p.as_posix())
+    """Walk for *roadmap*.md, pruning PRUNE_DIRS and gitignored directories before descending.
+
+    Ignored directories that are themselves git checkouts (nested module repos)
+    are still walked, since their roadmaps are in scope.
+    """
+    skip = ignored_dirs(repo_root)
+    files: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(repo_root):
+        base = Path(dirpath)
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if d not in PRUNE_DIRS
+            and ((base / d).resolve() not in skip or (base / d / ".git").exists())
+        )
+        files.extend(base / f for f in filenames if ROADMAP_NAME_RE.match(f))
+    files.sort()
     json_path = repo_root / "docs" / "roadmap.json"
     if json_path.exists():
         files.append(json_path)
     return files
 
 
-def collect_missing_ids(repo_root: Path) -> tuple[set[str], dict[str, list[str]], list[str]]:
+def read_ids(path: Path) -> set[str] | None:
+    try:
+        text = path.read_text(encoding="utf-8", errors="replace")
+    except Exception:
+        return None
+    return {m.group(0).lower() for m in ID_RE.finditer(text)}
+
+
+def iter_roadmap_ids(
+    repo_root: Path, files: list[Path], unreadable: list[str], workers: int = SCAN_WORKERS
+) -> Iterator[tuple[str, str]]:
+    """Stream (bead_id, source) pairs, reading files on a thread pool in file order."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for path, ids in zip(files, pool.map(read_ids, files)):
+            rel = path.relative_to(repo_root).as_posix()
+            if ids is None:
+                unreadable.append(rel)
+                continue
+            for bead_id in ids:
+                yield bead_id, rel
+
+
+def collect_missing_ids(
+    repo_root: Path, index: BeadIndex | None = None, workers: int = SCAN_WORKERS
+) -> tuple[set[str], dict[str, list[str]], list[str]]:
+    start = time.perf_counter()
     files = find_roadmap_files(repo_root)
     ids_to_sources: dict[str, list[str]] = defaultdict(list)
     unreadable: list[str] = []
 
-    for path in files:
-        rel = path.relative_to(repo_root).as_posix()
-        try:
-            text = path.read_text(encoding="utf-8", errors="replace")
-        except Exception:
-            unreadable.append(rel)
-            continue
-        for bead_id in {m.group(0).lower() for m in ID_RE.finditer(text)}:
-            ids_to_sources[bead_id].append(rel)
+    for bead_id, rel in iter_roadmap_ids(repo_root, files, unreadable, workers):
+        ids_to_sources[bead_id].append(rel)
+    print(f"scan: {len(files)} roadmap files in {time.perf_counter() - start:.2f}s")
 
     referenced = set(ids_to_sources.keys())
-    missing = {bead_id for bead_id in referenced if not bead_exists(bead_id)}
+    start = time.perf_counter()
+    missing, queries = find_missing_ids(referenced, index)
+    source = "offline index" if index is not None else f"{queries} bd queries"
+    print(f"existence: {len(referenced)} ids checked in {time.perf_counter() - start:.2f}s ({source})")
     return missing, ids_to_sources, unreadable
 
 
@@ -113,10 +163,18 @@ def create_placeholder(bead_id: str, sources: list[str], dry_run: bool) -> tuple
 def main() -> int:
     parser = argparse.ArgumentParser(description="Create missing roadmap beads.")
     parser.add_argument("--dry-run", action="store_true", help="Preview only")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help="Threads for reading roadmap files")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Answer reads from the .beads JSONL exports instead of bd (writes still use bd).",
+    )
+    parser.add_argument("--beads-dir", type=Path, default=DEFAULT_BEADS_DIR, help="Beads directory for --offline.")
     args = parser.parse_args()
 
     repo_root = Path.cwd()
-    missing, ids_to_sources, unreadable = collect_missing_ids(repo_root)
+    index = BeadIndex.load(args.beads_dir) if args.offline else None
+    missing, ids_to_sources, unreadable = collect_missing_ids(repo_root, index, args.workers)
 
     created = 0
     skipped = 0
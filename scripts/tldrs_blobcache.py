@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Content-addressed layer for the tldrs AST cache, keyed by git blob SHA.
+
+Path-keyed entries in .tldrs/cache are valid only while a file's mtime_ns
+and size match, so a fresh clone, a branch switch or a CI runner throws away
+parses of byte-identical files. This module keeps a second PackedAstCache
+(see tldrs_cache.py) keyed by the file's git blob SHA-1, taken straight from
+`git ls-files -s`, in a host-wide directory (default
+$XDG_CACHE_HOME/tldrs/blobs) that every checkout and worktree shares:
+
+  publish   copy fresh path-keyed entries of tracked files into the blob store
+  hydrate   for tracked files without a fresh path-keyed entry, write one from
+            the blob store into ast/*.json (the layout tldrs reads), stamped
+            with the file's current mtime_ns/size and path, so tldrs finds it
+            fresh instead of reparsing; a migrated ast.pack picks the new
+            files up on its next sync
+  sync      publish, then hydrate
+
+Files that differ from the index (`git ls-files -m`) are hashed the way git
+does (SHA-1 of "blob <len>\\0" + bytes); everything else is never read.
+Untracked files, symlinks and submodule links are skipped. Module checkouts
+that the root repo ignores (apps/*, research/* ...) are listed with their own
+`git ls-files`. Commands hold an exclusive flock on the blob store, so
+concurrent worktrees take turns.
+
+Usage:
+  python3 scripts/tldrs_blobcache.py sync [--root DIR] [--shared DIR]
+  python3 scripts/tldrs_blobcache.py publish | hydrate
+  python3 scripts/tldrs_blobcache.py get REL_PATH
+  python3 scripts/tldrs_blobcache.py stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+from tldrs_cache import DEFAULT_CACHE_DIR, JsonAstCache, PackedAstCache, open_cache, path_key, relative_path
+
+
+DEFAULT_SHARED_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "tldrs" / "blobs"
+LOCK_NAME = "lock"
+BLOB_MODES = {"100644", "100755"}
+PRUNE_DIRS = {".git", "node_modules", "target", "dist", "build", ".venv", "venv", "__pycache__"}
+
+
+def run(cmd: list[str]) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(cmd, text=True, capture_output=True, check=False)
+
+
+def git_blob_sha(path: Path) -> str:
+    """The SHA git would give path's current bytes (`git hash-object`)."""
+    data = path.read_bytes()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def find_repos(root: Path) -> list[Path]:
+    """root (if a checkout) plus module checkouts inside directories it ignores."""
+    repos = [root] if (root / ".git").exists() else []
+    result = run(["git", "-C", str(root), "ls-files", "--others", "--ignored", "--exclude-standard", "--directory"])
+    ignored = [root / line.rstrip("/") for line in result.stdout.splitlines() if line.endswith("/")]
+    for top in ignored:
+        if top.name in PRUNE_DIRS:
+            continue
+        for dirpath, dirnames, _ in os.walk(top):
+            if ".git" in dirnames or (Path(dirpath) / ".git").is_file():  # worktrees use a .git file
+                repos.append(Path(dirpath))
+                dirnames[:] = []
+            else:
+                dirnames[:] = [d for d in dirnames if d not in PRUNE_DIRS]
+    return repos
+
+
+def tracked_blobs(repo: Path) -> dict[str, str]:
+    """Path relative to repo -> blob SHA of its current content."""
+    listed = run(["git", "-C", str(repo), "ls-files", "-s", "-z"])
+    blobs = {}
+    for record in listed.stdout.split("\0"):
+        meta, _, path = record.partition("\t")
+        parts = meta.split()
+        if path and len(parts) == 3 and parts[0] in BLOB_MODES and parts[2] == "0":
+            blobs[path] = parts[1]
+    modified = run(["git", "-C", str(repo), "ls-files", "-m", "-z"])
+    for path in filter(None, modified.stdout.split("\0")):
+        try:
+            blobs[path] = git_blob_sha(repo / path)
+        except OSError:
+            blobs.pop(path, None)  # deleted in the worktree
+    return blobs
+
+
+def blob_map(root: Path, workers: int = 8) -> dict[str, str]:
+    """Path relative to root -> blob SHA, across root and its module checkouts."""
+    repos = find_repos(root)
+    out: dict[str, str] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for repo, blobs in zip(repos, pool.map(tracked_blobs, repos)):
+            prefix = repo.relative_to(root).as_posix()
+            prefix = "" if prefix == "." else prefix + "/"
+            out.update((prefix + path, sha) for path, sha in blobs.items())
+    return out
+
+
+def blob_key(sha: str) -> bytes:
+    return bytes.fromhex(sha)
+
+
+@contextlib.contextmanager
+def open_shared(shared_dir: Path) -> Iterator[PackedAstCache]:
+    """The host-wide blob store, held under an exclusive lock."""
+    shared_dir.mkdir(parents=True, exist_ok=True)
+    with (shared_dir / LOCK_NAME).open("a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with PackedAstCache(shared_dir) as store:
+            yield store
+
+
+def is_fresh(st: os.stat_result | None, mtime_ns: int, size: int) -> bool:
+    return st is not None and (st.st_mtime_ns, st.st_size) == (mtime_ns, size)
+
+
+def stat_or_none(path: Path) -> os.stat_result | None:
+    try:
+        return path.stat()
+    except OSError:
+        return None
+
+
+def publish(local: PackedAstCache | JsonAstCache, root: Path, blobs: dict[str, str], store: PackedAstCache) -> dict[str, int]:
+    """Copy fresh path-keyed entries of tracked files into the blob store."""
+    counts = {"published": 0, "present": 0, "skipped": 0}
+    for key in local.keys():
+        header = local.header(key)
+        rel = relative_path(key, header.file_path) if header else None
+        sha = blobs.get(rel) if rel else None
+        if sha is None or not is_fresh(stat_or_none(root / rel), header.mtime_ns, header.size):
+            counts["skipped"] += 1
+            continue
+        if store.header(blob_key(sha)) is not None:
+            counts["present"] += 1
+            continue
+        entry = local.get(key)
+        entry["module_info"]["file_path"] = rel  # blobs are path-independent; hydrate sets the real path
+        store.put(blob_key(sha), 0, entry["size"], entry["module_info"])
+        counts["published"] += 1
+    return counts
+
+
+def hydrate(local: JsonAstCache, root: Path, blobs: dict[str, str], store: PackedAstCache) -> dict[str, int]:
+    """Write ast/*.json entries for tracked files whose content the blob store already has.
+
+    Always the JSON layout: that is what tldrs reads, and ast.pack syncs from it.
+    """
+    counts = {"hydrated": 0, "fresh": 0, "not_in_store": 0}
+    for rel, sha in blobs.items():
+        if store.header(blob_key(sha)) is None:
+            counts["not_in_store"] += 1
+            continue
+        key = path_key(rel)
+        st = stat_or_none(root / rel)
+        if st is None:
+            continue
+        header = local.header(key)
+        if header is not None and is_fresh(st, header.mtime_ns, header.size):
+            counts["fresh"] += 1
+            continue
+        module_info = store.get(blob_key(sha))["module_info"]
+        module_info["file_path"] = str(root / rel)
+        local.put(key, st.st_mtime_ns, st.st_size, module_info)
+        counts["hydrated"] += 1
+    local.flush()
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Content-addressed (git blob SHA) layer for the tldrs AST cache.")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="Path-keyed tldrs cache directory")
+    parser.add_argument("--ast-dir", type=Path, help="Per-file JSON cache (default: <cache-dir>/ast)")
+    parser.add_argument("--shared", type=Path, default=DEFAULT_SHARED_DIR, help=f"Blob store (default: {DEFAULT_SHARED_DIR})")
+    parser.add_argument("--root", type=Path, default=Path.cwd(), help="Checkout root (default: cwd)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sync", help="Publish, then hydrate")
+    sub.add_parser("publish", help="Copy fresh entries of tracked files into the blob store")
+    sub.add_parser("hydrate", help="Fill stale/missing entries from the blob store")
+    g = sub.add_parser("get", help="Print the blob-store entry for a file's current content")
+    g.add_argument("path")
+    sub.add_parser("stats", help="Blob store size and coverage of this checkout")
+    args = parser.parse_args()
+
+    root = args.root.resolve()
+    start = time.perf_counter()
+    blobs = blob_map(root)
+    listed = time.perf_counter() - start
+    print(f"{len(blobs)} tracked files listed in {listed * 1000:.0f}ms", file=sys.stderr)
+
+    with open_shared(args.shared) as store:
+        if args.command == "get":
+            sha = blobs.get(args.path)
+            entry = store.get(blob_key(sha)) if sha else None
+            if entry is None:
+                print(f"error: no blob-store entry for {args.path}", file=sys.stderr)
+                return 1
+            print(json.dumps(entry["module_info"], indent=2))
+            return 0
+        if args.command == "stats":
+            covered = sum(1 for sha in blobs.values() if store.header(blob_key(sha)) is not None)
+            print(f"blob store: {len(store)} entries, {store.disk_bytes() / 1e6:.1f} MB at {args.shared}")
+            print(f"this checkout: {covered} of {len(blobs)} tracked files have a stored parse")
+            return 0
+        # publish may read through the (synced) pack; hydrate must write ast/.
+        local = open_cache(args.cache_dir, args.ast_dir)
+        ast = JsonAstCache(args.ast_dir or args.cache_dir / "ast")
+        try:
+            for step in ("publish", "hydrate"):
+                if args.command in (step, "sync"):
+                    start = time.perf_counter()
+                    if step == "publish":
+                        counts = publish(local, root, blobs, store)
+                    else:
+                        counts = hydrate(ast, root, blobs, store)
+                    elapsed = time.perf_counter() - start
+                    print(f"{step}: " + " ".join(f"{k}={v}" for k, v in counts.items()) + f" in {elapsed * 1000:.0f}ms")
+        finally:
+            if isinstance(local, PackedAstCache):
+                local.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,878 @@
+#!/usr/bin/env python3
+"""
+Packed single-file store for the tldrs AST cache.
+
+.tldrs/cache/ast/ holds one JSON file per source file, named by the MD5 of
+the repo-relative path and shaped {"mtime_ns", "size", "module_info"}.
+Cold-loading thousands of them costs an open/read/json.loads each, plus an
+inode per entry. This module packs the same entries into:
+
+  ast.pack   append-only segment: 8-byte file magic, then one record per
+             put/delete (layout below)
+  ast.idx    open-addressing hash table (key -> record offset) in a flat
+             file, probed through mmap without loading it
+
+A record is split so readers pay only for what they use:
+
+  RECORD      fixed header: key, mtime_ns, size, flags, path length, body
+              length, CRC32 of path + section table
+  file_path   raw UTF-8, so freshness checks need no decompression
+  table       (length, CRC32) per entry in SECTIONS
+  blocks      one compact JSON block per section, zlib-compressed unless
+              that would not shrink it: "meta" (language, docstring, any
+              other scalar keys), then imports, classes, functions,
+              call_graph
+
+header() returns mtime_ns/size/file_path from the first two parts alone;
+entry() returns an AstEntry that decompresses a section the first time it is
+asked for, and get(key, sections) builds module_info from just those.
+
+Keys are 20 bytes: MD5 path keys (the JSON layout's file names) are
+zero-padded, leaving room for 20-byte content hashes. A put or delete appends
+a record; flush() rewrites the index, and compacts the segment (copying only
+live records) once dead bytes exceed COMPACT_RATIO of it. A stale or missing
+index is rebuilt by scanning the segment from the last covered offset. The
+store assumes a single writer.
+
+tldrs itself reads and writes only the per-file JSON layout, so ast/ stays
+the source of truth and ast.pack is a derived, read-optimised copy of it.
+`migrate` builds the pack; open_cache() then re-imports JSON files modified
+since the last sync (recorded in ast.sync) and drops entries whose JSON file
+is gone before handing the pack out, so readers never see a stale snapshot.
+The pack pays off for header reads and section projections; a full load
+decodes the same JSON as ast/ plus zlib, and runs slightly slower.
+
+`gc` sweeps ast/ first and then, if one exists, the pack (after syncing it).
+It stats every referenced source file on a thread pool (STAT_BATCH paths per
+task) and evicts entries whose source is gone (orphaned) or whose
+mtime_ns/size no longer match (stale). Entries
+recorded under another checkout's root (e.g. /home/mk/projects/Demarch) are
+relocated to --root when the file there still matches. With --budget-mb, the
+survivors whose sources were modified longest ago are evicted until the
+remaining entries fit (oldest-source-first). The cache does not record reads,
+and source atimes barely move under relatime/noatime, so this is not LRU.
+
+Usage:
+  python3 scripts/tldrs_cache.py migrate [--ast-dir .tldrs/cache/ast]
+  python3 scripts/tldrs_cache.py get REL_PATH [--sections imports,call_graph]
+  python3 scripts/tldrs_cache.py check [--root DIR]
+  python3 scripts/tldrs_cache.py gc [--root DIR] [--budget-mb N] [--workers N] [--dry-run]
+  python3 scripts/tldrs_cache.py stats | compact
+  python3 scripts/tldrs_cache.py bench
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import gc
+import hashlib
+import json
+import mmap
+import os
+import re
+import signal
+import struct
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple
+
+
+DEFAULT_CACHE_DIR = Path(".tldrs/cache")
+PACK_NAME = "ast.pack"
+INDEX_NAME = "ast.idx"
+SYNC_NAME = "ast.sync"  # ns timestamp of the last JSON scan that started
+
+SEGMENT_MAGIC = b"TLDRSEG2"
+RECORD_MAGIC = b"TRC2"
+# magic, key, mtime_ns, size, flags, path_len, body_len, crc32(path + section table)
+RECORD = struct.Struct("<4s20sqqBxHII")
+SECTIONS = ("meta", "imports", "classes", "functions", "call_graph")
+SECTION_TABLE = struct.Struct("<" + "II" * len(SECTIONS))  # (length, crc32) per section
+INDEX_MAGIC = b"TLDRIDX1"
+# magic, slot_count, live_count, segment bytes covered, live record bytes
+INDEX_HEADER = struct.Struct("<8sQQQQ")
+SLOT = struct.Struct("<20sQ")  # key, record offset + 1 (0 = empty slot)
+KEY_BYTES = 20
+FLAG_DELETED = 1
+COMPACT_RATIO = 0.5
+COMPACT_MIN_BYTES = 1 << 20
+STAT_BATCH = 256
+
+
+def path_key(rel_path: str) -> bytes:
+    """Store key for a repo-relative path: MD5 as tldrs names its JSON files."""
+    return hashlib.md5(rel_path.encode("utf-8")).digest().ljust(KEY_BYTES, b"\0")
+
+
+def hex_key(name: str) -> bytes:
+    return bytes.fromhex(name).ljust(KEY_BYTES, b"\0")
+
+
+def relative_path(key: bytes, file_path: str) -> str | None:
+    """Repo-relative path of an entry: the suffix of file_path whose MD5 is key."""
+    parts = file_path.split("/")
+    for i in range(len(parts)):
+        rel = "/".join(parts[i:])
+        if path_key(rel) == key:
+            return rel
+    return None
+
+
+# Prefix of a JSON-layout entry as tldrs writes it, for header-only reads.
+JSON_HEADER_RE = re.compile(
+    rb'\{\s*"mtime_ns":\s*(\d+),\s*"size":\s*(\d+),\s*"module_info":\s*\{\s*"file_path":\s*"((?:[^"\\]|\\.)*)"'
+)
+JSON_HEADER_BYTES = 1024
+ZLIB_LEAD = 0x78  # first byte of every zlib stream; no JSON text starts with "x"
+_decode_json = json.JSONDecoder().decode
+
+
+class EntryHeader(NamedTuple):
+    mtime_ns: int
+    size: int
+    file_path: str
+
+
+def encode_body(module_info: dict[str, Any]) -> tuple[bytes, bytes]:
+    """(path bytes, section table + blocks) for a record."""
+    meta = {k: v for k, v in module_info.items() if k not in SECTIONS and k != "file_path"}
+    parts = {"meta": meta, **{name: module_info[name] for name in SECTIONS[1:] if name in module_info}}
+    table, blocks = [], []
+    for name in SECTIONS:
+        # An absent section is a zero-length block; one that zlib cannot shrink
+        # ("[]", short meta) is stored as plain JSON.
+        block = b""
+        if name in parts:
+            raw = json.dumps(parts[name], separators=(",", ":")).encode("utf-8")
+            packed = zlib.compress(raw, 6)
+            block = packed if len(packed) < len(raw) else raw
+        table += [len(block), zlib.crc32(block)]
+        blocks.append(block)
+    path = module_info.get("file_path", "").encode("utf-8")
+    return path, SECTION_TABLE.pack(*table) + b"".join(blocks)
+
+
+class AstEntry:
+    """One packed entry: header fields up front, sections decoded on first use."""
+
+    __slots__ = ("mtime_ns", "size", "file_path", "_table", "_blocks", "_decoded")
+
+    def __init__(self, header: EntryHeader, table: tuple[int, ...], blocks: bytes):
+        self.mtime_ns, self.size, self.file_path = header
+        self._table = table
+        self._blocks = blocks
+        self._decoded: dict[str, Any] = {}
+
+    def has(self, name: str) -> bool:
+        return self._table[2 * SECTIONS.index(name)] > 0
+
+    def section(self, name: str) -> Any:
+        """Decoded section (None if the entry has no such section)."""
+        if name not in self._decoded:
+            i = SECTIONS.index(name)
+            start = sum(self._table[0:2 * i:2])
+            block = self._blocks[start:start + self._table[2 * i]]
+            if zlib.crc32(block) != self._table[2 * i + 1]:
+                raise ValueError(f"checksum mismatch in {name} section of {self.file_path}")
+            if not block:
+                self._decoded[name] = None
+            else:
+                raw = zlib.decompress(block) if block[0] == ZLIB_LEAD else block
+                self._decoded[name] = _decode_json(raw.decode("utf-8"))
+        return self._decoded[name]
+
+    def _decode_all(self) -> None:
+        """Decode every pending section with one JSON parse instead of one per section."""
+        names, raws = [], []
+        start = 0
+        for i, name in enumerate(SECTIONS):
+            block = self._blocks[start:start + self._table[2 * i]]
+            start += len(block)
+            if name in self._decoded:
+                continue
+            if zlib.crc32(block) != self._table[2 * i + 1]:
+                raise ValueError(f"checksum mismatch in {name} section of {self.file_path}")
+            names.append(name)
+            raws.append(b"null" if not block else zlib.decompress(block) if block[0] == ZLIB_LEAD else block)
+        self._decoded.update(zip(names, _decode_json("[" + b",".join(raws).decode("utf-8") + "]")))
+
+    def module_info(self, sections: tuple[str, ...] | list[str] | None = None) -> dict[str, Any]:
+        """module_info with file_path, meta keys and the requested sections (default: all)."""
+        if sections is None:
+            self._decode_all()
+        info: dict[str, Any] = {"file_path": self.file_path}
+        info.update(self.section("meta") or {})
+        for name in sections or SECTIONS[1:]:
+            if name != "meta" and self.has(name):
+                info[name] = self.section(name)
+        return info
+
+
+class PackedAstCache:
+    """Append-only packed AST cache with an mmapped hash index."""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.pack_path = cache_dir / PACK_NAME
+        self.index_path = cache_dir / INDEX_NAME
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        if not self.pack_path.exists():
+            self.pack_path.write_bytes(SEGMENT_MAGIC)
+        self._pack = self.pack_path.open("r+b")
+        if self._pack.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+            raise ValueError(f"{self.pack_path} is not a {SEGMENT_MAGIC.decode()} segment; delete it and re-run migrate")
+        self._size = self._segment_size()
+        self._seg: mmap.mmap | None = None
+        self._idx: mmap.mmap | None = None
+        self._idx_file = None
+        self._slots = 0
+        self.live_count = 0
+        self.live_bytes = 0
+        self._pending: dict[bytes, int] = {}  # key -> offset (-1 = deleted) since the index was written
+        self._open_index()
+        self._segment()  # map up front so concurrent readers (gc) share one mapping
+
+    # -- segment -------------------------------------------------------------
+
+    def _segment_size(self) -> int:
+        return os.fstat(self._pack.fileno()).st_size
+
+    def _segment(self) -> mmap.mmap:
+        if self._seg is None or len(self._seg) != self._size:
+            if self._seg is not None:
+                self._seg.close()
+            self._seg = mmap.mmap(self._pack.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._seg
+
+    def _record_at(self, offset: int) -> tuple[tuple, int]:
+        """(RECORD fields, body offset) for the record at offset."""
+        seg = self._segment()
+        fields = RECORD.unpack_from(seg, offset)
+        if fields[0] != RECORD_MAGIC:
+            raise ValueError(f"corrupt record at offset {offset} in {self.pack_path}")
+        return fields, offset + RECORD.size
+
+    def iter_records(self, start: int = len(SEGMENT_MAGIC)) -> Iterator[tuple[int, tuple]]:
+        """Yield (offset, RECORD fields) for every complete record from start."""
+        seg = self._segment()
+        pos = start
+        end = len(seg)
+        while pos + RECORD.size <= end:
+            fields = RECORD.unpack_from(seg, pos)
+            if fields[0] != RECORD_MAGIC or pos + RECORD.size + fields[6] > end:
+                break  # torn tail from an interrupted append
+            yield pos, fields
+            pos += RECORD.size + fields[6]
+
+    def _append(self, key: bytes, mtime_ns: int, size: int, flags: int, path: bytes, sections: bytes) -> int:
+        self._pack.seek(0, 2)
+        offset = self._pack.tell()
+        crc = zlib.crc32(path + sections[:SECTION_TABLE.size])
+        header = RECORD.pack(RECORD_MAGIC, key, mtime_ns, size, flags, len(path), len(path) + len(sections), crc)
+        self._pack.write(header + path + sections)
+        self._pack.flush()
+        self._size = self._pack.tell()
+        return offset
+
+    # -- index ---------------------------------------------------------------
+
+    def _open_index(self) -> None:
+        covered = 0
+        if self.index_path.exists() and self.index_path.stat().st_size >= INDEX_HEADER.size:
+            self._idx_file = self.index_path.open("rb")
+            self._idx = mmap.mmap(self._idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, slots, live, covered, live_bytes = INDEX_HEADER.unpack_from(self._idx, 0)
+            if magic != INDEX_MAGIC or covered > self._size:
+                self._close_index()
+                covered = 0
+            else:
+                self._slots, self.live_count, self.live_bytes = slots, live, live_bytes
+        if covered < self._size:
+            # Index is behind the segment: replay the uncovered tail, then persist.
+            if covered == 0:
+                self._close_index()
+                self.live_count = self.live_bytes = 0
+            end = max(covered, len(SEGMENT_MAGIC))
+            for offset, fields in self.iter_records(end):
+                self._note(fields[1], -1 if fields[4] & FLAG_DELETED else offset)
+                end = offset + RECORD.size + fields[6]
+            if end < self._size:
+                # Drop a torn tail so later appends stay reachable on replay.
+                if self._seg is not None:
+                    self._seg.close()
+                    self._seg = None
+                self._pack.truncate(end)
+                self._size = end
+            self.flush(compact=False)
+
+    def _close_index(self) -> None:
+        if self._idx is not None:
+            self._idx.close()
+            self._idx = None
+        if self._idx_file is not None:
+            self._idx_file.close()
+            self._idx_file = None
+        self._slots = 0
+
+    def _probe(self, key: bytes) -> int:
+        """Offset for key from the on-disk index, -1 if absent."""
+        if self._idx is None or not self._slots:
+            return -1
+        mask = self._slots - 1
+        slot = int.from_bytes(key[:8], "little") & mask
+        for _ in range(self._slots):
+            slot_key, offset = SLOT.unpack_from(self._idx, INDEX_HEADER.size + slot * SLOT.size)
+            if offset == 0:
+                return -1
+            if slot_key == key:
+                return offset - 1
+            slot = (slot + 1) & mask
+        return -1
+
+    def _locate(self, key: bytes) -> int:
+        if key in self._pending:
+            return self._pending[key]
+        return self._probe(key)
+
+    def _note(self, key: bytes, offset: int) -> None:
+        """Track live count/bytes as key moves to offset (-1 = deleted)."""
+        old = self._locate(key)
+        if old >= 0:
+            self.live_count -= 1
+            self.live_bytes -= RECORD.size + self._record_at(old)[0][6]
+        if offset >= 0:
+            self.live_count += 1
+            self.live_bytes += RECORD.size + self._record_at(offset)[0][6]
+        self._pending[key] = offset
+
+    def iter_keys(self) -> Iterator[tuple[bytes, int]]:
+        """(key, offset) for every live entry."""
+        seen = set()
+        for key, offset in self._pending.items():
+            seen.add(key)
+            if offset >= 0:
+                yield key, offset
+        if self._idx is None:
+            return
+        for slot in range(self._slots):
+            key, offset = SLOT.unpack_from(self._idx, INDEX_HEADER.size + slot * SLOT.size)
+            if offset and key not in seen:
+                yield key, offset - 1
+
+    def _write_index(self, entries: list[tuple[bytes, int]], covered: int) -> None:
+        slots = 1
+        while slots < max(16, len(entries) * 2):  # load factor <= 0.5
+            slots <<= 1
+        table = bytearray(INDEX_HEADER.size + slots * SLOT.size)
+        INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, slots, len(entries), covered, self.live_bytes)
+        mask = slots - 1
+        for key, offset in entries:
+            slot = int.from_bytes(key[:8], "little") & mask
+            while SLOT.unpack_from(table, INDEX_HEADER.size + slot * SLOT.size)[1]:
+                slot = (slot + 1) & mask
+            SLOT.pack_into(table, INDEX_HEADER.size + slot * SLOT.size, key, offset + 1)
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_bytes(table)
+        self._close_index()
+        tmp.replace(self.index_path)
+        self._idx_file = self.index_path.open("rb")
+        self._idx = mmap.mmap(self._idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._slots = slots
+        self._pending.clear()
+
+    def flush(self, compact: bool = True) -> None:
+        """Persist the index; compact first if the segment is mostly dead bytes."""
+        size = self._size
+        dead = size - len(SEGMENT_MAGIC) - self.live_bytes
+        if compact and size > COMPACT_MIN_BYTES and dead > COMPACT_RATIO * size:
+            self.compact()
+            return
+        if self._pending or self._idx is None:
+            self._write_index(list(self.iter_keys()), size)
+
+    def compact(self) -> int:
+        """Rewrite the segment with live records only. Returns bytes reclaimed."""
+        before = self._size
+        live = sorted(self.iter_keys(), key=lambda kv: kv[1])
+        seg = self._segment()
+        tmp = self.pack_path.with_name(self.pack_path.name + ".tmp")
+        entries = []
+        with tmp.open("wb") as out:
+            out.write(SEGMENT_MAGIC)
+            for key, offset in live:
+                fields, body_at = self._record_at(offset)
+                entries.append((key, out.tell()))
+                out.write(seg[offset:body_at + fields[6]])
+        self._seg.close()
+        self._seg = None
+        self._pack.close()
+        tmp.replace(self.pack_path)
+        self._pack = self.pack_path.open("r+b")
+        self._size = self._segment_size()
+        self._pending.clear()
+        self.live_count = len(entries)
+        self.live_bytes = self._size - len(SEGMENT_MAGIC)
+        self._write_index(entries, self._size)
+        return before - self._size
+
+    # -- public API ----------------------------------------------------------
+
+    def header(self, key: bytes) -> EntryHeader | None:
+        """mtime_ns, size and file_path for key, read without decompressing anything."""
+        offset = self._locate(key)
+        if offset < 0:
+            return None
+        fields, body_at = self._record_at(offset)
+        path = self._segment()[body_at:body_at + fields[5]].decode("utf-8")
+        return EntryHeader(fields[2], fields[3], path)
+
+    def entry(self, key: bytes) -> AstEntry | None:
+        """Lazily decoded entry for key, or None."""
+        offset = self._locate(key)
+        if offset < 0:
+            return None
+        fields, body_at = self._record_at(offset)
+        seg = self._segment()
+        path = seg[body_at:body_at + fields[5]]
+        table_at = body_at + fields[5]
+        table = seg[table_at:table_at + SECTION_TABLE.size]
+        if zlib.crc32(path + table) != fields[7]:
+            raise ValueError(f"checksum mismatch for record at {offset} in {self.pack_path}")
+        header = EntryHeader(fields[2], fields[3], path.decode("utf-8"))
+        return AstEntry(header, SECTION_TABLE.unpack(table), seg[table_at + SECTION_TABLE.size:body_at + fields[6]])
+
+    def get(self, key: bytes, sections: tuple[str, ...] | list[str] | None = None) -> dict[str, Any] | None:
+        """Cache entry {"mtime_ns", "size", "module_info"} holding only the requested sections."""
+        entry = self.entry(key)
+        if entry is None:
+            return None
+        return {"mtime_ns": entry.mtime_ns, "size": entry.size, "module_info": entry.module_info(sections)}
+
+    def is_fresh(self, key: bytes, source: Path) -> bool:
+        """True if key is cached and source's mtime_ns/size still match its header."""
+        header = self.header(key)
+        try:
+            st = source.stat()
+        except FileNotFoundError:
+            return False
+        return header is not None and (header.mtime_ns, header.size) == (st.st_mtime_ns, st.st_size)
+
+    def put(self, key: bytes, mtime_ns: int, size: int, module_info: dict[str, Any]) -> None:
+        offset = self._append(key, mtime_ns, size, 0, *encode_body(module_info))
+        self._note(key, offset)
+
+    def relocate(self, key: bytes, file_path: str) -> bool:
+        """Re-point key at file_path, copying its section blocks unchanged."""
+        offset = self._locate(key)
+        if offset < 0:
+            return False
+        fields, body_at = self._record_at(offset)
+        sections = self._segment()[body_at + fields[5]:body_at + fields[6]]
+        self._note(key, self._append(key, fields[2], fields[3], 0, file_path.encode("utf-8"), sections))
+        return True
+
+    def entry_bytes(self, key: bytes) -> int:
+        offset = self._locate(key)
+        return RECORD.size + self._record_at(offset)[0][6] if offset >= 0 else 0
+
+    def disk_bytes(self) -> int:
+        return self._size + (self.index_path.stat().st_size if self.index_path.exists() else 0)
+
+    def delete(self, key: bytes) -> bool:
+        if self._locate(key) < 0:
+            return False
+        self._append(key, 0, 0, FLAG_DELETED, b"", b"")
+        self._note(key, -1)
+        return True
+
+    def keys(self) -> list[bytes]:
+        return [key for key, _ in self.iter_keys()]
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def close(self) -> None:
+        self.flush()
+        if self._seg is not None:
+            self._seg.close()
+        self._close_index()
+        self._pack.close()
+
+    def __enter__(self) -> PackedAstCache:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class JsonAstCache:
+    """The original per-file JSON layout: migration source, maintained in place by gc.
+
+    header() reads only the leading bytes of an entry; section projection is
+    applied after a full parse, since a JSON file has no block boundaries.
+    """
+
+    def __init__(self, ast_dir: Path):
+        self.ast_dir = ast_dir
+
+    def path_for(self, key: bytes) -> Path:
+        return self.ast_dir / f"{key[:16].hex()}.json"
+
+    def iter_entries(self) -> Iterator[tuple[bytes, dict[str, Any]]]:
+        for path in sorted(self.ast_dir.glob("*.json")):
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            yield hex_key(path.stem), entry
+
+    def keys(self) -> list[bytes]:
+        return [hex_key(path.stem) for path in self.ast_dir.glob("*.json")]
+
+    def header(self, key: bytes) -> EntryHeader | None:
+        try:
+            with self.path_for(key).open("rb") as fh:
+                m = JSON_HEADER_RE.match(fh.read(JSON_HEADER_BYTES))
+        except OSError:
+            return None
+        if m:
+            return EntryHeader(int(m.group(1)), int(m.group(2)), json.loads(b'"' + m.group(3) + b'"'))
+        entry = self.get(key)  # key order differs from what tldrs writes
+        if entry is None:
+            return None
+        return EntryHeader(entry["mtime_ns"], entry["size"], entry["module_info"].get("file_path", ""))
+
+    def get(self, key: bytes, sections: tuple[str, ...] | list[str] | None = None) -> dict[str, Any] | None:
+        try:
+            entry = json.loads(self.path_for(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if sections is not None:
+            keep = set(sections)
+            entry["module_info"] = {
+                k: v for k, v in entry["module_info"].items() if k not in SECTIONS[1:] or k in keep
+            }
+        return entry
+
+    def put(self, key: bytes, mtime_ns: int, size: int, module_info: dict[str, Any]) -> None:
+        self.ast_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        tmp = path.with_name(path.name + ".tmp")
+        entry = {"mtime_ns": mtime_ns, "size": size, "module_info": module_info}
+        tmp.write_text(json.dumps(entry, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(path)
+
+    def delete(self, key: bytes) -> bool:
+        try:
+            self.path_for(key).unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def relocate(self, key: bytes, file_path: str) -> bool:
+        entry = self.get(key)
+        if entry is None:
+            return False
+        entry["module_info"]["file_path"] = file_path
+        self.put(key, entry["mtime_ns"], entry["size"], entry["module_info"])
+        return True
+
+    def entry_bytes(self, key: bytes) -> int:
+        try:
+            return self.path_for(key).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def disk_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.ast_dir.glob("*.json"))
+
+    def flush(self) -> None:
+        pass
+
+
+def open_cache(cache_dir: Path = DEFAULT_CACHE_DIR, ast_dir: Path | None = None) -> PackedAstCache | JsonAstCache:
+    """For reading: the packed store, synced from ast/ first, if one was migrated; else ast/."""
+    ast_dir = ast_dir or cache_dir / "ast"
+    if (cache_dir / PACK_NAME).exists():
+        cache = PackedAstCache(cache_dir)
+        if ast_dir.is_dir():
+            sync_pack(ast_dir, cache)
+        return cache
+    return JsonAstCache(ast_dir)
+
+
+def sync_pack(ast_dir: Path, cache: PackedAstCache, full: bool = False) -> tuple[int, int]:
+    """Bring the pack up to date with ast_dir. Returns (entries imported, entries dropped).
+
+    Only JSON files modified since the previous sync started are parsed (all
+    of them with full=True); pack entries without a JSON file are deleted.
+    """
+    marker = cache.pack_path.with_name(SYNC_NAME)
+    since = -1
+    if not full:
+        try:
+            since = int(marker.read_text())
+        except (OSError, ValueError):
+            pass
+    started = time.time_ns()
+    source = JsonAstCache(ast_dir)
+    present: set[bytes] = set()
+    imported = 0
+    try:
+        with os.scandir(ast_dir) as it:
+            items = list(it)
+    except FileNotFoundError:
+        items = []  # tldrs has not written ast/ yet
+    for item in items:
+        if not item.name.endswith(".json"):
+            continue
+        key = hex_key(item.name[:-5])
+        present.add(key)
+        if item.stat().st_mtime_ns >= since:
+            entry = source.get(key)
+            if entry is not None:
+                cache.put(key, entry["mtime_ns"], entry["size"], entry["module_info"])
+                imported += 1
+    dropped = [key for key in cache.keys() if key not in present]
+    for key in dropped:
+        cache.delete(key)
+    if imported or dropped:
+        cache.flush()
+    marker.write_text(str(started))
+    return imported, len(dropped)
+
+
+def migrate(ast_dir: Path, cache: PackedAstCache) -> int:
+    return sync_pack(ast_dir, cache, full=True)[0]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run_bench(ast_dir: Path, cache: PackedAstCache) -> None:
+    source = JsonAstCache(ast_dir)
+    keys = [key for key, _ in cache.iter_keys()]
+    json_entries: dict[bytes, Any] = {}
+    packed: dict[bytes, Any] = {}
+    gc.disable()
+    try:
+        rows = [
+            ("load all entries",
+             timed(lambda: json_entries.update(source.iter_entries())),
+             timed(lambda: packed.update((key, cache.get(key)) for key in keys))),
+            ("imports only",
+             timed(lambda: [source.get(key, ["imports"]) for key in keys]),
+             timed(lambda: [cache.entry(key).section("imports") for key in keys])),
+            ("call_graph only",
+             timed(lambda: [source.get(key, ["call_graph"]) for key in keys]),
+             timed(lambda: [cache.entry(key).section("call_graph") for key in keys])),
+            ("freshness header (full parse vs header)",
+             timed(lambda: [source.get(key)["mtime_ns"] for key in keys]),
+             timed(lambda: [cache.header(key) for key in keys])),
+            ("freshness header (json prefix read vs header)",
+             timed(lambda: [source.header(key) for key in keys]),
+             timed(lambda: [cache.header(key) for key in keys])),
+        ]
+    finally:
+        gc.enable()
+    json_bytes = sum(p.stat().st_size for p in ast_dir.glob("*.json"))
+    pack_bytes = cache.pack_path.stat().st_size + cache.index_path.stat().st_size
+    same = sum(1 for k, e in json_entries.items() if packed.get(k) == e)
+    print(f"entries: json={len(json_entries)} packed={len(packed)} identical={same}")
+    for label, json_time, packed_time in rows:
+        print(f"  {label:<46} json {json_time * 1000:8.1f}ms  packed {packed_time * 1000:8.1f}ms "
+              f"({json_time / packed_time:.1f}x)")
+    print(f"disk: json {json_bytes / 1e6:.1f} MB in {len(json_entries)} files, packed {pack_bytes / 1e6:.1f} MB in 2 files")
+
+
+def check_freshness(cache: PackedAstCache, root: Path) -> dict[str, int]:
+    """Stat every cached source file under root against its header; nothing is decompressed."""
+    counts = {"fresh": 0, "stale": 0, "missing": 0}
+    for _, header, _, _, st in stat_batch(cache, str(root), cache.keys()):
+        if st is None:
+            counts["missing"] += 1
+        else:
+            counts["fresh" if (st.st_mtime_ns, st.st_size) == (header.mtime_ns, header.size) else "stale"] += 1
+    return counts
+
+
+@dataclass
+class SweepStats:
+    entries: int = 0
+    fresh: int = 0
+    stale: int = 0
+    orphaned: int = 0
+    relocated: int = 0
+    evicted_budget: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    stat_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        rate = self.entries / self.stat_seconds if self.stat_seconds else 0.0
+        reclaimed = self.bytes_before - self.bytes_after
+        return (
+            f"{self.entries} entries: {self.fresh} fresh, {self.stale} stale, {self.orphaned} orphaned, "
+            f"{self.relocated} relocated, {self.evicted_budget} evicted for budget\n"
+            f"reclaimed {reclaimed / 1e6:.1f} MB ({self.bytes_before / 1e6:.1f} -> {self.bytes_after / 1e6:.1f} MB); "
+            f"stat sweep {self.stat_seconds * 1000:.0f}ms ({rate:,.0f} entries/s), total {self.elapsed:.2f}s"
+        )
+
+
+def stat_batch(cache: PackedAstCache | JsonAstCache, root: str, keys: list[bytes]) -> list[tuple]:
+    """(key, header, path under root or None, entry bytes, stat or None) per key."""
+    out = []
+    for key in keys:
+        header = cache.header(key)
+        rel = relative_path(key, header.file_path) if header else None
+        path = f"{root}/{rel}" if rel else None
+        try:
+            st = os.stat(path) if path else None
+        except OSError:
+            st = None
+        out.append((key, header, path, cache.entry_bytes(key), st))
+    return out
+
+
+def sweep(cache: PackedAstCache | JsonAstCache, root: Path, budget: int | None = None,
+          workers: int = 16, dry_run: bool = False) -> SweepStats:
+    """Evict stale/orphaned entries, relocate to root, then enforce an oldest-source-first byte budget."""
+    stats = SweepStats(bytes_before=cache.disk_bytes())
+    start = time.perf_counter()
+    keys = cache.keys()
+    stats.entries = len(keys)
+    batches = [keys[i:i + STAT_BATCH] for i in range(0, len(keys), STAT_BATCH)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        results = [row for rows in pool.map(lambda b: stat_batch(cache, str(root), b), batches) for row in rows]
+    stats.stat_seconds = time.perf_counter() - start
+
+    evict: list[bytes] = []
+    relocate: list[tuple[bytes, str]] = []
+    kept: list[tuple[int, int, bytes]] = []  # (source mtime_ns, entry bytes, key)
+    for key, header, path, nbytes, st in results:
+        if st is None:
+            stats.orphaned += 1
+            evict.append(key)
+        elif (st.st_mtime_ns, st.st_size) != (header.mtime_ns, header.size):
+            stats.stale += 1
+            evict.append(key)
+        else:
+            stats.fresh += 1
+            kept.append((st.st_mtime_ns, nbytes, key))
+            if header.file_path != path:
+                relocate.append((key, path))
+    if budget is not None:
+        total = sum(nbytes for _, nbytes, _ in kept)
+        evicted = set()
+        for _, nbytes, key in sorted(kept):
+            if total <= budget:
+                break
+            evicted.add(key)
+            total -= nbytes
+        stats.evicted_budget = len(evicted)
+        evict.extend(evicted)
+        relocate = [(key, path) for key, path in relocate if key not in evicted]
+    stats.relocated = len(relocate)
+
+    if not dry_run:
+        for key in evict:
+            cache.delete(key)
+        for key, path in relocate:
+            cache.relocate(key, path)
+        if isinstance(cache, PackedAstCache) and (evict or relocate):
+            cache.compact()
+        cache.flush()
+    stats.bytes_after = stats.bytes_before if dry_run else cache.disk_bytes()
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Packed store for the tldrs AST cache.")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="Directory for ast.pack/ast.idx")
+    parser.add_argument("--ast-dir", type=Path, help="Per-file JSON cache (default: <cache-dir>/ast)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="Import the per-file JSON cache into the packed store")
+    g = sub.add_parser("get", help="Print the cached entry for a repo-relative path")
+    g.add_argument("path")
+    g.add_argument("--sections", help=f"Comma-separated subset of {', '.join(SECTIONS[1:])}")
+    ch = sub.add_parser("check", help="Stat cached source files against entry headers")
+    ch.add_argument("--root", type=Path, default=Path.cwd(), help="Repo root the sources live under (default: cwd)")
+    sub.add_parser("stats", help="Entry count and segment usage")
+    sub.add_parser("compact", help="Drop dead records from the segment")
+    gcp = sub.add_parser("gc", help="Evict stale/orphaned entries, relocate, enforce a size budget")
+    gcp.add_argument("--root", type=Path, default=Path.cwd(), help="Repo root the sources live under (default: cwd)")
+    gcp.add_argument("--budget-mb", type=float, help="Evict entries for the oldest-modified sources beyond this size")
+    gcp.add_argument("--workers", type=int, default=16, help="Stat threads (default: 16)")
+    gcp.add_argument("--dry-run", action="store_true", help="Report without changing the cache")
+    sub.add_parser("bench", help="Compare full and projected loads of the JSON and packed layouts")
+    args = parser.parse_args()
+    if hasattr(signal, "SIGPIPE"):
+        # Exit quietly when piped into head instead of tracing on BrokenPipeError.
+        signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    ast_dir = args.ast_dir or args.cache_dir / "ast"
+    if args.command == "gc":
+        # ast/ is what tldrs reads, so it is swept (and budgeted) first; the pack
+        # then follows it via sync_pack. Never creates a pack.
+        root = args.root.resolve()
+        budget = int(args.budget_mb * 1e6) if args.budget_mb is not None else None
+        prefix = "(dry run) " if args.dry_run else ""
+        if ast_dir.is_dir():
+            stats = sweep(JsonAstCache(ast_dir), root, budget, args.workers, args.dry_run)
+            print(f"{prefix}{ast_dir}: {stats.summary()}")
+            budget = None
+        if (args.cache_dir / PACK_NAME).exists():
+            with PackedAstCache(args.cache_dir) as cache:
+                if ast_dir.is_dir() and not args.dry_run:
+                    sync_pack(ast_dir, cache)
+                stats = sweep(cache, root, budget, args.workers, args.dry_run)
+            print(f"{prefix}{cache.pack_path}: {stats.summary()}")
+        return 0
+    synced = (args.cache_dir / PACK_NAME).exists() and ast_dir.is_dir()
+    with PackedAstCache(args.cache_dir) as cache:
+        if synced and args.command in ("get", "check", "stats"):
+            sync_pack(ast_dir, cache)
+        if args.command == "migrate":
+            start = time.perf_counter()
+            n = migrate(ast_dir, cache)
+            print(f"migrated {n} entries from {ast_dir} in {time.perf_counter() - start:.2f}s")
+        elif args.command == "get":
+            sections = args.sections.split(",") if args.sections else None
+            unknown = set(sections or []) - set(SECTIONS[1:])
+            if unknown:
+                print(f"error: unknown sections: {', '.join(sorted(unknown))}", file=sys.stderr)
+                return 2
+            entry = cache.get(path_key(args.path), sections)
+            if entry is None:
+                print(f"error: {args.path} not cached", file=sys.stderr)
+                return 1
+            print(json.dumps(entry, indent=2))
+        elif args.command == "check":
+            start = time.perf_counter()
+            counts = check_freshness(cache, args.root.resolve())
+            elapsed = time.perf_counter() - start
+            print(" ".join(f"{k}={v}" for k, v in counts.items()) + f" in {elapsed * 1000:.0f}ms")
+        elif args.command == "stats":
+            size = cache.pack_path.stat().st_size
+            print(f"entries: {len(cache)}")
+            print(f"segment: {size / 1e6:.1f} MB, live {cache.live_bytes / 1e6:.1f} MB")
+        elif args.command == "compact":
+            print(f"reclaimed {cache.compact() / 1e6:.1f} MB")
+        else:
+            if not len(cache):
+                migrate(ast_dir, cache)
+            run_bench(ast_dir, cache)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Repo-wide call-graph index built from the tldrs AST cache.
+
+Each cache entry has a per-file call_graph ({"calls": {symbol: [callee]}})
+whose callees are bare names. This module merges them into one graph:
+
+  nodes   "<rel_path>:<symbol>" for every function/method a file defines,
+          plus a bare "<callee>" node for calls that resolve to nothing
+          cached (stdlib, third-party, ambiguous names)
+  edges   caller -> callee, with callee names resolved in order to a
+          definition in the same file, the same directory (Go package /
+          sibling modules) of the same language, or the single file of that
+          language defining the name anywhere in the repo
+
+Symbols are interned to ints and edges are stored CSR-style, one offsets and
+targets array for callees and one for callers, so callers/callees are a
+slice and reachability is a BFS over int arrays.
+
+State lives in <cache-dir>/callgraph/:
+  files.json  per-entry facts (mtime_ns, size, path, language, defs, edges)
+  graph.bin   the resolved CSR arrays and symbol table, stamped with a
+              fingerprint of every entry's (key, mtime_ns, size)
+
+Opening compares the fingerprint against entry headers; if it differs, only
+entries whose mtime_ns/size changed are re-read from the cache before the
+graph is re-resolved. Works over the packed store or the per-file JSON layout
+(see tldrs_cache.py).
+
+A SYMBOL argument is "<rel_path>:<symbol>", a qualified symbol
+("Store.Get", "(s *Store) Get"), or a bare name ("Get") matching every
+definition of it.
+
+Usage:
+  python3 scripts/tldrs_callgraph.py callers SYMBOL
+  python3 scripts/tldrs_callgraph.py callees SYMBOL
+  python3 scripts/tldrs_callgraph.py reach SYMBOL [--reverse] [--depth N]
+  python3 scripts/tldrs_callgraph.py stats | bench
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import re
+import signal
+import struct
+import sys
+import time
+from array import array
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any
+
+from tldrs_cache import DEFAULT_CACHE_DIR, JsonAstCache, PackedAstCache, open_cache, relative_path
+
+
+STATE_DIR = "callgraph"
+FILES_NAME = "files.json"
+GRAPH_NAME = "graph.bin"
+GRAPH_MAGIC = b"TLCG0001"
+# magic, fingerprint, node count, edge count, symbol table bytes
+GRAPH_HEADER = struct.Struct("<8s20sQQQ")
+SHORT_SPLIT_RE = re.compile(r"[.\s)]")
+LANGUAGE_FAMILY = {"tsx": "typescript"}
+
+
+def short_name(symbol: str) -> str:
+    """Last component: "Store.Get", "(s *Store) Get" and "Get" all give "Get"."""
+    return SHORT_SPLIT_RE.split(symbol)[-1]
+
+
+def fingerprint(headers: dict[str, tuple[int, int]]) -> bytes:
+    digest = hashlib.sha1()
+    for key in sorted(headers):
+        mtime_ns, size = headers[key]
+        digest.update(f"{key}:{mtime_ns}:{size}\n".encode())
+    return digest.digest()
+
+
+def file_facts(key: bytes, entry: dict[str, Any]) -> list[Any]:
+    """[mtime_ns, size, rel_path, language, defs, edges] for one cache entry."""
+    info = entry["module_info"]
+    path = info.get("file_path", "")
+    calls = (info.get("call_graph") or {}).get("calls", {})
+    defs = sorted(set(calls) | {f["name"] for f in info.get("functions") or []})
+    edges = [[caller, callee] for caller, callees in calls.items() for callee in callees]
+    language = LANGUAGE_FAMILY.get(info.get("language"), info.get("language"))
+    return [entry["mtime_ns"], entry["size"], relative_path(key, path) or path, language, defs, edges]
+
+
+def build_csr(n: int, src: array, dst: array) -> tuple[array, array]:
+    """Group edges by source: (offsets[n+1], targets)."""
+    counts = [0] * (n + 1)
+    for s in src:
+        counts[s + 1] += 1
+    offsets = array("i", itertools.accumulate(counts))
+    pos = list(offsets[:-1])
+    targets = array("i", bytes(offsets.itemsize * len(src)))
+    for s, d in zip(src, dst):
+        targets[pos[s]] = d
+        pos[s] += 1
+    return offsets, targets
+
+
+def resolve(files: dict[str, list[Any]]) -> tuple[list[str], array, array]:
+    """Intern symbols and resolve callee names: (symbols, src, dst)."""
+    symbols: list[str] = []
+    ids: dict[str, int] = {}
+
+    def intern(name: str) -> int:
+        i = ids.get(name)
+        if i is None:
+            i = ids[name] = len(symbols)
+            symbols.append(name)
+        return i
+
+    in_file: dict[tuple[str, str], list[int]] = defaultdict(list)
+    in_dir: dict[tuple[str, str, str], list[int]] = defaultdict(list)
+    owner: dict[tuple[str, str], str | None] = {}  # (language, name) -> sole defining file, None if several
+    for _, _, rel, language, defs, _ in sorted(files.values(), key=lambda f: f[2]):
+        directory = rel.rpartition("/")[0]
+        for symbol in defs:
+            node = intern(f"{rel}:{symbol}")
+            short = short_name(symbol)
+            in_file[rel, short].append(node)
+            in_dir[directory, language, short].append(node)
+            if owner.setdefault((language, short), rel) != rel:
+                owner[language, short] = None
+
+    pairs: set[tuple[int, int]] = set()
+    for _, _, rel, language, _, edges in files.values():
+        directory = rel.rpartition("/")[0]
+        for caller, callee in edges:
+            src = intern(f"{rel}:{caller}")
+            short = short_name(callee)
+            targets = in_file.get((rel, short)) or in_dir.get((directory, language, short))
+            if not targets:
+                sole = owner.get((language, short))
+                targets = in_file[sole, short] if sole else [intern(callee)]
+            pairs.update((src, dst) for dst in targets)
+    ordered = sorted(pairs)
+    return symbols, array("i", (s for s, _ in ordered)), array("i", (d for _, d in ordered))
+
+
+class CallGraph:
+    """Interned symbols with callee and caller CSR adjacency."""
+
+    def __init__(self, symbols: list[str], fwd: tuple[array, array], rev: tuple[array, array]):
+        self.symbols = symbols
+        self.fwd = fwd
+        self.rev = rev
+        self._names: dict[str, list[int]] | None = None
+
+    @classmethod
+    def build(cls, files: dict[str, list[Any]]) -> CallGraph:
+        symbols, src, dst = resolve(files)
+        return cls(symbols, build_csr(len(symbols), src, dst), build_csr(len(symbols), dst, src))
+
+    @classmethod
+    def open(cls, cache_dir: Path = DEFAULT_CACHE_DIR, ast_dir: Path | None = None,
+             rebuild: bool = False) -> tuple[CallGraph, dict[str, int]]:
+        """Load graph.bin if it matches the cache, else re-ingest changed entries and save.
+
+        Returns (graph, {"entries", "ingested", "removed"}).
+        """
+        source = open_cache(cache_dir, ast_dir)
+        state_dir = cache_dir / STATE_DIR
+        headers = {}
+        for key in source.keys():
+            header = source.header(key)
+            if header is not None:
+                headers[key.hex()] = (header.mtime_ns, header.size)
+        fp = fingerprint(headers)
+        stats = {"entries": len(headers), "ingested": 0, "removed": 0}
+        if not rebuild:
+            graph = cls.load(state_dir / GRAPH_NAME, fp)
+            if graph is not None:
+                return graph, stats
+
+        files: dict[str, list[Any]] = {}
+        if not rebuild:
+            try:
+                files = json.loads((state_dir / FILES_NAME).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                files = {}
+        stats["removed"] = len(set(files) - set(headers))
+        files = {k: v for k, v in files.items() if k in headers}
+        for hex_key, (mtime_ns, size) in headers.items():
+            facts = files.get(hex_key)
+            if facts is not None and (facts[0], facts[1]) == (mtime_ns, size):
+                continue
+            key = bytes.fromhex(hex_key)
+            entry = source.get(key, ["call_graph", "functions"])
+            if entry is not None:
+                files[hex_key] = file_facts(key, entry)
+                stats["ingested"] += 1
+        graph = cls.build(files)
+        try:
+            state_dir.mkdir(parents=True, exist_ok=True)
+            tmp = state_dir / (FILES_NAME + ".tmp")
+            tmp.write_text(json.dumps(files, separators=(",", ":")), encoding="utf-8")
+            tmp.replace(state_dir / FILES_NAME)
+            graph.save(state_dir / GRAPH_NAME, fp)
+        except OSError as exc:
+            print(f"warning: could not write {state_dir}: {exc}", file=sys.stderr)
+        return graph, stats
+
+    @classmethod
+    def load(cls, path: Path, fp: bytes) -> CallGraph | None:
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        if len(data) < GRAPH_HEADER.size:
+            return None
+        magic, stamp, nodes, edges, sym_bytes = GRAPH_HEADER.unpack_from(data, 0)
+        if magic != GRAPH_MAGIC or stamp != fp:
+            return None
+        arrays = []
+        pos = GRAPH_HEADER.size
+        for length in (nodes + 1, edges, nodes + 1, edges):
+            arr = array("i")
+            arr.frombytes(data[pos:pos + length * arr.itemsize])
+            arrays.append(arr)
+            pos += length * arr.itemsize
+        symbols = data[pos:pos + sym_bytes].decode("utf-8").split("\n") if nodes else []
+        return cls(symbols, (arrays[0], arrays[1]), (arrays[2], arrays[3]))
+
+    def save(self, path: Path, fp: bytes) -> None:
+        blob = "\n".join(self.symbols).encode("utf-8")
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as fh:
+            fh.write(GRAPH_HEADER.pack(GRAPH_MAGIC, fp, len(self.symbols), len(self.fwd[1]), len(blob)))
+            for arr in (*self.fwd, *self.rev):
+                arr.tofile(fh)
+            fh.write(blob)
+        tmp.replace(path)
+
+    # -- lookups -------------------------------------------------------------
+
+    def name_table(self) -> dict[str, list[int]]:
+        """Full name, symbol and short name -> node ids (built on first use)."""
+        if self._names is None:
+            names: dict[str, list[int]] = defaultdict(list)
+            for i, name in enumerate(self.symbols):
+                symbol = name.partition(":")[2] or name  # external nodes have no path
+                for alias in {name, symbol, short_name(symbol)}:
+                    names[alias].append(i)
+            self._names = dict(names)
+        return self._names
+
+    def lookup(self, query: str) -> list[int]:
+        """Node ids for an exact "<path>:<symbol>", a qualified symbol or a bare name."""
+        return self.name_table().get(query, [])
+
+    def _adjacent(self, csr: tuple[array, array], nodes: list[int]) -> list[str]:
+        offsets, targets = csr
+        out = {targets[j] for v in nodes for j in range(offsets[v], offsets[v + 1])}
+        return sorted(self.symbols[v] for v in out)
+
+    def callers(self, query: str) -> list[str]:
+        return self._adjacent(self.rev, self.lookup(query))
+
+    def callees(self, query: str) -> list[str]:
+        return self._adjacent(self.fwd, self.lookup(query))
+
+    def reachable(self, query: str, reverse: bool = False, max_depth: int | None = None) -> dict[str, int]:
+        """Symbols transitively called by (or, reversed, calling) query -> BFS depth."""
+        offsets, targets = self.rev if reverse else self.fwd
+        start = self.lookup(query)
+        depth = {v: 0 for v in start}
+        queue = deque(start)
+        while queue:
+            v = queue.popleft()
+            if max_depth is not None and depth[v] >= max_depth:
+                continue
+            for j in range(offsets[v], offsets[v + 1]):
+                w = targets[j]
+                if w not in depth:
+                    depth[w] = depth[v] + 1
+                    queue.append(w)
+        return {self.symbols[v]: d for v, d in depth.items() if v not in start}
+
+    def edge_count(self) -> int:
+        return len(self.fwd[1])
+
+
+def scan_callers(source: PackedAstCache | JsonAstCache, name: str) -> set[str]:
+    """Callers of name by decoding every entry's call_graph (used by bench)."""
+    out = set()
+    for key in source.keys():
+        entry = source.get(key, ["call_graph"])
+        calls = (entry["module_info"].get("call_graph") or {}).get("calls", {})
+        for caller, callees in calls.items():
+            if any(short_name(c) == name for c in callees):
+                out.add(caller)
+    return out
+
+
+def run_bench(cache_dir: Path, ast_dir: Path | None) -> int:
+    start = time.perf_counter()
+    graph, stats = CallGraph.open(cache_dir, ast_dir, rebuild=True)
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    graph, _ = CallGraph.open(cache_dir, ast_dir)
+    warm = time.perf_counter() - start
+    print(f"nodes={len(graph.symbols)} edges={graph.edge_count()} entries={stats['entries']}")
+    print(f"  full build {full:.2f}s, reopen {warm * 1000:.0f}ms")
+
+    indegree = [(graph.rev[0][v + 1] - graph.rev[0][v], v) for v in range(len(graph.symbols))]
+    names = [short_name(graph.symbols[v].partition(":")[2] or graph.symbols[v]) for _, v in sorted(indegree)[-5:]]
+    graph.name_table()
+    start = time.perf_counter()
+    for name in names:
+        graph.callers(name)
+    query = (time.perf_counter() - start) / len(names)
+    source = open_cache(cache_dir, ast_dir)
+    start = time.perf_counter()
+    scanned = scan_callers(source, names[0])
+    scan = time.perf_counter() - start
+    indexed = {c.partition(":")[2] for c in graph.callers(names[0])}
+    print(f"  callers({', '.join(names)}): index {query * 1000:.3f}ms/query, "
+          f"full-cache scan {scan * 1000:.0f}ms ({scan / query:.0f}x)")
+    print(f"  reach({names[-1]}, reverse): {len(graph.reachable(names[-1], reverse=True))} symbols")
+    missing = scanned - indexed
+    print(f"  scan callers of {names[0]} missing from index: {len(missing)}")
+    return 1 if missing else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Repo-wide call graph from the tldrs AST cache.")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="tldrs cache directory")
+    parser.add_argument("--ast-dir", type=Path, help="Per-file JSON cache (default: <cache-dir>/ast)")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore saved state and re-ingest every entry")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("callers", "Direct callers of SYMBOL"), ("callees", "Direct callees of SYMBOL")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("symbol")
+    r = sub.add_parser("reach", help="Symbols transitively reachable from SYMBOL")
+    r.add_argument("symbol")
+    r.add_argument("--reverse", action="store_true", help="Follow callers instead of callees")
+    r.add_argument("--depth", type=int, help="Maximum call depth")
+    sub.add_parser("stats", help="Node/edge counts and ingest summary")
+    sub.add_parser("bench", help="Compare index queries with a full-cache scan")
+    args = parser.parse_args()
+    if hasattr(signal, "SIGPIPE"):
+        # Exit quietly when piped into head instead of tracing on BrokenPipeError.
+        signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    if args.command == "bench":
+        return run_bench(args.cache_dir, args.ast_dir)
+
+    start = time.perf_counter()
+    graph, stats = CallGraph.open(args.cache_dir, args.ast_dir, args.rebuild)
+    opened = time.perf_counter() - start
+    if args.command in ("callers", "callees", "reach"):
+        if not graph.lookup(args.symbol):
+            print(f"error: unknown symbol {args.symbol}", file=sys.stderr)
+            return 1
+        start = time.perf_counter()
+        if args.command == "reach":
+            found = graph.reachable(args.symbol, args.reverse, args.depth)
+            lines = [f"{d:>3}  {s}" for s, d in sorted(found.items(), key=lambda r: (r[1], r[0]))]
+        else:
+            lines = getattr(graph, args.command)(args.symbol)
+        elapsed = time.perf_counter() - start
+        print("\n".join(lines))
+        print(f"({len(lines)} symbols, query {elapsed * 1000:.3f}ms)", file=sys.stderr)
+    else:
+        print(f"nodes: {len(graph.symbols)}")
+        print(f"edges: {graph.edge_count()}")
+        print(f"entries: {stats['entries']} (ingested {stats['ingested']}, removed {stats['removed']})")
+    print(f"(open {opened * 1000:.0f}ms, ingested {stats['ingested']} of {stats['entries']} entries)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())